@@ -0,0 +1,139 @@
+"""
+推理后端对比基准
+用 PyTorch 和 ONNX Runtime 后端处理同一段视频，比较 FPS、逐帧检测结果和最终计数是否一致
+
+运行: python -m benchmarks.bench_backends --model yolov8m.pt                    # 合成视频
+      python -m benchmarks.bench_backends --model yolov8m.pt --threads 1 4       # 比较不同线程数
+      python -m benchmarks.bench_backends --model yolov8m.pt --video data/3.mp4 --lines lines.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SyntheticScene
+from src.detector import box_iou
+
+
+def run_case(case: Dict) -> Dict:
+    """在独立进程中用一个后端处理视频（推理线程数是进程级设置，各用例互不影响）"""
+    from main import TrafficFlowCounter
+    from src.counter import TrafficCounter
+
+    system = TrafficFlowCounter(model_path=case['model'], backend=case['backend'], threads=case['threads'])
+    counter = TrafficCounter(case['lines'], verbose=False)
+    cap = cv2.VideoCapture(case['video'])
+    detections = []
+    detect_seconds = 0.0
+
+    start = time.perf_counter()
+    while len(detections) < case['max_frames']:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        detect_start = time.perf_counter()
+        frame_detections = system.detect(frame)
+        detect_seconds += time.perf_counter() - detect_start
+        tracks = system.track(frame_detections, frame)
+        system.update_counts(tracks, counter, cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+        detections.append((frame_detections.xyxy, frame_detections.cls))
+    elapsed = time.perf_counter() - start
+    cap.release()
+
+    frames = len(detections)
+    return {
+        'name': f"{case['backend']}-threads{case['threads'] or 'auto'}",
+        'backend': case['backend'],
+        'threads': case['threads'],
+        'frames': frames,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'detect_ms': detect_seconds / frames * 1000 if frames else 0.0,
+        'counts': {line['name']: dict(line['classes'], total=line['count']) for line in counter.to_dict()['lines']},
+        'detections': detections
+    }
+
+
+def detection_agreement(reference: List, other: List, iou_threshold: float = 0.9) -> float:
+    """两组逐帧检测结果的一致率：同类别且 IoU 达到阈值的一对一匹配数 / 两组检测数的平均值"""
+    matched = total = 0
+    for (ref_boxes, ref_cls), (boxes, cls) in zip(reference, other):
+        total += (len(ref_boxes) + len(boxes)) / 2
+        if len(ref_boxes) == 0 or len(boxes) == 0:
+            continue
+        iou = box_iou(ref_boxes, boxes)
+        iou[ref_cls[:, None] != cls[None, :]] = 0
+        used = set()
+        for row in range(len(ref_boxes)):
+            for col in np.argsort(-iou[row]):
+                if iou[row, col] < iou_threshold:
+                    break
+                if col not in used:
+                    used.add(col)
+                    matched += 1
+                    break
+    return matched / total if total else 1.0
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="推理后端对比基准")
+    parser.add_argument("--model", default="yolov8m.pt", help="PyTorch 权重路径（onnx 后端自动导出）")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], help="参与比较的后端，第一个为基准")
+    parser.add_argument("--threads", nargs="+", type=int, default=[0], help="推理线程数列表（0 表示默认）")
+    parser.add_argument("--video", default=None, help="测试视频（默认使用合成视频）")
+    parser.add_argument("--lines", default=None, help="检测线定义文件（使用 --video 时必填）")
+    parser.add_argument("--frames", type=int, default=300, help="最多处理的帧数")
+    parser.add_argument("--output", default="output/benchmarks", help="结果保存目录")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    if args.video:
+        if not args.lines:
+            parser.error("使用 --video 时需要 --lines")
+        from src.line_config import load_lines
+        video_path, lines = args.video, load_lines(args.lines)
+    else:
+        scene = SyntheticScene(args.frames)
+        video_path = os.path.join(args.output, f"synthetic_{args.frames}_0.avi")
+        if not os.path.isfile(video_path):
+            print(f"生成合成视频: {video_path}")
+            scene.write_video(video_path)
+        lines = scene.lines
+
+    cases = [{'model': args.model, 'backend': backend, 'threads': threads or None, 'video': video_path,
+              'lines': lines, 'max_frames': args.frames}
+             for backend in args.backends for threads in args.threads]
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results.append(pool.submit(run_case, case).result())
+
+    reference = results[0]
+    print(f"\n基准: {reference['name']}（{reference['frames']} 帧）")
+    for result in results:
+        result['detection_agreement'] = detection_agreement(reference['detections'], result['detections'])
+        result['counts_match'] = result['counts'] == reference['counts']
+        totals = ", ".join(f"{name}={counts['total']}" for name, counts in result['counts'].items())
+        print(f"{result['name']:<20} {result['fps']:8.1f} FPS  检测 {result['detect_ms']:7.1f} ms/帧  "
+              f"检测一致率 {result['detection_agreement']:.1%}  计数{'一致' if result['counts_match'] else '不一致'}"
+              f"  ({totals})")
+
+    output_file = os.path.join(args.output, time.strftime("backends_%Y%m%d_%H%M%S.json"))
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({'model': args.model, 'video': video_path, 'cpu_count': os.cpu_count(),
+                   'cases': [{k: v for k, v in result.items() if k != 'detections'} for result in results]},
+                  f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+穿越检测微基准
+比较逐轨迹的 TrafficCounter.check_crossing 与批量的 check_crossings 的耗时，并校验计数一致
+
+运行: python -m benchmarks.bench_crossing --tracks 150 --lines 12 --frames 500
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.counter import TrafficCounter
+from src.vehicle_tracker import VehicleTracker
+
+
+def make_scenario(num_tracks: int, num_lines: int, num_frames: int, seed: int = 0):
+    """生成随机场景：匀速直线运动的车辆和随机位置的检测线"""
+    rng = np.random.default_rng(seed)
+    width, height = 1920, 1080
+
+    lines = []
+    for idx in range(num_lines):
+        p1 = rng.integers([0, 0], [width, height])
+        p2 = rng.integers([0, 0], [width, height])
+        lines.append({'points': [tuple(int(v) for v in p1), tuple(int(v) for v in p2)],
+                      'color': (0, 0, 255), 'name': f'Line {idx + 1}'})
+
+    # 每辆车存活一段时间，离开后由新ID替代
+    frames = []
+    start = rng.uniform([0, 0], [width, height], size=(num_tracks, 2))
+    velocity = rng.uniform(-15, 15, size=(num_tracks, 2))
+    ids = np.arange(num_tracks)
+    next_id = num_tracks
+    classes = rng.choice([2, 3, 5, 7], size=num_tracks)
+    age = np.zeros(num_tracks, dtype=int)
+    lifetime = rng.integers(30, 200, size=num_tracks)
+
+    for _ in range(num_frames):
+        positions = (start + velocity * age[:, None]).astype(int)
+        frames.append((ids.copy(), positions, classes.copy()))
+        age += 1
+        expired = age >= lifetime
+        for row in np.nonzero(expired)[0]:
+            ids[row] = next_id
+            next_id += 1
+            start[row] = rng.uniform([0, 0], [width, height])
+            velocity[row] = rng.uniform(-15, 15, size=2)
+            classes[row] = rng.choice([2, 3, 5, 7])
+            age[row] = 0
+            lifetime[row] = rng.integers(30, 200)
+    return lines, frames
+
+
+def run_scalar(lines, frames) -> TrafficCounter:
+    """逐轨迹、逐线检查（原实现）"""
+    tracker = VehicleTracker()
+    counter = TrafficCounter(lines, verbose=False)
+    for ids, positions, classes in frames:
+        for track_id, (cx, cy), cls_id in zip(ids, positions, classes):
+            current_pos = (int(cx), int(cy))
+            prev_pos = tracker.get_previous_position(track_id)
+            tracker.update_tracks(track_id, current_pos)
+            counter.check_crossing(track_id, current_pos, prev_pos, cls_id, tracker)
+    return counter
+
+
+def run_batch(lines, frames) -> TrafficCounter:
+    """每帧一次批量检查"""
+    tracker = VehicleTracker()
+    counter = TrafficCounter(lines, verbose=False)
+    for ids, positions, classes in frames:
+        prev_positions = tracker.update_tracks_batch(ids, positions)
+        counter.check_crossings(ids, positions, prev_positions, classes, tracker)
+    return counter
+
+
+def timed(func, *args):
+    """运行并计时"""
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    return result, elapsed
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="穿越检测微基准")
+    parser.add_argument("--tracks", type=int, default=150, help="每帧的轨迹数")
+    parser.add_argument("--lines", type=int, default=12, help="检测线数量")
+    parser.add_argument("--frames", type=int, default=500, help="帧数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    lines, frames = make_scenario(args.tracks, args.lines, args.frames, args.seed)
+    scalar, scalar_time = timed(run_scalar, lines, frames)
+    batch, batch_time = timed(run_batch, lines, frames)
+
+    print(f"场景: {args.tracks} 条轨迹 x {args.lines} 条线 x {args.frames} 帧")
+    print(f"逐个检查: {scalar_time * 1000 / args.frames:.3f} ms/帧")
+    print(f"批量检查: {batch_time * 1000 / args.frames:.3f} ms/帧 (加速 {scalar_time / batch_time:.1f}x)")
+    print(f"总计数: {scalar.get_total_count()} / {batch.get_total_count()}")
+
+    if scalar.to_dict() != batch.to_dict():
+        raise SystemExit("计数不一致！")
+    print("计数一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+负载控制基准
+把合成视频按实时速度送入主程序的串行处理循环，检测器的耗时与输入尺寸的平方成正比，
+并在视频中段模拟一段 CPU 争用（检测耗时成倍增加），比较开启/关闭负载控制时的端到端延迟和计数
+
+运行: python -m benchmarks.bench_load_shedding                        # 颜色检测器 + 模拟推理耗时，离线运行
+      python -m benchmarks.bench_load_shedding --detect-ms 20 --contention 3
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import BlobDetector, SyntheticScene
+from src.load_shedder import LoadShedder
+
+
+class RealtimeCapture:
+    """按视频帧率放行帧的 VideoCapture 包装，模拟直播流（帧在到达之前读不到）"""
+
+    def __init__(self, path: str, fps: float):
+        self.cap = cv2.VideoCapture(path)
+        self.fps = fps
+        self.start = None
+        self.index = 0
+
+    def _wait(self) -> None:
+        if self.start is None:
+            self.start = time.monotonic()
+        delay = self.start + self.index / self.fps - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.index += 1
+
+    def grab(self) -> bool:
+        self._wait()
+        return self.cap.grab()
+
+    def read(self):
+        self._wait()
+        return self.cap.read()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def release(self) -> None:
+        self.cap.release()
+
+
+class Contention:
+    """模拟的 CPU 争用：从 begin() 起第 start 到 start + seconds 秒内推理耗时乘以 factor"""
+
+    def __init__(self, factor: float, start: float, seconds: float):
+        self.factor = factor
+        self.window = (start, start + seconds)
+        self.origin = None
+
+    def begin(self) -> None:
+        self.origin = time.monotonic()
+
+    def scale(self) -> float:
+        elapsed = time.monotonic() - (self.origin or time.monotonic())
+        return self.factor if self.window[0] <= elapsed < self.window[1] else 1.0
+
+
+class SimulatedDetector:
+    """在颜色检测器上叠加模拟的推理耗时：与输入尺寸的平方成正比，speed 为相对于原模型的耗时比例"""
+
+    def __init__(self, detect_ms: float, contention: Contention, speed: float = 1.0, imgsz: int = 640):
+        self.inner = BlobDetector(imgsz)
+        self.detect_ms = detect_ms
+        self.contention = contention
+        self.speed = speed
+        self.imgsz = imgsz
+        self.conf = self.inner.conf
+        self.model_path = "simulated"
+
+    def detect(self, frame, imgsz: Optional[int] = None):
+        size = imgsz or self.imgsz
+        time.sleep(self.detect_ms * self.speed * (size / 640) ** 2 * self.contention.scale() / 1000)
+        return self.inner.detect(frame, size)
+
+    def detect_batch(self, frames: List, imgsz: Optional[int] = None):
+        return [self.detect(frame, imgsz) for frame in frames]
+
+
+def run_case(video: str, scene: SyntheticScene, args, shedding: bool) -> Dict:
+    """按实时速度处理整个视频，返回端到端延迟分布、级别变化和计数"""
+    from main import TrafficFlowCounter
+
+    contention = Contention(args.contention, args.contention_start, args.contention_seconds)
+    system = TrafficFlowCounter(detector=SimulatedDetector(args.detect_ms, contention))
+    system.fallback_detector = SimulatedDetector(args.detect_ms, contention, speed=args.fallback_speed)
+    system.preview.enabled = False
+    system.verbose = False
+    # 关闭负载控制的对照组只测量延迟，级别上限为 0
+    system.load_shedder = LoadShedder(args.target, args.degrade_after, recover_after=args.recover_after,
+                                      max_level=4 if shedding else 0)
+    counter = system.create_counter(scene.lines, "bench")
+
+    latencies = []
+    shed_load = system.shed_load
+
+    def record(timestamp, lines):
+        shed_load(timestamp, lines)
+        latencies.append(system.load_shedder.latency)
+    system.shed_load = record
+
+    cap = RealtimeCapture(video, scene.fps)
+    contention.begin()
+    frame_count, _ = system.process_stream(cap, scene.lines, counter)
+    cap.release()
+
+    latencies = np.array(latencies)
+    actual = {line['name']: dict(line['classes'], total=line['count']) for line in counter.to_dict()['lines']}
+    return {
+        'frames': frame_count,
+        'latency_p50': float(np.percentile(latencies, 50)),
+        'latency_p95': float(np.percentile(latencies, 95)),
+        'latency_max': float(latencies.max()),
+        'final_latency': float(latencies[-1]),
+        'events': system.load_shedder.events,
+        'counts': actual,
+        'counts_ok': actual == scene.expected_counts()
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="负载控制基准")
+    parser.add_argument("--frames", type=int, default=1200, help="合成视频的帧数（按 30 FPS 实时处理）")
+    parser.add_argument("--detect-ms", type=float, default=20.0, help="输入尺寸 640 时模拟的单帧推理耗时（毫秒）")
+    parser.add_argument("--contention", type=float, default=3.0, help="争用时段内推理耗时的倍数")
+    parser.add_argument("--contention-start", type=float, default=8.0, help="争用开始的时间（秒）")
+    parser.add_argument("--contention-seconds", type=float, default=15.0, help="争用持续的时间（秒）")
+    parser.add_argument("--fallback-speed", type=float, default=0.4, help="更小模型相对于原模型的推理耗时比例")
+    parser.add_argument("--target", type=float, default=0.5, help="端到端延迟目标（秒）")
+    parser.add_argument("--degrade-after", type=float, default=2.0, help="超过目标多久后降级（秒）")
+    parser.add_argument("--recover-after", type=float, default=5.0, help="有余量多久后恢复（秒）")
+    parser.add_argument("--output", default="output/benchmarks", help="结果保存目录")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    scene = SyntheticScene(args.frames)
+    print(f"合成视频 {args.frames} 帧（{args.frames / scene.fps:.0f} s 实时），推理 {args.detect_ms:.0f} ms，"
+          f"{args.contention_start:.0f}-{args.contention_start + args.contention_seconds:.0f} s 争用 ×{args.contention:g}")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        video = scene.write_video(os.path.join(tmp, "live.avi"))
+        for shedding in (False, True):
+            result = dict(run_case(video, scene, args, shedding), name='shedding' if shedding else 'no-shedding')
+            results.append(result)
+            print(f"{result['name']:<12} 延迟 p50 {result['latency_p50']:6.2f} s  p95 {result['latency_p95']:6.2f} s  "
+                  f"最大 {result['latency_max']:6.2f} s  结束时 {result['final_latency']:6.2f} s  "
+                  f"计数{'正确' if result['counts_ok'] else '错误'}")
+            for event in result['events']:
+                print(f"    {event['elapsed']:6.1f} s  {event['from']} -> {event['to']}  (延迟 {event['latency']:.2f} s)")
+
+    output_file = os.path.join(args.output, time.strftime("load_shedding_%Y%m%d_%H%M%S.json"))
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({'args': vars(args), 'cases': results}, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+运动门控基准
+在车流稀疏的合成场景上比较开启/关闭运动门控时的检测次数、CPU 时间和计数结果。
+颜色检测器比门控本身还便宜，默认给它叠加 --detect-ms 毫秒的模拟推理耗时（计入 CPU 时间）
+
+运行: python -m benchmarks.bench_motion_gate                          # 颜色检测器 + 模拟推理耗时，离线、无需权重
+      python -m benchmarks.bench_motion_gate --detect-ms 0              # 只测颜色检测器本身
+      python -m benchmarks.bench_motion_gate --yolo yolov8n.pt --frames 300
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict
+
+from benchmarks.synthetic import BlobDetector, CostlyDetector, SyntheticScene
+from src.motion_gate import MotionGate
+
+
+def run_case(scene: SyntheticScene, detector, gate: MotionGate, frames: int) -> Dict:
+    """处理全部帧，返回 CPU 时间、跳过比例和计数"""
+    from main import TrafficFlowCounter
+    from src.counter import TrafficCounter
+
+    system = TrafficFlowCounter(detector=detector)
+    system.motion_gate = gate
+    if gate is not None:
+        gate.set_lines(scene.lines)
+    counter = TrafficCounter(scene.lines, verbose=False)
+    frame_list = [scene.render_frame(frame_idx) for frame_idx in range(frames)]
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for frame_idx, frame in enumerate(frame_list):
+        tracks = system.track(system.detect(frame), frame)
+        system.update_counts(tracks, counter, frame_idx / scene.fps)
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+    actual = {line['name']: dict(line['classes'], total=line['count']) for line in counter.to_dict()['lines']}
+    return {
+        'cpu_ms_per_frame': cpu / frames * 1000,
+        'fps': frames / wall if wall > 0 else 0.0,
+        'skip_ratio': gate.skip_ratio if gate is not None else 0.0,
+        'counts': actual
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="运动门控基准")
+    parser.add_argument("--frames", type=int, default=1800, help="处理的帧数")
+    parser.add_argument("--idle-frames", type=int, default=600, help="同车道前后车之间额外的空闲帧数")
+    parser.add_argument("--detect-ms", type=float, default=20.0,
+                        help="颜色检测器每帧叠加的模拟推理耗时（毫秒 CPU 时间），0 表示不叠加")
+    parser.add_argument("--width", type=int, default=320, help="门控帧差使用的缩小宽度")
+    parser.add_argument("--refresh-frames", type=int, default=30, help="无运动时强制检测的间隔帧数")
+    parser.add_argument("--yolo", default=None, help="另外用真实 YOLO 模型测量（权重路径）")
+    parser.add_argument("--output", default="output/benchmarks", help="结果保存目录")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    scene = SyntheticScene(args.frames, idle_frames=args.idle_frames)
+    expected = scene.expected_counts()
+    blob = BlobDetector()
+    detectors = [('blob', CostlyDetector(blob, args.detect_ms) if args.detect_ms > 0 else blob)]
+    if args.yolo:
+        from src.detector import YOLODetector
+        detectors.append(('yolo', YOLODetector(args.yolo, conf=0.1)))
+
+    print(f"合成场景 {scene.width}x{scene.height}，{args.frames} 帧，前后车额外间隔 {args.idle_frames} 帧，"
+          f"颜色检测器模拟推理 {args.detect_ms:g} ms")
+    results = []
+    for label, detector in detectors:
+        for gated in (False, True):
+            gate = MotionGate(args.width, refresh_frames=args.refresh_frames) if gated else None
+            result = dict(run_case(scene, detector, gate, args.frames),
+                          name=f"{label}-{'gated' if gated else 'every-frame'}")
+            if label == 'blob':
+                result['counts_ok'] = result['counts'] == expected
+            results.append(result)
+            check = f"  计数{'正确' if result['counts_ok'] else '错误'}" if 'counts_ok' in result else ""
+            print(f"{result['name']:<18} 跳过检测 {result['skip_ratio']:6.1%}  "
+                  f"CPU {result['cpu_ms_per_frame']:6.2f} ms/帧  {result['fps']:7.1f} FPS{check}")
+        plain, gated = results[-2], results[-1]
+        if label != 'blob':
+            print(f"{label} 计数{'一致' if plain['counts'] == gated['counts'] else '不一致'}（门控 vs 逐帧）")
+
+    output_file = os.path.join(args.output, time.strftime("motion_gate_%Y%m%d_%H%M%S.json"))
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({'frames': args.frames, 'idle_frames': args.idle_frames, 'detect_ms': args.detect_ms,
+                   'expected': expected, 'cases': results}, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output_file}")
+
+
+if __name__ == "__main__":
+    main()
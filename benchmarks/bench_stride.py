@@ -0,0 +1,88 @@
+"""
+自适应检测间隔基准
+把合成场景写成视频，分别逐帧检测和自适应间隔检测，
+比较检测的帧数、吞吐和计数结果（以逐帧检测的计数为基准）
+
+运行: python -m benchmarks.bench_stride                                # 颜色检测器，离线、无需权重
+      python -m benchmarks.bench_stride --yolo yolov8n.pt --frames 600  # 另外使用真实 YOLO
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, Optional
+
+from benchmarks.synthetic import BlobDetector, SyntheticScene
+from src.stride import StrideScheduler
+
+
+def run_case(video: str, scene: SyntheticScene, detector, stride: Optional[StrideScheduler]) -> Dict:
+    """用一种间隔策略处理整个视频，返回吞吐、检测比例和计数"""
+    from main import TrafficFlowCounter
+
+    system = TrafficFlowCounter(detector=detector)
+    system.stride = stride
+    system.event_format = None
+    system.verbose = False
+    system.save_video = False
+    counter, stats = system.count_video(video, scene.lines)
+    return {
+        'fps': stats['fps'],
+        'detect_ratio': stats.get('detect_ratio', 1.0),
+        'counts': {line['name']: dict(line['classes'], total=line['count']) for line in counter.to_dict()['lines']}
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="自适应检测间隔基准")
+    parser.add_argument("--frames", type=int, default=1800, help="合成视频的帧数")
+    parser.add_argument("--idle-frames", type=int, default=60, help="同车道前后车之间额外的空闲帧数")
+    parser.add_argument("--max-stride", type=int, default=6, help="自适应间隔的最大间隔（帧）")
+    parser.add_argument("--line-fraction", type=float, default=0.5, help="检测线约束的比例")
+    parser.add_argument("--max-shift", type=float, default=1.0, help="两次检测之间允许的位移（占检测框宽、高的比例之和）")
+    parser.add_argument("--yolo", default=None, help="另外用真实 YOLO 模型测量（权重路径）")
+    parser.add_argument("--output", default="output/benchmarks", help="结果保存目录")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    scene = SyntheticScene(args.frames, idle_frames=args.idle_frames)
+    expected = scene.expected_counts()
+    # blob-noisy 另外持续输出两个低于新轨迹阈值的误检框（0.22），检验它们不会让间隔一直为 1
+    detectors = [('blob', BlobDetector()), ('blob-noisy', BlobDetector(distractor_conf=0.22))]
+    if args.yolo:
+        from src.detector import YOLODetector
+        detectors.append(('yolo', YOLODetector(args.yolo, conf=0.1)))
+    cases = {
+        'every-frame': lambda: None,
+        'adaptive': lambda: StrideScheduler(args.max_stride, args.max_shift, line_fraction=args.line_fraction),
+    }
+
+    print(f"合成场景 {scene.width}x{scene.height}，{args.frames} 帧")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        video = scene.write_video(os.path.join(tmp, "stride.avi"))
+        for label, detector in detectors:
+            baseline = None
+            for name, make_stride in cases.items():
+                result = dict(run_case(video, scene, detector, make_stride()), name=f"{label}-{name}")
+                baseline = baseline or result['counts']
+                result['matches_full_rate'] = result['counts'] == baseline
+                if label.startswith('blob'):
+                    result['counts_ok'] = result['counts'] == expected
+                results.append(result)
+                check = f"  真值{'一致' if result['counts_ok'] else '不一致'}" if 'counts_ok' in result else ""
+                print(f"{result['name']:<22} 检测 {result['detect_ratio']:6.1%} 的帧  {result['fps']:7.1f} FPS  "
+                      f"与逐帧计数{'一致' if result['matches_full_rate'] else '不一致'}{check}")
+
+    output_file = os.path.join(args.output, time.strftime("stride_%Y%m%d_%H%M%S.json"))
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({'frames': args.frames, 'idle_frames': args.idle_frames, 'expected': expected,
+                   'cases': results}, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+分块检测与区域裁剪基准
+在高分辨率合成画面上比较整帧、全画面分块、只检测检测线附近的分块、检测线区域裁剪等模式的
+吞吐、检测召回率和计数结果
+
+运行: python -m benchmarks.bench_tiling                                # 颜色检测器，离线、无需权重
+      python -m benchmarks.bench_tiling --yolo yolov8m.pt --frames 120  # 另外测量真实 YOLO 的吞吐
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.synthetic import BlobDetector, SyntheticScene
+from src.detector import box_iou
+from src.roi import RegionCropper
+from src.tiling import Tiler, line_regions
+
+
+MODES = {
+    'full-frame': None,
+    'tiled': dict(near_lines=False, full_frame=True),
+    'near-lines': dict(near_lines=True, full_frame=False),
+    'near-lines+full': dict(near_lines=True, full_frame=True),
+    'line-roi': 'roi',
+}
+
+
+def in_regions(boxes: np.ndarray, regions: List) -> np.ndarray:
+    """中心点落在任一区域内的框"""
+    cx, cy = (boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2
+    mask = np.zeros(len(boxes), dtype=bool)
+    for x1, y1, x2, y2 in regions:
+        mask |= (cx >= x1) & (cx <= x2) & (cy >= y1) & (cy <= y2)
+    return mask
+
+
+def run_mode(scene: SyntheticScene, detector, mode, args, measure_recall: bool) -> Dict:
+    """用一种模式（None 整帧、Tiler 参数或 'roi'）处理全部帧，返回吞吐、召回率和计数"""
+    from main import TrafficFlowCounter
+    from src.counter import TrafficCounter
+
+    system = TrafficFlowCounter(detector=detector)
+    if mode == 'roi':
+        system.roi = RegionCropper(args.approach, args.padding, imgsz=detector.imgsz)
+        system.roi.set_lines(scene.lines)
+    elif mode is not None:
+        system.tiler = Tiler(args.tile_size, args.overlap, line_margin=args.line_margin, **mode)
+    system.profiler.enabled = True
+    counter = TrafficCounter(scene.lines, verbose=False)
+    if system.tiler is not None:
+        system.tiler.set_lines(scene.lines)
+    regions = line_regions(scene.lines, args.line_margin)
+
+    matched = total = matched_near = total_near = 0
+    start = time.perf_counter()
+    for frame_idx in range(args.frames):
+        frame = scene.render_frame(frame_idx)
+        detections = system.detect(frame)
+        if measure_recall:
+            truth = np.array([item['box'] for item in scene.boxes_at(frame_idx)], dtype=np.float32).reshape(-1, 4)
+            hit = np.zeros(len(truth), dtype=bool)
+            if len(truth) and len(detections):
+                hit = box_iou(truth, detections.xyxy).max(axis=1) >= 0.5
+            near = in_regions(truth, regions)
+            matched, total = matched + int(hit.sum()), total + len(truth)
+            matched_near, total_near = matched_near + int(hit[near].sum()), total_near + int(near.sum())
+        tracks = system.track(detections, frame)
+        system.update_counts(tracks, counter, frame_idx / scene.fps)
+    elapsed = time.perf_counter() - start
+
+    detect = system.profiler.summary().get('detect', {})
+    actual = {line['name']: dict(line['classes'], total=line['count']) for line in counter.to_dict()['lines']}
+    return {
+        'tiles': len(system.tiler.tiles_for((scene.height, scene.width))) if system.tiler else 0,
+        'area_ratio': system.roi.area_ratio((scene.height, scene.width)) if system.roi else None,
+        'fps': args.frames / elapsed if elapsed > 0 else 0.0,
+        'detect_ms': detect.get('p50'),
+        'recall': matched / total if measure_recall and total else None,
+        'recall_near_lines': matched_near / total_near if measure_recall and total_near else None,
+        'counts': actual,
+        'counts_ok': actual == scene.expected_counts() if measure_recall else None
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="分块检测与区域裁剪基准")
+    parser.add_argument("--width", type=int, default=3840, help="合成画面宽度")
+    parser.add_argument("--height", type=int, default=2160, help="合成画面高度")
+    parser.add_argument("--frames", type=int, default=600, help="处理的帧数")
+    parser.add_argument("--tile-size", type=int, default=640, help="块边长（像素）")
+    parser.add_argument("--overlap", type=float, default=0.2, help="相邻块的重叠比例")
+    parser.add_argument("--line-margin", type=int, default=200, help="检测线附近区域的外扩像素")
+    parser.add_argument("--approach", type=int, default=150, help="区域裁剪时检测线两侧的驶近区域宽度")
+    parser.add_argument("--padding", type=int, default=64, help="区域裁剪时向四周外扩的像素")
+    parser.add_argument("--yolo", default=None, help="另外用真实 YOLO 模型测量吞吐（权重路径）")
+    parser.add_argument("--output", default="output/benchmarks", help="结果保存目录")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    scene = SyntheticScene(args.frames, width=args.width, height=args.height)
+    detectors = [('blob', BlobDetector(), True)]
+    if args.yolo:
+        from src.detector import YOLODetector
+        detectors.append(('yolo', YOLODetector(args.yolo, conf=0.1), False))
+
+    print(f"合成画面 {args.width}x{args.height}，{args.frames} 帧，块 {args.tile_size} 像素、重叠 {args.overlap:.0%}")
+    results = []
+    for label, detector, measure_recall in detectors:
+        for name, mode in MODES.items():
+            result = dict(run_mode(scene, detector, mode, args, measure_recall), name=f"{label}-{name}")
+            results.append(result)
+            recall = "" if result['recall'] is None else (
+                f"  召回率 {result['recall']:.1%}（检测线附近 {result['recall_near_lines']:.1%}）"
+                f"  计数{'正确' if result['counts_ok'] else '错误'}")
+            blocks = f"区域 {result['area_ratio']:.0%}" if result['area_ratio'] is not None else f"块数 {result['tiles']:>3}"
+            print(f"{result['name']:<22} {blocks}  {result['fps']:7.1f} FPS  "
+                  f"检测 p50 {result['detect_ms'] or 0:7.1f} ms{recall}")
+
+    output_file = os.path.join(args.output, time.strftime("tiling_%Y%m%d_%H%M%S.json"))
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({'width': args.width, 'height': args.height, 'frames': args.frames, 'tile_size': args.tile_size,
+                   'overlap': args.overlap, 'line_margin': args.line_margin, 'expected': scene.expected_counts(),
+                   'cases': results}, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+端到端基准测试
+在合成视频上运行完整的 TrafficFlowCounter 流程，报告 FPS、各阶段延迟分位数和峰值内存，
+校验计数结果，并把结果保存到 output/benchmarks/ 以便发现性能回退
+
+运行: python -m benchmarks.run_benchmarks                  # 桩检测器，离线、无需权重
+      python -m benchmarks.run_benchmarks --yolo yolov8m.pt  # 另外使用真实 YOLO
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SyntheticScene, StubDetector
+
+
+STAGES = ('decode', 'detect', 'track', 'count', 'render')
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB）"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+        except (ImportError, AttributeError):
+            return None
+
+
+def percentiles(samples: List[float]) -> Dict:
+    """毫秒单位的延迟分位数"""
+    if not samples:
+        return {}
+    values = np.asarray(samples) * 1000
+    return {
+        'count': len(values),
+        'mean': float(values.mean()),
+        'p50': float(np.percentile(values, 50)),
+        'p90': float(np.percentile(values, 90)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max())
+    }
+
+
+def measure_decode(video_path: str) -> Dict:
+    """单独测量解码耗时"""
+    cap = cv2.VideoCapture(video_path)
+    samples = []
+    while True:
+        start = time.perf_counter()
+        ret, _ = cap.read()
+        if not ret:
+            break
+        samples.append(time.perf_counter() - start)
+    cap.release()
+    return percentiles(samples)
+
+
+def run_case(case: Dict) -> Dict:
+    """在独立进程中运行一个测试用例（保证峰值内存互不影响）"""
+    from main import TrafficFlowCounter
+    from src.counter import TrafficCounter
+    from src.detector import YOLODetector
+    from src.pipeline import FramePipeline
+
+    scene = SyntheticScene(case['frames'], seed=case['seed'])
+    if case['detector'] == 'stub':
+        detector = StubDetector(scene)
+    else:
+        detector = YOLODetector(case['detector'], conf=0.1)
+    system = TrafficFlowCounter(detector=detector)
+
+    system.profiler.enabled = True
+    counter = TrafficCounter(scene.lines, verbose=False)
+    cap = cv2.VideoCapture(case['video'])
+
+    start = time.perf_counter()
+    if case['pipelined']:
+        frames = FramePipeline(system, scene.lines, counter, render=case['render']).run(cap)
+    else:
+        frames = 0
+        while True:
+            with system.profiler.stage("decode"):
+                ret, frame = cap.read()
+            if not ret:
+                break
+            system.process_frame(frame, scene.lines, counter, render=case['render'],
+                                 timestamp=cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+            frames += 1
+    elapsed = time.perf_counter() - start
+    cap.release()
+
+    actual = {line['name']: dict(line['classes'], total=line['count']) for line in counter.to_dict()['lines']}
+    return {
+        'name': case['name'],
+        'frames': frames,
+        'seconds': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': system.profiler.summary(),
+        'peak_rss_mb': peak_rss_mb(),
+        'counts': actual,
+        'expected': scene.expected_counts(),
+        'counts_ok': actual == scene.expected_counts()
+    }
+
+
+def build_cases(args, video_path: str) -> List[Dict]:
+    """测试用例列表"""
+    base = {'frames': args.frames, 'seed': args.seed, 'video': video_path}
+    detectors = [('stub', 'stub')] + ([('yolo', args.yolo)] if args.yolo else [])
+    cases = []
+    for label, detector in detectors:
+        cases += [
+            dict(base, name=f"{label}-serial-headless", detector=detector, pipelined=False, render=False),
+            dict(base, name=f"{label}-serial-render", detector=detector, pipelined=False, render=True),
+            dict(base, name=f"{label}-pipelined-render", detector=detector, pipelined=True, render=True),
+        ]
+    return cases
+
+
+def compare_with_previous(results: Dict, result_dir: str, tolerance: float) -> List[str]:
+    """与上一次结果比较 FPS，返回回退超过容差的用例"""
+    previous_files = sorted(glob.glob(os.path.join(result_dir, "bench_*.json")))
+    if not previous_files:
+        return []
+    with open(previous_files[-1], encoding="utf-8") as f:
+        previous = {case['name']: case for case in json.load(f)['cases']}
+
+    regressions = []
+    print(f"\n与上次结果比较: {os.path.basename(previous_files[-1])}")
+    for case in results['cases']:
+        old = previous.get(case['name'])
+        if old is None or old['fps'] <= 0:
+            continue
+        change = case['fps'] / old['fps'] - 1
+        flag = ""
+        if change < -tolerance:
+            flag = "  <-- 性能回退"
+            regressions.append(case['name'])
+        print(f"  {case['name']:<28} {old['fps']:8.1f} -> {case['fps']:8.1f} FPS ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="车流量统计端到端基准测试")
+    parser.add_argument("--frames", type=int, default=900, help="合成视频帧数")
+    parser.add_argument("--seed", type=int, default=0, help="场景随机种子")
+    parser.add_argument("--yolo", default=None, help="额外使用真实 YOLO 模型（权重路径）")
+    parser.add_argument("--output", default="output/benchmarks", help="结果保存目录")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="判定性能回退的 FPS 下降比例")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    scene = SyntheticScene(args.frames, seed=args.seed)
+    video_path = os.path.join(args.output, f"synthetic_{args.frames}_{args.seed}.avi")
+    if not os.path.isfile(video_path):
+        print(f"生成合成视频: {video_path}")
+        scene.write_video(video_path)
+        scene.save_ground_truth(video_path.replace(".avi", ".json"))
+
+    results = {
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'platform': sys.platform,
+        'cpu_count': os.cpu_count(),
+        'opencv': cv2.__version__,
+        'decode_ms': measure_decode(video_path),
+        'cases': []
+    }
+
+    decode = results['decode_ms']
+    print(f"解码: p50={decode['p50']:.2f} ms, p99={decode['p99']:.2f} ms")
+
+    context = multiprocessing.get_context("spawn")
+    for case in build_cases(args, video_path):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_case, case).result()
+        results['cases'].append(result)
+        latency = result['latency_ms']
+        stages = "  ".join(f"{stage} p50={latency[stage]['p50']:.2f}/p99={latency[stage]['p99']:.2f}"
+                           for stage in STAGES if latency.get(stage, {}).get('count'))
+        print(f"{result['name']:<28} {result['fps']:8.1f} FPS  峰值内存 {result['peak_rss_mb'] or 0:.0f} MB  "
+              f"计数{'正确' if result['counts_ok'] else '错误'}")
+        print(f"    {stages} (ms)")
+
+    regressions = compare_with_previous(results, args.output, args.tolerance)
+    results['regressions'] = regressions
+
+    output_file = os.path.join(args.output, time.strftime("bench_%Y%m%d_%H%M%S.json"))
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output_file}")
+
+    failed = [case['name'] for case in results['cases'] if case['name'].startswith('stub') and not case['counts_ok']]
+    if failed:
+        print(f"计数校验失败: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+合成交通场景
+生成车辆路径已知的合成视频、对应的确定性桩检测器和理论计数，便于离线、无权重地做基准测试
+"""
+
+import json
+import time
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from src.detector import Detections
+
+
+# 车辆类别及尺寸（宽, 高）
+VEHICLE_SIZES = {2: (60, 34), 3: (30, 20), 5: (110, 42), 7: (90, 40)}
+CLASS_NAMES = {2: 'car', 3: 'motorcycle', 5: 'bus', 7: 'truck'}
+
+# 检测线：两条竖线都贯穿所有车道（计数器的距离备用判断针对整条直线，
+# 只覆盖部分车道的线会把其他车道的车也计入，理论计数难以独立给出）
+SCENE_LINES = [
+    {'points': [(640, 100), (640, 620)], 'color': (0, 0, 255), 'name': 'Line 1'},
+    {'points': [(320, 100), (320, 620)], 'color': (0, 255, 0), 'name': 'Line 2'},
+]
+
+
+class SyntheticScene:
+    """合成场景：四条水平车道，上两条自左向右、下两条自右向左，同车道车辆同速不超车
+
+    idle_frames 为同车道前后车之间额外的空闲帧数，用于模拟车流稀疏、大部分时间画面静止的场景
+    """
+
+    def __init__(self, num_frames: int = 900, width: int = 1280, height: int = 720,
+                 fps: float = 30.0, seed: int = 0, idle_frames: int = 0):
+        self.num_frames = num_frames
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.lines = SCENE_LINES
+        rng = np.random.default_rng(seed)
+
+        lanes = [(150, 1), (250, 1), (470, -1), (570, -1)]  # (车道中心 y, 方向)
+        self.vehicles = []
+        for lane_y, direction in lanes:
+            speed = float(rng.uniform(5, 11))
+            frame = int(rng.integers(0, 20))
+            while frame < num_frames:
+                cls_id = int(rng.choice([2, 2, 2, 3, 5, 7]))
+                w, h = VEHICLE_SIZES[cls_id]
+                start_x = -w if direction > 0 else width + w
+                self.vehicles.append({
+                    'cls': cls_id, 'y': lane_y, 'x0': start_x, 'vx': speed * direction,
+                    'start': frame, 'w': w, 'h': h
+                })
+                # 保证同车道前后车至少间隔 2.5 个车身
+                frame += int((2.5 * 110 + w) / speed) + int(rng.integers(0, 40)) + idle_frames
+
+        # 低置信度的静止干扰框（路边停车），只用于显示，不会被计数
+        self.distractors = [(100, 660, 160, 694), (900, 30, 960, 64)]
+
+    def boxes_at(self, frame_idx: int) -> List[Dict]:
+        """某一帧所有可见车辆的检测框（已裁剪到画面内）"""
+        boxes = []
+        for vehicle_idx, vehicle in enumerate(self.vehicles):
+            if frame_idx < vehicle['start']:
+                continue
+            cx = vehicle['x0'] + vehicle['vx'] * (frame_idx - vehicle['start'])
+            x1, x2 = cx - vehicle['w'] / 2, cx + vehicle['w'] / 2
+            y1, y2 = vehicle['y'] - vehicle['h'] / 2, vehicle['y'] + vehicle['h'] / 2
+            x1, x2 = max(x1, 0), min(x2, self.width - 1)
+            # 可见宽度不足一半时视为不可见
+            if x2 - x1 < vehicle['w'] / 2:
+                continue
+            boxes.append({'vehicle': vehicle_idx, 'cls': vehicle['cls'], 'box': (x1, y1, x2, y2)})
+        return boxes
+
+    def expected_counts(self, lines: List[Dict] = None) -> Dict:
+        """根据可见帧内的中心点轨迹计算每条线、每个类别的理论计数"""
+        lines = lines or self.lines
+        tracks = {}
+        for frame_idx in range(self.num_frames):
+            for item in self.boxes_at(frame_idx):
+                x1, y1, x2, y2 = (int(v) for v in item['box'])
+                tracks.setdefault(item['vehicle'], []).append(((x1 + x2) // 2, (y1 + y2) // 2))
+
+        result = {line['name']: {'total': 0, 'car': 0, 'motorcycle': 0, 'bus': 0, 'truck': 0} for line in lines}
+        for vehicle_idx, points in tracks.items():
+            # 车辆从画面边缘驶入，距检测线足够远，追踪确认的延迟不影响计数
+            xs = [p[0] for p in points]
+            y = points[0][1]
+            for line in lines:
+                (lx1, ly1), (lx2, ly2) = line['points']
+                if min(ly1, ly2) <= y <= max(ly1, ly2) and min(xs) < lx1 < max(xs):
+                    counts = result[line['name']]
+                    counts['total'] += 1
+                    counts[CLASS_NAMES[self.vehicles[vehicle_idx]['cls']]] += 1
+        return result
+
+    def render_frame(self, frame_idx: int) -> np.ndarray:
+        """绘制一帧"""
+        frame = np.full((self.height, self.width, 3), 70, dtype=np.uint8)
+        for lane_y in (150, 250, 470, 570):
+            cv2.line(frame, (0, lane_y + 50), (self.width, lane_y + 50), (200, 200, 200), 1)
+        for item in self.boxes_at(frame_idx):
+            x1, y1, x2, y2 = (int(v) for v in item['box'])
+            shade = 80 + 40 * (item['vehicle'] % 4)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (shade, 180, 255 - shade), -1)
+        for x1, y1, x2, y2 in self.distractors:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (90, 90, 90), -1)
+        return frame
+
+    def write_video(self, path: str) -> str:
+        """写出合成视频（MJPG 编码，OpenCV 各平台均可读写）"""
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), self.fps, (self.width, self.height))
+        for frame_idx in range(self.num_frames):
+            writer.write(self.render_frame(frame_idx))
+        writer.release()
+        return path
+
+    def save_ground_truth(self, path: str) -> None:
+        """保存场景参数和理论计数"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({'frames': self.num_frames, 'vehicles': self.vehicles,
+                       'lines': self.lines, 'expected': self.expected_counts()}, f, indent=2)
+
+
+class StubDetector:
+    """确定性桩检测器：按调用顺序返回场景真值框，不需要模型权重
+
+    接口与 YOLODetector 相同（detect / detect_batch / conf / model_path）。
+    """
+
+    def __init__(self, scene: SyntheticScene, conf: float = 0.1):
+        self.scene = scene
+        self.conf = conf
+        self.model_path = "stub"
+        self.frame_idx = 0
+
+    def reset(self) -> None:
+        """回到第一帧"""
+        self.frame_idx = 0
+
+    def seek(self, frame_idx: int) -> None:
+        """跳到指定帧（分段处理时与视频读取位置同步）"""
+        self.frame_idx = frame_idx
+
+    def detect(self, frame) -> Detections:
+        """返回当前帧的真值框（置信度 0.9）和低置信度干扰框（0.22）"""
+        items = self.scene.boxes_at(self.frame_idx)
+        self.frame_idx += 1
+        boxes = [item['box'] for item in items] + list(self.scene.distractors)
+        confs = [0.9] * len(items) + [0.22] * len(self.scene.distractors)
+        classes = [item['cls'] for item in items] + [2] * len(self.scene.distractors)
+        return Detections(boxes, confs, classes).filter(self.conf)
+
+    def detect_batch(self, frames: List) -> List[Detections]:
+        """逐帧返回真值"""
+        return [self.detect(frame) for frame in frames]
+
+
+class BlobDetector:
+    """按颜色检测合成场景中车辆的检测器，模拟模型输入分辨率的限制
+
+    与 YOLO 一样先把画面按比例缩小到 imgsz，缩小后宽或高不足 min_size 像素的车辆检测不到，
+    因此与 StubDetector 不同，结果取决于传入的画面（可用于分块检测等改变输入的场景）。
+    设置 distractor_conf 时场景中的灰色干扰框也按该置信度检测为轿车，模拟模型持续存在的低分误检。
+    """
+
+    def __init__(self, imgsz: int = 640, min_size: int = 6, conf: float = 0.1,
+                 distractor_conf: Optional[float] = None):
+        self.imgsz = imgsz
+        self.min_size = min_size
+        self.conf = conf
+        self.distractor_conf = distractor_conf
+        self.model_path = "blob"
+
+    def detect(self, frame, imgsz: Optional[int] = None) -> Detections:
+        """检测一帧（可以是整帧或裁剪出的小块，imgsz 临时覆盖输入尺寸）"""
+        height, width = frame.shape[:2]
+        ratio = min((imgsz or self.imgsz) / max(height, width), 1.0)
+        small = frame if ratio == 1.0 else cv2.resize(frame, (round(width * ratio), round(height * ratio)),
+                                                       interpolation=cv2.INTER_AREA)
+        # 车辆填充色的 G 通道为 180 且不是灰色；背景、车道线和干扰框都是灰色
+        b, g, r = (small[..., i].astype(np.int16) for i in range(3))
+        mask = ((np.abs(g - 180) <= 12) & (np.maximum(np.abs(b - g), np.abs(r - g)) > 15)).astype(np.uint8)
+        num, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        boxes, confs, classes = [], [], []
+        for x, y, w, h, _ in stats[1:num]:
+            if w < self.min_size or h < self.min_size:
+                continue
+            box = np.array([x, y, x + w, y + h], dtype=np.float32) / ratio
+            # 按原尺寸最接近的车型确定类别
+            size = (box[2] - box[0], box[3] - box[1])
+            classes.append(min(VEHICLE_SIZES, key=lambda c: abs(VEHICLE_SIZES[c][0] - size[0])
+                                                             + abs(VEHICLE_SIZES[c][1] - size[1])))
+            boxes.append(box)
+            confs.append(0.9)
+        if self.distractor_conf is not None:
+            # 干扰框填充为 (90, 90, 90)，背景为 70
+            gray = ((np.abs(b - 90) <= 8) & (np.abs(g - 90) <= 8) & (np.abs(r - 90) <= 8)).astype(np.uint8)
+            num, _, stats, _ = cv2.connectedComponentsWithStats(gray)
+            for x, y, w, h, _ in stats[1:num]:
+                if w >= self.min_size and h >= self.min_size:
+                    boxes.append(np.array([x, y, x + w, y + h], dtype=np.float32) / ratio)
+                    confs.append(self.distractor_conf)
+                    classes.append(2)
+        return Detections(boxes, confs, classes).filter(self.conf)
+
+    def detect_batch(self, frames: List, imgsz: Optional[int] = None) -> List[Detections]:
+        """逐帧检测"""
+        return [self.detect(frame, imgsz) for frame in frames]
+
+
+class CostlyDetector:
+    """在检测器上叠加模拟的推理耗时：每次检测先忙等 detect_ms 毫秒的 CPU 时间
+
+    颜色检测器本身比真实模型便宜得多，跳过检测类的优化在它上面看不出收益；
+    忙等（而不是 sleep）使模拟的推理耗时计入进程 CPU 时间。
+    """
+
+    def __init__(self, inner, detect_ms: float):
+        self.inner = inner
+        self.detect_ms = detect_ms
+        self.conf = inner.conf
+        self.imgsz = getattr(inner, "imgsz", 640)
+        self.model_path = f"{inner.model_path}+{detect_ms:g}ms"
+
+    def _spin(self) -> None:
+        deadline = time.process_time() + self.detect_ms / 1000
+        while time.process_time() < deadline:
+            pass
+
+    def detect(self, frame, imgsz: Optional[int] = None) -> Detections:
+        self._spin()
+        return self.inner.detect(frame, imgsz) if imgsz else self.inner.detect(frame)
+
+    def detect_batch(self, frames: List, imgsz: Optional[int] = None) -> List[Detections]:
+        return [self.detect(frame, imgsz) for frame in frames]
+
+
+def make_stub_detector(num_frames: int = 900, seed: int = 0) -> StubDetector:
+    """创建场景对应的桩检测器（模块级函数，可传给子进程作为检测器工厂）"""
+    return StubDetector(SyntheticScene(num_frames, seed=seed))
@@ -8,10 +8,16 @@ import cv2
 # YOLO模型配置
 MODEL_CONFIG = {
     "model_path": "yolov8m.pt",
-    "confidence_threshold": 0.1,
-    "low_confidence_threshold": 0.2,
+    "confidence_threshold": 0.1,       # 送入追踪器的检测阈值
+    "count_confidence_threshold": 0.1, # 参与计数的轨迹阈值
+    "low_confidence_threshold": 0.2,   # 低置信度显示区间下限
+    "low_confidence_upper": 0.3,       # 低置信度显示区间上限
     "vehicle_classes": [2, 3, 5, 7],  # car, motorcycle, bus, truck
-    "tracker": "bytetrack.yaml"
+    "tracker": "bytetrack.yaml",
+    "backend": "torch",                # 推理后端：torch（ultralytics）或 onnx（ONNX Runtime，CPU）
+    "imgsz": 640,                      # 推理输入尺寸
+    "threads": None,                   # 推理线程数（None 表示由推理库决定）
+    "export_dir": "output/models"      # 导出的 ONNX 模型缓存目录
 }
 
 # 检测线配置
@@ -31,6 +37,9 @@ LINE_CONFIG = {
 # 车辆追踪配置
 TRACKING_CONFIG = {
     "max_track_length": 5,           # 保留的最大轨迹点数
+    "track_capacity": 1024,          # 同时保存的最大轨迹数
+    "max_track_age_frames": 90,      # 超过该帧数未出现的轨迹被淘汰（应大于 ByteTrack 的 track_buffer）
+    "max_track_age_seconds": None,   # 超过该秒数未出现的轨迹被淘汰（None 表示不按时间淘汰）
     "distance_threshold": 8,         # 距离阈值（像素）
     "class_names": {
         2: 'car',
@@ -46,12 +55,119 @@ DISPLAY_CONFIG = {
     "font": cv2.FONT_HERSHEY_SIMPLEX,
     "font_scale": 0.8,
     "font_thickness": 2,
-    "text_color": (255, 255, 255)
+    "text_color": (255, 255, 255),
+    "render": True,        # False 时为零绘制模式：不绘制、不显示，只计数
+    "display_every": 1,    # 每 N 帧绘制并显示一帧
+    "preview_fps": None    # 预览的目标帧率（None 表示不限制）
 }
 
 # 输出配置
 OUTPUT_CONFIG = {
     "save_video": False,
     "output_path": "output/",
-    "report_format": "txt"  # txt, json, csv
+    "report_format": "txt",       # 穿越事件文件格式: txt, json(JSONL), csv, parquet
+    "save_events": False,         # 是否把每次穿越写入 <output_path>/<视频名>_events.<格式>
+    "event_flush_interval": 1.0,  # 事件文件的刷新间隔（秒）
+    "video_codec": "mp4v",        # 结果视频编码（四字符码），文件为 <output_path>/<视频名>_annotated.mp4
+    "video_queue_size": 64,       # 待写入帧队列的容量
+    "video_full_policy": "block", # 队列满时: block 等待写入（不丢帧）, drop 丢弃该帧（不拖慢处理）
+    "video_clips": False,         # True 时只保存每次穿越前后的片段
+    "clip_seconds": (3.0, 3.0)    # 片段包含穿越前、后的秒数
+}
+
+# 性能分析配置
+PROFILING_CONFIG = {
+    "enabled": False,                          # 启动时是否记录各阶段耗时
+    "toggle_key": "p",                         # 运行时切换记录开关的按键
+    "dump_path": "output/stage_latency.json"   # 结束时保存直方图数据的路径（None 表示不保存）
+}
+
+# 指标端点配置（Prometheus 格式）
+METRICS_CONFIG = {
+    "enabled": False,          # 是否在主程序中启动指标端点
+    "host": "0.0.0.0",
+    "port": 9108,
+    "publish_interval": 1.0    # 处理循环发布快照的最小间隔（秒）
+}
+
+# 分时段车流量统计配置
+FLOW_CONFIG = {
+    "enabled": True,
+    "bin_seconds": 10,             # 时间桶长度（秒），即查询精度
+    "windows_minutes": [1, 5, 15], # 报告中输出的统计窗口（分钟），最大值决定缓冲长度
+    "clock": "video"               # video: 视频时间戳（CAP_PROP_POS_MSEC）；wall: 系统时间
+}
+
+# 单个长视频分段并行处理配置
+SHARDING_CONFIG = {
+    "overlap_seconds": 2.0,   # 相邻分段重叠的时长，后一段在重叠区内预热追踪器，不计数
+    "iou_threshold": 0.5      # 重叠区内两段的轨迹框 IoU 达到该值视为同一辆车
+}
+
+# 多进程摄像头监督配置
+SUPERVISOR_CONFIG = {
+    "ring_slots": 8,          # 每路共享内存环形缓冲的帧数
+    "full_policy": "auto",    # 缓冲满时: block 解码等待, drop 丢弃新帧, auto 文件用 block、直播流用 drop
+    "max_restarts": 10,       # 每路解码进程的最大重启次数
+    "restart_delay": 2.0      # 解码进程异常退出后等待多久重启（秒）
+}
+
+# INT8 量化配置
+QUANTIZATION_CONFIG = {
+    "calibration_frames": 200,    # 从校准视频中均匀抽取的帧数
+    "per_channel": True,          # 卷积权重按输出通道量化（精度更高）
+    "calibrate_method": "minmax", # 激活值范围的统计方法: minmax, entropy, percentile
+    "count_tolerance": 0.05,      # 验证时每项计数允许的相对误差
+    "count_abs_tolerance": 1      # 验证时每项计数允许的绝对误差（取两者中较大的）
+}
+
+# 分块检测配置（高分辨率画面）
+TILING_CONFIG = {
+    "enabled": False,
+    "tile_size": 640,         # 块边长（原画面像素），与推理输入尺寸相同时块内不缩放
+    "overlap": 0.2,           # 相邻块的重叠比例，重叠宽度应大于最大车辆的尺寸
+    "near_lines": False,      # 只检测检测线附近的块
+    "line_margin": 200,       # 检测线向外扩展的范围（像素），应覆盖车辆驶近和驶离检测线的距离
+    "full_frame": True,       # 同时检测缩小后的整帧（大车和检测线附近以外的车辆）
+    "merge_threshold": 0.6    # 跨块合并阈值：交集占较小框面积的比例
+}
+
+# 检测线区域裁剪配置（只检测检测线附近）
+ROI_CONFIG = {
+    "enabled": False,
+    "approach": 150,          # 检测线两侧的驶近/驶离区域宽度（像素，沿检测线法线方向）
+    "padding": 64,            # 区域再向四周外扩的像素，保证区域边缘的车辆框完整
+    "max_area_ratio": 0.7     # 区域总面积超过画面的该比例时直接整帧检测
+}
+
+# 运动门控配置（检测线区域内没有运动时跳过检测，区域定义取 ROI_CONFIG 的 approach 和 padding）
+MOTION_CONFIG = {
+    "enabled": False,
+    "width": 320,               # 帧差所用缩小画面的宽度（像素）
+    "pixel_threshold": 25,      # 灰度差超过该值的像素视为变化
+    "min_changed_ratio": 0.002, # 检测线区域内变化像素的比例达到该值视为有运动
+    "refresh_frames": 30        # 没有运动时至少每隔该帧数强制检测一次
+}
+
+# 自适应检测间隔配置（跳过的帧只 grab 不解码，轨迹位置由前后两次检测插值）
+STRIDE_CONFIG = {
+    "enabled": False,
+    "max_stride": 6,          # 最大间隔（帧），画面中没有车辆时使用
+    "max_shift": 1.0,         # 两次检测之间轨迹在 x、y 方向的位移占检测框宽、高的比例之和的上限
+    "near_distance": 150,     # 距检测线该像素以内、正在驶近的轨迹受检测线约束
+    "line_fraction": 0.5,     # 检测线约束：间隔不超过到达检测线所需帧数的该比例
+    "match_iou": 0.3          # 与所有轨迹的 IoU 都低于该值的检测视为新驶入的车辆（逐帧检测）
+}
+
+# 负载控制配置（直播流处理跟不上时逐级降级：关闭预览、降低输入尺寸、加大检测间隔、换用更小的模型）
+LOAD_SHEDDING_CONFIG = {
+    "enabled": False,
+    "target_latency": 0.5,           # 端到端帧延迟目标（秒）：帧处理完成时间落后于其应到达时间的量
+    "degrade_after": 2.0,            # 延迟持续超过目标且没有下降该秒数后降一级
+    "recover_ratio": 0.5,            # 延迟低于目标的该比例视为有余量
+    "recover_after": 10.0,           # 余量持续该秒数后恢复一级
+    "reduced_imgsz": 416,            # 降低输入尺寸级别的推理输入尺寸
+    "stride_scale": 2,               # 加大检测间隔级别：自适应间隔的 max_stride 和 max_shift 放大的倍数
+    "fallback_model": "yolov8n.pt",  # 更小模型级别使用的权重（None 表示不使用该级别）
+    "log_path": "output/load_shedding.jsonl"  # 级别变化记录（JSONL，None 表示只打印）
 }
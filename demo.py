@@ -27,16 +27,18 @@ def main():
     
     frame_count = 0
     while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
         frame_count += 1
         
-        # 每5帧处理一次以提高性能
+        # 每5帧处理一次以提高性能，跳过的帧只 grab 不解码
         if frame_count % 5 != 0:
+            if not cap.grab():
+                break
             continue
         
+        ret, frame = cap.read()
+        if not ret:
+            break
+        
         # YOLO检测
         results = model.track(frame, persist=True, classes=[2, 3, 5, 7], conf=0.3)
         
@@ -0,0 +1,116 @@
+"""
+车流量统计系统 - 无界面批处理入口
+从文件加载检测线，批量处理一个或多个视频，不调用任何 GUI 接口
+"""
+
+import argparse
+import json
+import os
+import time
+
+from config.settings import MODEL_CONFIG, OUTPUT_CONFIG, METRICS_CONFIG, SHARDING_CONFIG, FLOW_CONFIG
+from main import TrafficFlowCounter
+from src.detector import DETECTOR_BACKENDS
+from src.line_config import load_lines
+from src.metrics_server import MetricsServer
+from src.sharding import count_video_sharded
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="车流量统计 - 无界面批处理模式")
+    parser.add_argument("videos", nargs="+", help="待处理的视频文件")
+    parser.add_argument("--lines", required=True, help="检测线定义文件（JSON/YAML）")
+    parser.add_argument("--model", default=MODEL_CONFIG["model_path"], help="YOLO模型路径")
+    parser.add_argument("--backend", default=MODEL_CONFIG["backend"], choices=DETECTOR_BACKENDS,
+                        help="推理后端：torch（ultralytics）或 onnx（ONNX Runtime CPU，首次运行时导出模型）")
+    parser.add_argument("--threads", type=int, default=MODEL_CONFIG["threads"], help="推理线程数")
+    parser.add_argument("--output", default=OUTPUT_CONFIG["output_path"], help="结果输出目录")
+    parser.add_argument("--pipelined", action="store_true", help="解码/检测/计数分线程流水执行")
+    parser.add_argument("--cache", default=None, help="检测缓存目录，设置后写入缓存供 recount.py 使用")
+    parser.add_argument("--profile", action="store_true", help="记录各阶段耗时并在结束时打印统计")
+    parser.add_argument("--events", nargs="?", const=OUTPUT_CONFIG["report_format"], default=None,
+                        choices=["txt", "json", "jsonl", "csv", "parquet"],
+                        help="把每次穿越写入 <输出目录>/<名称>_events 文件（默认格式取 report_format）")
+    parser.add_argument("--save-video", action="store_true",
+                        help="把标注后的画面写入 <输出目录>/<名称>_annotated.mp4")
+    parser.add_argument("--clips", action="store_true", help="配合 --save-video，只保存每次穿越前后的片段")
+    parser.add_argument("--metrics-port", type=int, default=None, help="在该端口提供 Prometheus 指标端点")
+    parser.add_argument("--shards", type=int, default=None, nargs="?", const=0,
+                        help="把每个视频按时间分段并行处理（每段一个进程），不带数值时段数等于 CPU 核心数")
+    parser.add_argument("--overlap", type=float, default=SHARDING_CONFIG["overlap_seconds"],
+                        help="分段处理时相邻分段的重叠秒数")
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    lines = load_lines(args.lines)
+    os.makedirs(args.output, exist_ok=True)
+
+    if args.shards is not None and (args.cache or args.events or args.save_video or args.profile
+                                    or args.metrics_port is not None or args.pipelined):
+        print("分段处理模式只输出计数结果，忽略 --cache/--events/--save-video/--profile/--metrics-port/--pipelined")
+
+    # 分段处理时由各工作进程加载模型，主进程不加载
+    system = None
+    if args.shards is None:
+        system = TrafficFlowCounter(model_path=args.model, cache_dir=args.cache, backend=args.backend,
+                                    threads=args.threads, video_clips=args.clips if args.save_video else None)
+        if args.events:
+            system.event_format = args.events
+            system.output_dir = args.output
+        if args.save_video:
+            system.save_video = True
+            system.output_dir = args.output
+        if args.profile:
+            system.profiler.enabled = True
+        if args.metrics_port is not None:
+            system.metrics = MetricsServer(METRICS_CONFIG["host"], args.metrics_port,
+                                           METRICS_CONFIG["publish_interval"]).start()
+    print(f"已加载 {len(lines)} 条检测线，共 {len(args.videos)} 个视频待处理")
+
+    total_frames = 0
+    batch_start = time.perf_counter()
+
+    for video_path in args.videos:
+        print(f"处理视频: {video_path}")
+        try:
+            if system is None:
+                counter, stats = count_video_sharded(video_path, lines, args.model, args.shards or None,
+                                                     args.overlap, SHARDING_CONFIG["iou_threshold"],
+                                                     flow_config=FLOW_CONFIG, backend=args.backend,
+                                                     threads=args.threads)
+            else:
+                system.metrics_label = os.path.basename(video_path)
+                counter, stats = system.count_video(video_path, lines, pipelined=args.pipelined)
+        except IOError as e:
+            print(e)
+            continue
+
+        total_frames += stats['frames']
+        result = counter.to_dict()
+        result.update({'video': video_path, 'model': args.model, 'backend': args.backend, **stats})
+
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        output_file = os.path.join(args.output, f"{name}_counts.json")
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+        print(f"  {stats['frames']} 帧, 耗时 {stats['seconds']:.1f} s, 持续 FPS: {stats['fps']:.1f}")
+        if 'detect_skipped' in stats:
+            print(f"  运动门控跳过检测: {stats['detect_skipped']} 帧")
+        if 'detect_ratio' in stats:
+            print(f"  自适应间隔: 检测了 {stats['detect_ratio']:.1%} 的帧")
+        print(f"  总车辆数: {result['total']}, 结果已保存到 {output_file}")
+
+    elapsed = time.perf_counter() - batch_start
+    if total_frames > 0:
+        print(f"全部完成: {total_frames} 帧, 耗时 {elapsed:.1f} s, 平均持续 FPS: {total_frames / elapsed:.1f}")
+    if system is not None:
+        system.report_profile()
+
+
+if __name__ == "__main__":
+    main()
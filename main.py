@@ -2,26 +2,510 @@
 车流量统计系统主程序
 """
 
+import os
+import time
+from typing import Dict, Tuple
 import cv2
-from ultralytics import YOLO
+from config.settings import (MODEL_CONFIG, TRACKING_CONFIG, OUTPUT_CONFIG, PROFILING_CONFIG, METRICS_CONFIG,
+                             FLOW_CONFIG, DISPLAY_CONFIG, TILING_CONFIG, ROI_CONFIG,
+                             MOTION_CONFIG, STRIDE_CONFIG, LOAD_SHEDDING_CONFIG)
+from src.detector import Detections, create_detector
+from src.object_tracker import ByteTracker
 from src.line_drawer import LineDrawer
 from src.vehicle_tracker import VehicleTracker
 from src.counter import TrafficCounter
 from src.visualizer import Visualizer
+from src.pipeline import FramePipeline
+from src.preview import PreviewThrottle
+from src.tiling import Tiler
+from src.roi import RegionCropper
+from src.motion_gate import MotionGate
+from src.stride import StrideScheduler
+from src.load_shedder import LoadShedder
+from src.detection_cache import DetectionCacheWriter, cache_key
+from src.profiler import StageProfiler
+from src.metrics_server import MetricsServer
+from src.event_sink import EventSink, event_path
+from src.video_writer import AsyncVideoWriter, video_path
 
 
 class TrafficFlowCounter:
     """车流量统计系统主类"""
     
-    def __init__(self, model_path: str = "yolov8m.pt", video_path: str = None):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path: str = "yolov8m.pt", video_path: str = None, detector=None,
+                 cache_dir: str = None, backend: str = None, threads: int = None, video_clips: bool = None):
+        self.track_conf = MODEL_CONFIG["confidence_threshold"]
+        self.count_conf = MODEL_CONFIG["count_confidence_threshold"]
+        self.low_conf_range = (MODEL_CONFIG["low_confidence_threshold"], MODEL_CONFIG["low_confidence_upper"])
+        
+        # 每帧只推理一次，阈值取所有下游使用者中的最小值
+        # 推理后端和线程数默认取 MODEL_CONFIG，onnx 后端首次使用时导出并缓存模型
+        self.backend = backend or MODEL_CONFIG["backend"]
+        self.threads = threads or MODEL_CONFIG["threads"]
+        self.detector = detector or create_detector(
+            self.backend,
+            model_path,
+            classes=MODEL_CONFIG["vehicle_classes"],
+            conf=min(self.track_conf, self.low_conf_range[0]),
+            imgsz=MODEL_CONFIG["imgsz"],
+            threads=self.threads,
+            cache_dir=MODEL_CONFIG["export_dir"]
+        )
+        # 分块检测：高分辨率画面切块后批量推理（只作用于单路处理的检测阶段）
+        self.tiler = Tiler.from_config(TILING_CONFIG) if TILING_CONFIG["enabled"] else None
+        # 区域裁剪：只检测检测线附近的区域（同时开启分块检测时以分块为准）
+        self.roi = None
+        if ROI_CONFIG["enabled"]:
+            self.roi = RegionCropper.from_config(ROI_CONFIG, getattr(self.detector, "imgsz", MODEL_CONFIG["imgsz"]))
+        # 运动门控：检测线区域内没有运动时跳过检测，沿用上一次的检测结果送入追踪器
+        self.motion_gate = MotionGate.from_config(MOTION_CONFIG, ROI_CONFIG) if MOTION_CONFIG["enabled"] else None
+        self.last_detections = None
+        # 自适应检测间隔：按轨迹速度和到检测线的距离跳帧检测（只作用于串行处理）
+        self.stride = StrideScheduler.from_config(STRIDE_CONFIG) if STRIDE_CONFIG["enabled"] else None
+        self.object_tracker = ByteTracker(MODEL_CONFIG["tracker"])
         self.video_path = video_path
         self.line_drawer = LineDrawer()
-        self.vehicle_tracker = VehicleTracker()
+        self.vehicle_tracker = VehicleTracker.from_config(TRACKING_CONFIG)
         self.visualizer = Visualizer()
         
-    def run(self):
-        """运行车流量统计"""
+        # 预览：每 N 帧或按目标帧率绘制显示一帧；关闭时为零绘制模式，只计数
+        self.preview = PreviewThrottle.from_config(DISPLAY_CONFIG)
+        
+        # 检测缓存：设置目录后每个视频的追踪结果都会写入缓存，供 recount.py 重新计数
+        self.cache_dir = cache_dir
+        self.cache_writer = None
+        
+        # 穿越事件文件：设置格式后事件由后台线程写入 output_dir，不再打印到控制台
+        self.event_format = OUTPUT_CONFIG["report_format"] if OUTPUT_CONFIG["save_events"] else None
+        self.verbose = True  # 未写入事件文件时是否在控制台打印每次穿越
+        self.output_dir = OUTPUT_CONFIG["output_path"]
+        
+        # 结果视频：开启后标注帧由后台线程编码写入 output_dir，video_clips 为空时取 OUTPUT_CONFIG
+        self.save_video = OUTPUT_CONFIG["save_video"]
+        self.video_clips = OUTPUT_CONFIG["video_clips"] if video_clips is None else video_clips
+        self.video_writer = None
+        self.last_written = None  # 自适应间隔处理时最近写入的标注帧（跳过的帧重复写入该帧）
+        
+        # 分阶段耗时统计，运行中可按 PROFILING_CONFIG["toggle_key"] 切换
+        self.profiler = StageProfiler(PROFILING_CONFIG["enabled"])
+        
+        # 负载控制：端到端延迟超过目标时逐级降级（只作用于主程序的串行处理）
+        self.load_shedder = None
+        if LOAD_SHEDDING_CONFIG["enabled"]:
+            self.load_shedder = LoadShedder.from_config(LOAD_SHEDDING_CONFIG,
+                                                        4 if LOAD_SHEDDING_CONFIG["fallback_model"] else 3)
+        self._load_baseline = None
+        # 第 4 级使用的检测器：启动时就加载（onnx 后端同时完成导出），避免在处理循环中同步导出
+        self.fallback_detector = None
+        if self.load_shedder is not None and LOAD_SHEDDING_CONFIG["fallback_model"]:
+            self.fallback_detector = create_detector(
+                self.backend,
+                LOAD_SHEDDING_CONFIG["fallback_model"],
+                classes=MODEL_CONFIG["vehicle_classes"],
+                conf=getattr(self.detector, "conf", min(self.track_conf, self.low_conf_range[0])),
+                imgsz=getattr(self.detector, "imgsz", MODEL_CONFIG["imgsz"]),
+                threads=self.threads,
+                cache_dir=MODEL_CONFIG["export_dir"]
+            )
+        
+        # 指标端点：设置 metrics 后每帧计数结束时向其发布状态（按间隔限频）
+        self.metrics = None
+        self.metrics_label = "default"
+        self.frames_processed = 0
+    
+    def detect(self, frame) -> Detections:
+        """检测阶段：每帧一次推理（运动门控判断画面静止时沿用上一次的结果）"""
+        with self.profiler.stage("detect"):
+            if (self.motion_gate is not None and not self.motion_gate.should_detect(frame)
+                    and self.last_detections is not None):
+                # 画面没有变化，上一次的检测结果仍然有效；追踪器照常逐帧更新，轨迹不会因跳过检测而丢失
+                return self.last_detections
+            if self.tiler is not None:
+                detections = self.tiler.detect(self.detector, frame)
+            elif self.roi is not None:
+                detections = self.roi.detect(self.detector, frame)
+            else:
+                detections = self.detector.detect(frame)
+            self.last_detections = detections
+            return detections
+    
+    def track(self, detections: Detections, frame) -> Detections:
+        """追踪阶段：按追踪阈值送入追踪器，再按计数阈值筛选轨迹"""
+        with self.profiler.stage("track"):
+            tracks = self.object_tracker.update(detections.filter(self.track_conf), frame)
+            return tracks.filter(self.count_conf)
+    
+    def update_counts(self, tracks: Detections, counter: TrafficCounter, timestamp: float = None) -> None:
+        """计数阶段：更新轨迹，再批量检查所有轨迹是否穿越检测线"""
+        with self.profiler.stage("count"):
+            # 淘汰长时间未出现的轨迹，并同步清理计数器中的已通过ID
+            if self.cache_writer is not None:
+                self.cache_writer.add_frame(tracks, timestamp)
+            
+            evicted = self.vehicle_tracker.start_frame(timestamp)
+            if evicted:
+                counter.forget_tracks(evicted)
+            
+            # 获取前一个位置并更新轨迹
+            centers = tracks.centers()
+            prev_positions = self.vehicle_tracker.update_tracks_batch(tracks.track_ids, centers)
+            
+            # 检查是否穿越检测线
+            total_before = counter.get_total_count()
+            counter.check_crossings(tracks.track_ids, centers, prev_positions, tracks.cls, self.vehicle_tracker)
+            if self.video_writer is not None and counter.get_total_count() != total_before:
+                self.video_writer.mark_event(self.vehicle_tracker.frame_idx)
+        
+        self.frames_processed += 1
+        if self.metrics is not None:
+            self.metrics.publish(self.metrics_label, counter, self.frames_processed,
+                                 len(self.vehicle_tracker.track_store), self.profiler)
+    
+    def render(self, frame, lines, counter: TrafficCounter, detections: Detections, tracks: Detections,
+               track_history: Dict = None) -> None:
+        """绘制阶段：检测框、轨迹、低置信度检测、检测线和统计信息
+        
+        track_history 为轨迹点的快照（流水线模式下由计数阶段提供），为空时直接读取追踪器
+        """
+        with self.profiler.stage("render"):
+            for box, track_id, cls_id in zip(tracks.int_boxes(), tracks.track_ids, tracks.cls):
+                vehicle_type = self.vehicle_tracker.get_vehicle_type(cls_id)
+                self.visualizer.draw_detection_box(frame, box, track_id, vehicle_type)
+                if track_history is None:
+                    self.vehicle_tracker.draw_tracks(frame, track_id)
+                else:
+                    self.vehicle_tracker.draw_track_points(frame, track_history.get(track_id, []))
+            
+            # 绘制低置信度检测
+            self.visualizer.draw_low_confidence_detections(frame, detections, *self.low_conf_range)
+            
+            # 绘制检测线和统计信息（缓存图层，计数不变时不重新渲染）
+            self.visualizer.draw_overlay(frame, lines, counter, len(tracks))
+    
+    def process_frame(self, frame, lines, counter: TrafficCounter, render: bool = True,
+                      timestamp: float = None) -> int:
+        """处理单帧：一次检测的结果按各自阈值分别用于追踪、计数和低置信度显示"""
+        with self.profiler.stage("frame"):
+            detections = self.detect(frame)
+            tracks = self.track(detections, frame)
+            self.update_counts(tracks, counter, timestamp)
+            if render:
+                self.render(frame, lines, counter, detections, tracks)
+                if self.video_writer is not None:
+                    self.write_frame(frame, self.vehicle_tracker.frame_idx)
+            return len(tracks)
+    
+    def process_stride(self, cap, lines, counter: TrafficCounter, render: bool = True) -> Tuple[int, object]:
+        """自适应间隔处理：读到下一个需要检测的帧并处理，返回 (消耗的帧数, 检测的帧)，视频结束时帧为 None
+        
+        跳过的帧只 grab 不解码，追踪器只做预测；检测后先按帧顺序送入插值得到的轨迹，再送入本帧的轨迹，
+        计数器仍然逐帧检查穿越，帧号和时间戳与逐帧处理一致
+        """
+        skipped = []
+        for _ in range(self.stride.stride - 1):
+            with self.profiler.stage("decode"):
+                if not cap.grab():
+                    return len(skipped), None
+            skipped.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+            # 追踪器照常逐帧推进，卡尔曼预测和丢失计时与逐帧检测一致
+            with self.profiler.stage("track"):
+                self.object_tracker.advance()
+        with self.profiler.stage("decode"):
+            ret, frame = cap.read()
+        if not ret:
+            return len(skipped), None
+        timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        
+        with self.profiler.stage("frame"):
+            detections = self.detect(frame)
+            tracks = self.track(detections, frame)
+            skipped_frames = []
+            for interpolated, skipped_timestamp in zip(self.stride.interpolate(tracks, len(skipped)), skipped):
+                self.update_counts(interpolated, counter, skipped_timestamp)
+                skipped_frames.append(self.vehicle_tracker.frame_idx)
+            self.update_counts(tracks, counter, timestamp)
+            # 只有达到新轨迹阈值的检测才会让追踪器建立新轨迹，更低的检测不影响间隔
+            self.stride.update(detections.filter(self.object_tracker.new_track_thresh), tracks, len(skipped) + 1)
+            if render:
+                self.render(frame, lines, counter, detections, tracks)
+                if self.video_writer is not None:
+                    # 跳过的帧没有解码，重复写入上一个标注帧，结果视频的帧数和帧号与原视频一致
+                    held = frame if self.last_written is None else self.last_written
+                    for frame_idx in skipped_frames:
+                        self.write_frame(held, frame_idx)
+                    self.write_frame(frame, self.vehicle_tracker.frame_idx)
+                    self.last_written = frame
+        return len(skipped) + 1, frame
+    
+    def apply_load_level(self, level: int, lines) -> None:
+        """按负载级别调整处理方式：1 关闭预览，2 降低输入尺寸，3 加大检测间隔，4 换用更小的模型
+        
+        级别逐级叠加；每次都从第一次调用时保存的原始设置出发，恢复到较低级别时对应的措施随之撤销
+        """
+        if self._load_baseline is None:
+            self._load_baseline = {
+                'preview': self.preview.enabled,
+                'detector': self.detector,
+                'imgsz': getattr(self.detector, "imgsz", MODEL_CONFIG["imgsz"]),
+                'stride': self.stride,
+                'stride_limits': (self.stride.max_stride, self.stride.max_shift) if self.stride else None
+            }
+        baseline = self._load_baseline
+        
+        self.preview.enabled = baseline['preview'] and level < 1
+        
+        if level >= 4 and self.fallback_detector is not None:
+            self.detector = self.fallback_detector
+        else:
+            self.detector = baseline['detector']
+        imgsz = min(LOAD_SHEDDING_CONFIG["reduced_imgsz"], baseline['imgsz']) if level >= 2 else baseline['imgsz']
+        self.detector.imgsz = imgsz
+        if self.roi is not None:
+            self.roi.imgsz = imgsz
+            self.roi.set_lines(lines)
+        
+        scale = LOAD_SHEDDING_CONFIG["stride_scale"]
+        if baseline['stride'] is not None:
+            self.stride = baseline['stride']
+            max_stride, max_shift = baseline['stride_limits']
+            if level >= 3:
+                max_stride, max_shift = max_stride * scale, max_shift * scale
+            self.stride.max_stride, self.stride.max_shift = int(max_stride), max_shift
+        elif level >= 3:
+            # 没有开启自适应间隔时按 STRIDE_CONFIG 临时开启
+            if self.stride is None:
+                self.stride = StrideScheduler.from_config(STRIDE_CONFIG)
+                self.stride.max_stride *= scale
+                self.stride.max_shift *= scale
+                self.stride.set_lines(lines)
+        else:
+            self.stride = None
+    
+    def shed_load(self, timestamp: float, lines) -> None:
+        """负载控制：一帧处理完成后按端到端延迟调整级别（timestamp 为该帧的视频时间）"""
+        level = self.load_shedder.observe(timestamp)
+        if level is not None:
+            self.apply_load_level(level, lines)
+    
+    def write_frame(self, frame, frame_idx: int) -> None:
+        """把标注后的帧交给视频写入线程（frame_idx 与 VehicleTracker.frame_idx 一致，从 1 开始）"""
+        with self.profiler.stage("write"):
+            self.video_writer.write(frame, frame_idx)
+    
+    def report_profile(self) -> None:
+        """打印各阶段耗时统计，并按 PROFILING_CONFIG["dump_path"] 保存直方图数据"""
+        if not self.profiler.order:
+            return
+        self.profiler.print_summary()
+        dump_path = PROFILING_CONFIG["dump_path"]
+        if dump_path:
+            directory = os.path.dirname(dump_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.profiler.dump_json(dump_path)
+            print(f"各阶段耗时数据已保存到 {dump_path}")
+    
+    def reset(self) -> None:
+        """清空追踪状态（处理下一个视频前调用）"""
+        self.object_tracker.reset()
+        self.vehicle_tracker = VehicleTracker.from_config(TRACKING_CONFIG)
+        self.last_detections = None
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.stride is not None:
+            self.stride.reset()
+    
+    def open_cache(self, video_path: str) -> None:
+        """开始为该视频写入检测缓存（未设置 cache_dir 时不做任何事）"""
+        if self.cache_dir is None:
+            return
+        if self.load_shedder is not None:
+            # 负载控制会在运行中切换检测器、输入尺寸和检测间隔，缓存键无法描述这样的结果
+            print("已开启负载控制，不写入检测缓存")
+            return
+        model_path = getattr(self.detector, "model_path", type(self.detector).__name__)
+        thresholds = {
+            'detect': getattr(self.detector, "conf", None),
+            'track': self.track_conf,
+            'count': self.count_conf,
+            'tracker': MODEL_CONFIG["tracker"]
+        }
+        # 检测方式改变检测结果，也计入缓存键（未开启的功能记为 None）
+        detection = {
+            'backend': self.backend,
+            'imgsz': getattr(self.detector, "imgsz", MODEL_CONFIG["imgsz"]),
+            'tiling': TILING_CONFIG if self.tiler is not None else None,
+            'roi': ROI_CONFIG if self.roi is not None else None,
+            'motion': (dict(MOTION_CONFIG, approach=ROI_CONFIG["approach"], padding=ROI_CONFIG["padding"])
+                       if self.motion_gate is not None else None),
+            'stride': STRIDE_CONFIG if self.stride is not None else None
+        }
+        key = cache_key(video_path, model_path, thresholds, detection)
+        meta = {'key': key, 'video': video_path, 'model': model_path, 'thresholds': thresholds,
+                'detection': detection}
+        self.cache_writer = DetectionCacheWriter(os.path.join(self.cache_dir, key), meta)
+    
+    def close_cache(self) -> None:
+        """完成当前视频的检测缓存"""
+        if self.cache_writer is not None:
+            print(f"检测缓存已保存到 {self.cache_writer.close()}")
+            self.cache_writer = None
+    
+    def open_video_writer(self, cap, name: str) -> None:
+        """开始写入结果视频 <output_dir>/<name>_annotated.mp4（未开启 save_video 时不做任何事）"""
+        if not self.save_video:
+            return
+        self.video_writer = AsyncVideoWriter(
+            video_path(self.output_dir, name),
+            cap.get(cv2.CAP_PROP_FPS),
+            fourcc=OUTPUT_CONFIG["video_codec"],
+            queue_size=OUTPUT_CONFIG["video_queue_size"],
+            policy=OUTPUT_CONFIG["video_full_policy"],
+            clip_seconds=OUTPUT_CONFIG["clip_seconds"] if self.video_clips else None
+        )
+    
+    def close_video_writer(self) -> None:
+        """写完剩余的帧并关闭结果视频"""
+        writer = self.video_writer
+        if writer is None:
+            return
+        self.video_writer = None
+        self.last_written = None
+        writer.close()
+        dropped = f"，丢弃 {writer.frames_dropped} 帧" if writer.frames_dropped else ""
+        if writer.clip_seconds is None:
+            print(f"结果视频已保存到 {writer.path}（{writer.frames_written} 帧{dropped}）")
+        else:
+            print(f"{len(writer.clip_paths)} 个穿越片段已保存到 {os.path.dirname(writer.path) or '.'}"
+                  f"（{writer.frames_written} 帧{dropped}）")
+    
+    def create_counter(self, lines, name: str) -> TrafficCounter:
+        """创建计数器，设置了 event_format 时附带写入 <name>_events 文件的事件写入器"""
+        # 只检测检测线附近时，分块和裁剪区域取决于检测线
+        if self.tiler is not None:
+            self.tiler.set_lines(lines)
+        if self.roi is not None:
+            self.roi.set_lines(lines)
+        if self.motion_gate is not None:
+            self.motion_gate.set_lines(lines)
+        if self.stride is not None:
+            self.stride.set_lines(lines)
+        if self.event_format is None:
+            return TrafficCounter(lines, verbose=self.verbose, flow_config=FLOW_CONFIG)
+        sink = EventSink(event_path(self.output_dir, name, self.event_format), self.event_format,
+                         OUTPUT_CONFIG["event_flush_interval"])
+        return TrafficCounter(lines, verbose=False, event_sink=sink, flow_config=FLOW_CONFIG)
+    
+    @staticmethod
+    def close_counter(counter: TrafficCounter) -> None:
+        """写完并关闭计数器的事件文件"""
+        if counter.event_sink is not None:
+            counter.event_sink.close()
+            print(f"{counter.event_sink.event_count} 条穿越事件已保存到 {counter.event_sink.path}")
+    
+    def count_video(self, video_path: str, lines, pipelined: bool = False) -> Tuple[TrafficCounter, Dict]:
+        """无界面处理整个视频，返回计数器和运行统计（不调用任何 GUI 接口）"""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError(f"无法打开视频: {video_path}")
+        
+        self.reset()
+        self.open_cache(video_path)
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        counter = self.create_counter(lines, name)
+        self.open_video_writer(cap, name)
+        render = self.video_writer is not None  # 只有保存结果视频时才绘制
+        frame_count = 0
+        start = time.perf_counter()
+        
+        if pipelined:
+            frame_count = FramePipeline(self, lines, counter, render=render).run(cap)
+        elif self.stride is not None:
+            while True:
+                frames, frame = self.process_stride(cap, lines, counter, render=render)
+                frame_count += frames
+                if frame is None:
+                    break
+        else:
+            while True:
+                with self.profiler.stage("decode"):
+                    ret, frame = cap.read()
+                if not ret:
+                    break
+                timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                self.process_frame(frame, lines, counter, render=render, timestamp=timestamp)
+                frame_count += 1
+        
+        cap.release()
+        self.close_video_writer()
+        self.close_cache()
+        self.close_counter(counter)
+        elapsed = time.perf_counter() - start
+        if self.metrics is not None:
+            # 视频结束时强制发布一次，保证端点上的计数是最终值
+            self.metrics.publish(self.metrics_label, counter, self.frames_processed,
+                                 len(self.vehicle_tracker.track_store), self.profiler, force=True)
+        stats = {
+            'frames': frame_count,
+            'seconds': elapsed,
+            'fps': frame_count / elapsed if elapsed > 0 else 0.0
+        }
+        if self.motion_gate is not None:
+            stats['detect_skipped'] = self.motion_gate.frames_skipped
+        if self.stride is not None and not pipelined:
+            stats['detect_ratio'] = self.stride.detect_ratio
+        return counter, stats
+    
+    def process_stream(self, cap, lines, counter: TrafficCounter) -> Tuple[int, float]:
+        """串行处理循环（主程序使用）：按预览设置绘制和显示，开启负载控制时每帧处理后调整级别
+        
+        按 ESC 键、Ctrl+C 或视频结束时返回 (处理的帧数, 处理耗时)
+        """
+        frame_count = 0
+        total_latency = 0.0
+        if self.load_shedder is not None:
+            self.load_shedder.start()
+        try:
+            while True:
+                # 只有需要显示或写入结果视频的帧才绘制
+                show = self.preview.should_render(frame_count)
+                render = show or self.video_writer is not None
+                if self.stride is not None:
+                    # 自适应间隔：只有检测的帧才绘制和显示，耗时包括跳过的帧的 grab
+                    start = time.perf_counter()
+                    frames, frame = self.process_stride(cap, lines, counter, render=render)
+                    total_latency += time.perf_counter() - start
+                    frame_count += frames
+                    if frame is None:
+                        break
+                else:
+                    with self.profiler.stage("decode"):
+                        ret, frame = cap.read()
+                    if not ret:
+                        break
+                    timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                    start = time.perf_counter()
+                    self.process_frame(frame, lines, counter, render=render, timestamp=timestamp)
+                    total_latency += time.perf_counter() - start
+                    frame_count += 1
+                
+                if show and not self._show_frame(frame_count, frame):
+                    break
+                if self.load_shedder is not None:
+                    self.shed_load(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000, lines)
+                    # 预览被负载控制关闭时仍然响应 ESC 键
+                    if (self._load_baseline is not None and self._load_baseline['preview']
+                            and not self.preview.enabled and cv2.waitKey(1) & 0xFF == 27):
+                        break
+        except KeyboardInterrupt:
+            print("已中断")
+        return frame_count, total_latency
+    
+    def run(self, pipelined: bool = False):
+        """运行车流量统计
+        
+        pipelined 为 True 时解码、检测+追踪、计数、绘制在独立线程中流水执行
+        """
         # 打开视频
         cap = cv2.VideoCapture(self.video_path or "3.mp4")
         
@@ -38,77 +522,62 @@ class TrafficFlowCounter:
             return
         
         # 初始化计数器
-        counter = TrafficCounter(lines)
+        video_path = self.video_path or "3.mp4"
+        counter = self.create_counter(lines, os.path.splitext(os.path.basename(video_path))[0])
         
         # 重置视频到开头
         cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.open_cache(video_path)
+        self.open_video_writer(cap, os.path.splitext(os.path.basename(video_path))[0])
         
-        print("开始车流量统计... 按 ESC 键退出")
+        if METRICS_CONFIG["enabled"] and self.metrics is None:
+            self.metrics = MetricsServer(METRICS_CONFIG["host"], METRICS_CONFIG["port"],
+                                         METRICS_CONFIG["publish_interval"]).start()
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # YOLO检测和追踪
-            results = self.model.track(
-                frame, 
-                persist=True, 
-                tracker="bytetrack.yaml", 
-                classes=[2, 3, 5, 7], 
-                conf=0.1
-            )
-            
-            # 低置信度检测（用于显示）
-            all_detections = self.model(frame, classes=[2, 3, 5, 7], conf=0.2)
-            
-            detected_count = 0
-            
-            # 处理检测结果
-            if results[0].boxes.id is not None:
-                ids = results[0].boxes.id.cpu().numpy().astype(int)
-                boxes = results[0].boxes.xyxy.cpu().numpy().astype(int)
-                clss = results[0].boxes.cls.cpu().numpy().astype(int)
-                detected_count = len(ids)
-                
-                for box, track_id, cls_id in zip(boxes, ids, clss):
-                    x1, y1, x2, y2 = box
-                    cx, cy = int((x1 + x2) / 2), int((y1 + y2) / 2)
-                    current_pos = (cx, cy)
-                    
-                    # 获取前一个位置
-                    prev_pos = self.vehicle_tracker.get_previous_position(track_id)
-                    
-                    # 更新轨迹
-                    self.vehicle_tracker.update_tracks(track_id, current_pos)
-                    
-                    # 检查是否穿越检测线
-                    counter.check_crossing(track_id, current_pos, prev_pos, cls_id, self.vehicle_tracker)
-                    
-                    # 绘制检测框和轨迹
-                    vehicle_type = self.vehicle_tracker.get_vehicle_type(cls_id)
-                    self.visualizer.draw_detection_box(frame, box, track_id, vehicle_type)
-                    self.vehicle_tracker.draw_tracks(frame, track_id)
-            
-            # 绘制低置信度检测
-            self.visualizer.draw_low_confidence_detections(frame, all_detections)
-            
-            # 绘制检测线和统计信息
-            self.visualizer.draw_detection_lines(frame, lines, counter.line_counts)
-            self.visualizer.draw_statistics(frame, lines, counter, detected_count)
-            
-            # 显示结果
+        print(f"开始车流量统计... 按 ESC 键退出，按 {PROFILING_CONFIG['toggle_key'].upper()} 键开关耗时统计")
+        
+        if self.preview.enabled:
             cv2.namedWindow("Traffic Flow Counter", cv2.WINDOW_NORMAL)
-            cv2.imshow("Traffic Flow Counter", frame)
-            
-            if cv2.waitKey(1) & 0xFF == 27:  # ESC键退出
-                break
+        else:
+            print("零绘制模式：不绘制也不显示画面，按 Ctrl+C 结束")
+        frame_count = 0
+        total_latency = 0.0
+        
+        if pipelined:
+            start = time.perf_counter()
+            pipeline = FramePipeline(self, lines, counter, preview=self.preview)
+            frame_count = pipeline.run(cap, self._show_frame)
+            total_latency = time.perf_counter() - start
+        else:
+            frame_count, total_latency = self.process_stream(cap, lines, counter)
         
         cap.release()
         cv2.destroyAllWindows()
+        self.close_video_writer()
+        self.close_cache()
+        self.close_counter(counter)
         
         # 打印最终统计报告
         counter.print_report()
+        if frame_count > 0:
+            avg_ms = total_latency / frame_count * 1000
+            print(f"平均每帧处理耗时: {avg_ms:.1f} ms ({1000 / avg_ms:.1f} FPS, 共 {frame_count} 帧)")
+        if self.motion_gate is not None:
+            print(f"运动门控跳过检测: {self.motion_gate.frames_skipped} 帧 ({self.motion_gate.skip_ratio:.1%})")
+        if self.stride is not None and not pipelined:
+            print(f"自适应间隔: 检测了 {self.stride.detections_run} 帧 ({self.stride.detect_ratio:.1%})")
+        if self.load_shedder is not None and not pipelined:
+            print(f"负载控制: {len(self.load_shedder.events)} 次级别变化，结束时为 {self.load_shedder.level_name}")
+        self.report_profile()
+
+    def _show_frame(self, frame_idx: int, frame) -> bool:
+        """显示结果，按 ESC 键返回 False，按开关键切换耗时统计"""
+        with self.profiler.stage("display"):
+            cv2.imshow("Traffic Flow Counter", frame)
+            key = cv2.waitKey(1) & 0xFF
+        if key == ord(PROFILING_CONFIG["toggle_key"]):
+            print(f"耗时统计已{'开启' if self.profiler.toggle() else '暂停'}")
+        return key != 27  # ESC键退出
 
 
 def main():
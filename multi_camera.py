@@ -0,0 +1,152 @@
+"""
+车流量统计系统 - 多摄像头入口
+所有摄像头共享一个模型，跨路批量推理，每路独立追踪和计数
+"""
+
+import argparse
+import json
+import os
+
+from config.settings import MODEL_CONFIG, OUTPUT_CONFIG, METRICS_CONFIG, SUPERVISOR_CONFIG
+from main import TrafficFlowCounter
+from src.detector import DETECTOR_BACKENDS
+from src.line_config import load_lines, parse_lines
+from src.metrics_server import MetricsServer
+from src.multi_stream import CameraStream, MultiStreamRunner
+from src.camera_supervisor import CameraSupervisor
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="车流量统计 - 多摄像头批量推理模式")
+    parser.add_argument("config", help="摄像头配置文件（JSON/YAML），格式见 config/cameras.example.json")
+    parser.add_argument("--output", default=OUTPUT_CONFIG["output_path"], help="结果输出目录")
+    parser.add_argument("--events", nargs="?", const=OUTPUT_CONFIG["report_format"], default=None,
+                        choices=["txt", "json", "jsonl", "csv", "parquet"],
+                        help="把每次穿越写入 <输出目录>/<名称>_events 文件（默认格式取 report_format）")
+    parser.add_argument("--backend", default=MODEL_CONFIG["backend"], choices=DETECTOR_BACKENDS,
+                        help="推理后端：torch（ultralytics）或 onnx（ONNX Runtime CPU，首次运行时导出模型）")
+    parser.add_argument("--threads", type=int, default=MODEL_CONFIG["threads"], help="推理线程数")
+    parser.add_argument("--metrics-port", type=int, default=None, help="在该端口提供 Prometheus 指标端点")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="多进程模式：每路独立解码进程，帧经共享内存交给该数量的推理进程")
+    return parser.parse_args()
+
+
+def load_config(path: str) -> dict:
+    """加载摄像头配置"""
+    with open(path, encoding="utf-8") as f:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def load_cameras(config: dict) -> list:
+    """解析各路摄像头 [{'name', 'source', 'lines'}]"""
+    cameras = []
+    for idx, camera in enumerate(config["cameras"]):
+        name = camera.get("name", f"cam{idx + 1}")
+        lines = camera["lines"]
+        lines = load_lines(lines) if isinstance(lines, str) else parse_lines(lines, name)
+        cameras.append({'name': name, 'source': str(camera["source"]), 'lines': lines})
+    return cameras
+
+
+def build_streams(config: dict, events: str = None, output_dir: str = None, backend: str = None,
+                  threads: int = None):
+    """创建共享检测器和各路摄像头（设置 events 时各路穿越事件写入 output_dir）"""
+    model_path = config.get("model", MODEL_CONFIG["model_path"])
+    streams = []
+    detector = None
+
+    for camera in load_cameras(config):
+        # 第一路加载模型，其余各路复用同一个检测器
+        system = TrafficFlowCounter(model_path=model_path, detector=detector, backend=backend, threads=threads)
+        detector = system.detector
+        if events:
+            system.event_format = events
+            system.output_dir = output_dir
+        streams.append(CameraStream(camera['name'], camera['source'], system, camera['lines']))
+
+    return detector, streams
+
+
+def run_supervised(config: dict, args) -> None:
+    """多进程模式：解码与推理分进程运行，崩溃的解码进程自动重启"""
+    if args.metrics_port is not None:
+        print("多进程模式暂不支持 --metrics-port，已忽略")
+    supervisor = CameraSupervisor(
+        load_cameras(config),
+        config.get("model", MODEL_CONFIG["model_path"]),
+        workers=args.processes,
+        slots=SUPERVISOR_CONFIG["ring_slots"],
+        policy=SUPERVISOR_CONFIG["full_policy"],
+        max_restarts=SUPERVISOR_CONFIG["max_restarts"],
+        restart_delay=SUPERVISOR_CONFIG["restart_delay"],
+        max_batch=config.get("max_batch"),
+        event_format=args.events,
+        output_dir=args.output,
+        backend=args.backend,
+        threads=args.threads
+    )
+    print(f"开始处理 {len(supervisor.cameras)} 路摄像头（{supervisor.workers} 个推理进程）... 按 Ctrl+C 结束")
+    stats = supervisor.run()
+
+    for camera in supervisor.cameras:
+        item = stats['cameras'].get(camera['name'])
+        if item is None:
+            print(f"[{camera['name']}] 没有结果（推理进程异常退出）")
+            continue
+        result = item['counts']
+        result.update({'camera': camera['name'], 'source': camera['source'], 'frames': item['frames'],
+                       'dropped': item['dropped'], 'restarts': item['restarts']})
+        output_file = os.path.join(args.output, f"{camera['name']}_counts.json")
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[{camera['name']}] {item['frames']} 帧（丢弃 {item['dropped']}，重启 {item['restarts']} 次）, "
+              f"总车辆数: {result['total']}, 结果已保存到 {output_file}")
+    print(f"全部完成: {stats['frames']} 帧, 耗时 {stats['seconds']:.1f} s, 合计 FPS: {stats['fps']:.1f}")
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    config = load_config(args.config)
+    os.makedirs(args.output, exist_ok=True)
+    if args.processes:
+        run_supervised(config, args)
+        return
+
+    detector, streams = build_streams(config, args.events, args.output, args.backend, args.threads)
+    if args.metrics_port is not None:
+        # 各路共用一个端点，以 camera 标签区分
+        metrics = MetricsServer(METRICS_CONFIG["host"], args.metrics_port, METRICS_CONFIG["publish_interval"]).start()
+        for stream in streams:
+            stream.system.metrics = metrics
+            stream.system.metrics_label = stream.name
+    runner = MultiStreamRunner(detector, streams, max_batch=config.get("max_batch"))
+    print(f"开始处理 {len(streams)} 路摄像头... 按 Ctrl+C 结束")
+
+    try:
+        stats = runner.run()
+    except KeyboardInterrupt:
+        runner.stop()
+        for stream in streams:
+            stream.close()
+        stats = None
+
+    for stream in streams:
+        result = stream.counter.to_dict()
+        result.update({'camera': stream.name, 'source': stream.source, 'frames': stream.frame_count})
+        output_file = os.path.join(args.output, f"{stream.name}_counts.json")
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"[{stream.name}] {stream.frame_count} 帧, 总车辆数: {result['total']}, 结果已保存到 {output_file}")
+
+    if stats is not None:
+        print(f"全部完成: {stats['frames']} 帧, 耗时 {stats['seconds']:.1f} s, 合计 FPS: {stats['fps']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
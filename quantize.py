@@ -0,0 +1,100 @@
+"""
+车流量统计系统 - INT8 量化与计数验证
+用现场视频校准生成 INT8 检测模型，并在同一段视频上比较 FP32 和 INT8 模型的计数结果
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from config.settings import MODEL_CONFIG, OUTPUT_CONFIG, QUANTIZATION_CONFIG
+from main import TrafficFlowCounter
+from src.detector import create_detector, export_onnx
+from src.line_config import load_lines
+from src.quantization import CALIBRATE_METHODS, compare_counts, quantize_int8
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="车流量统计 - INT8 量化与计数验证")
+    parser.add_argument("videos", nargs="*", help="校准视频（从中均匀抽帧）")
+    parser.add_argument("--model", default=MODEL_CONFIG["model_path"], help="FP32 模型（.pt 权重或 .onnx）")
+    parser.add_argument("--int8", default=None, help="已量化的 INT8 模型，设置后跳过校准")
+    parser.add_argument("--frames", type=int, default=QUANTIZATION_CONFIG["calibration_frames"], help="校准帧数")
+    parser.add_argument("--calibrate-method", default=QUANTIZATION_CONFIG["calibrate_method"],
+                        choices=CALIBRATE_METHODS, help="激活值范围的统计方法")
+    parser.add_argument("--verify", default=None, help="验证视频：分别用 FP32 和 INT8 模型计数并比较")
+    parser.add_argument("--lines", default=None, help="检测线定义文件（JSON/YAML），--verify 时必填")
+    parser.add_argument("--tolerance", type=float, default=QUANTIZATION_CONFIG["count_tolerance"],
+                        help="每项计数允许的相对误差")
+    parser.add_argument("--abs-tolerance", type=int, default=QUANTIZATION_CONFIG["count_abs_tolerance"],
+                        help="每项计数允许的绝对误差")
+    parser.add_argument("--threads", type=int, default=MODEL_CONFIG["threads"], help="推理线程数")
+    parser.add_argument("--output", default=OUTPUT_CONFIG["output_path"], help="验证结果输出目录")
+    args = parser.parse_args()
+    if args.int8 is None and not args.videos:
+        parser.error("需要校准视频，或用 --int8 指定已量化的模型")
+    if args.verify and not args.lines:
+        parser.error("--verify 需要 --lines")
+    return args
+
+
+def count_with(model_path: str, video_path: str, lines, threads: int):
+    """用 ONNX Runtime 加载模型处理整个视频，返回 (计数结果, 运行统计)"""
+    detector = create_detector("onnx", model_path, classes=MODEL_CONFIG["vehicle_classes"],
+                               conf=min(MODEL_CONFIG["confidence_threshold"], MODEL_CONFIG["low_confidence_threshold"]),
+                               imgsz=MODEL_CONFIG["imgsz"], threads=threads, cache_dir=MODEL_CONFIG["export_dir"])
+    system = TrafficFlowCounter(detector=detector)
+    system.verbose = False  # 逐条打印穿越会计入两种模型的 FPS
+    counter, stats = system.count_video(video_path, lines)
+    return counter.to_dict(), stats
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    fp32_path = export_onnx(args.model, MODEL_CONFIG["imgsz"], MODEL_CONFIG["export_dir"])
+    int8_path = args.int8 or quantize_int8(
+        fp32_path, args.videos, args.frames, MODEL_CONFIG["imgsz"], MODEL_CONFIG["export_dir"],
+        per_channel=QUANTIZATION_CONFIG["per_channel"], calibrate_method=args.calibrate_method)
+    print(f"INT8 模型: {int8_path}（{os.path.getsize(int8_path) / 1e6:.1f} MB，"
+          f"FP32 {os.path.getsize(fp32_path) / 1e6:.1f} MB）")
+    if not args.verify:
+        print(f"使用方式: python headless.py <视频> --lines <检测线> --backend onnx --model {int8_path}")
+        return
+
+    lines = load_lines(args.lines)
+    print(f"FP32 计数: {args.verify}")
+    reference, reference_stats = count_with(fp32_path, args.verify, lines, args.threads)
+    print(f"INT8 计数: {args.verify}")
+    candidate, candidate_stats = count_with(int8_path, args.verify, lines, args.threads)
+
+    rows = compare_counts(reference, candidate, args.tolerance, args.abs_tolerance)
+    header = ['line', 'class', 'fp32', 'int8', 'diff', '']
+    table = [[row['line'], row['class'], row['reference'], row['candidate'], f"{row['diff']:+d}",
+              "" if row['ok'] else "超出容差"] for row in rows]
+    widths = [max(len(str(v)) for v in column) for column in zip(header, *table)]
+    for row in [header] + table:
+        print("  ".join(str(v).ljust(width) for v, width in zip(row, widths)))
+
+    passed = all(row['ok'] for row in rows)
+    speedup = candidate_stats['fps'] / reference_stats['fps'] if reference_stats['fps'] > 0 else 0.0
+    print(f"FP32 {reference_stats['fps']:.1f} FPS, INT8 {candidate_stats['fps']:.1f} FPS（{speedup:.2f} 倍）")
+    print(f"验证{'通过' if passed else '未通过'}：容差 max({args.abs_tolerance}, {args.tolerance:.0%} × FP32 计数)")
+
+    name = os.path.splitext(os.path.basename(args.verify))[0]
+    output_file = os.path.join(args.output, f"{name}_int8_verify.json")
+    os.makedirs(args.output, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump({'video': args.verify, 'fp32_model': fp32_path, 'int8_model': int8_path, 'passed': passed,
+                   'fp32_fps': reference_stats['fps'], 'int8_fps': candidate_stats['fps'], 'speedup': speedup,
+                   'tolerance': args.tolerance, 'abs_tolerance': args.abs_tolerance, 'rows': rows},
+                  f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {output_file}")
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
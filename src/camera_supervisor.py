@@ -0,0 +1,264 @@
+"""
+多进程摄像头监督模块
+每路摄像头的解码在独立进程中运行，帧通过共享内存环形缓冲交给推理进程；
+推理进程加载模型、按路追踪和计数，监督进程负责启动各进程并重启崩溃的解码进程
+"""
+
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+import cv2
+
+from config.settings import MODEL_CONFIG
+from .detector import export_onnx
+from .frame_ring import FrameRing
+
+
+def _is_file(source) -> bool:
+    return isinstance(source, str) and os.path.isfile(source)
+
+
+def _open_capture(source):
+    """纯数字视为本地摄像头编号"""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+def probe_frame_shape(source) -> tuple:
+    """读取视频源的画面尺寸 (高, 宽, 3)"""
+    cap = _open_capture(source)
+    if not cap.isOpened():
+        raise IOError(f"无法打开视频源: {source}")
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    if width <= 0 or height <= 0:
+        ret, frame = cap.read()
+        if not ret:
+            cap.release()
+            raise IOError(f"无法读取视频源: {source}")
+        height, width = frame.shape[:2]
+    cap.release()
+    return height, width, 3
+
+
+def _decoder_main(source, ring_spec, policy: str, stop) -> None:
+    """解码进程：读取视频源写入环形缓冲
+
+    文件读完时标记缓冲结束并正常退出；直播流断开时以非零状态退出，由监督进程重启。
+    重启后的文件源从已读取的帧数处续读。
+    """
+    ring = FrameRing.attach(*ring_spec)
+    cap = _open_capture(source)
+    if not cap.isOpened():
+        sys.exit(1)
+    is_file = _is_file(source)
+    if is_file and ring.decoded:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, ring.decoded)
+    height, width = ring.shape[:2]
+
+    while not stop.is_set():
+        if policy == "block":
+            while ring.full() and not stop.is_set():
+                time.sleep(0.001)
+        ret, frame = cap.read()
+        if not ret:
+            if is_file:
+                ring.close_writer()
+                break
+            sys.exit(1)
+        timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000 if is_file else time.time()
+        if frame.shape[:2] != (height, width):
+            frame = cv2.resize(frame, (width, height))
+        ring.put(frame, timestamp)
+    cap.release()
+
+
+def _inference_main(cameras: List[Dict], model_path: str, backend: str, threads: Optional[int],
+                    detector_factory: Optional[Callable], max_batch: Optional[int], event_format: Optional[str],
+                    output_dir: str, results, stop) -> None:
+    """推理进程：负责若干路摄像头，跨路批量推理，各路独立追踪和计数"""
+    from main import TrafficFlowCounter
+
+    detector = detector_factory() if detector_factory else None
+    streams = []
+    for camera in cameras:
+        # 第一路加载模型，其余各路复用同一个检测器
+        system = TrafficFlowCounter(model_path=model_path, detector=detector, backend=backend, threads=threads)
+        detector = system.detector
+        system.event_format = event_format
+        system.output_dir = output_dir
+        streams.append({
+            'name': camera['name'],
+            'system': system,
+            'counter': system.create_counter(camera['lines'], camera['name']),
+            'ring': FrameRing.attach(*camera['ring']),
+            'frames': 0
+        })
+
+    while not stop.is_set():
+        items = [(stream, stream['ring'].peek()) for stream in streams]
+        batch = [(stream, item[0], item[1]) for stream, item in items if item is not None]
+        del items
+        if not batch:
+            if all(stream['ring'].finished() for stream in streams):
+                break
+            time.sleep(0.001)
+            continue
+
+        # 直接在共享内存视图上推理，用完后才释放槽位
+        frames = [frame for _, frame, _ in batch]
+        size = max_batch or len(frames)
+        detections = []
+        for i in range(0, len(frames), size):
+            detections.extend(detector.detect_batch(frames[i:i + size]))
+        for (stream, frame, timestamp), stream_detections in zip(batch, detections):
+            tracks = stream['system'].track(stream_detections, frame)
+            stream['system'].update_counts(tracks, stream['counter'], timestamp)
+            stream['frames'] += 1
+        # 释放槽位前丢掉对共享内存视图的引用
+        rings = [stream['ring'] for stream, _, _ in batch]
+        del frames, frame, batch
+        for ring in rings:
+            ring.release()
+
+    for stream in streams:
+        stream['system'].close_counter(stream['counter'])
+        results.put({'camera': stream['name'], 'frames': stream['frames'], 'counts': stream['counter'].to_dict()})
+        stream['ring'].close()
+
+
+class CameraSupervisor:
+    """多进程摄像头监督器
+
+    每路摄像头一个解码进程和一个共享内存环形缓冲；各路按顺序轮流分配给 workers 个推理进程。
+    缓冲满时 policy 为 "block" 则解码进程等待（不丢帧，适合文件），为 "drop" 则丢弃新帧
+    （适合直播流，推理跟不上时不积压），"auto" 对文件用 block、对直播流用 drop。
+    解码进程异常退出后等待 restart_delay 秒重启，同一路最多重启 max_restarts 次。
+    """
+
+    def __init__(self, cameras: List[Dict], model_path: str, workers: int = 1, slots: int = 8,
+                 policy: str = "auto", max_restarts: int = 10, restart_delay: float = 2.0,
+                 max_batch: Optional[int] = None, detector_factory: Optional[Callable] = None,
+                 event_format: Optional[str] = None, output_dir: str = "output/", backend: str = "torch",
+                 threads: Optional[int] = None):
+        self.cameras = cameras  # [{'name', 'source', 'lines'}]
+        self.model_path = model_path
+        self.workers = max(min(workers, len(cameras)), 1)
+        self.slots = slots
+        self.policy = policy
+        self.max_restarts = max_restarts
+        self.restart_delay = restart_delay
+        self.max_batch = max_batch
+        self.detector_factory = detector_factory
+        self.event_format = event_format
+        self.output_dir = output_dir
+        self.backend = backend
+        self.threads = threads
+        # spawn 启动的进程各自初始化推理库，避免 fork 复制已加载的状态
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self.restarts = {camera['name']: 0 for camera in cameras}
+
+    def stop(self) -> None:
+        """通知所有进程结束（推理进程会先上报已有的计数结果）"""
+        self._stop.set()
+
+    def run(self) -> Dict:
+        """运行直到所有视频源结束或调用 stop()，返回每路的计数结果和运行统计"""
+        model_path = self.model_path
+        if self.backend == "onnx" and self.detector_factory is None:
+            model_path = export_onnx(model_path, MODEL_CONFIG["imgsz"], MODEL_CONFIG["export_dir"])  # 各进程共用导出结果
+        rings = [FrameRing.create(probe_frame_shape(camera['source']), self.slots) for camera in self.cameras]
+        results = self._context.Queue()
+        decoders = [self._start_decoder(camera, ring) for camera, ring in zip(self.cameras, rings)]
+        restart_at: List[Optional[float]] = [None] * len(self.cameras)
+
+        workers = []
+        for worker_idx in range(self.workers):
+            assigned = [dict(camera, ring=ring.spec)
+                        for idx, (camera, ring) in enumerate(zip(self.cameras, rings))
+                        if idx % self.workers == worker_idx]
+            process = self._context.Process(
+                target=_inference_main, name=f"inference-{worker_idx}",
+                args=(assigned, model_path, self.backend, self.threads, self.detector_factory, self.max_batch,
+                      self.event_format, self.output_dir, results, self._stop))
+            process.start()
+            workers.append(process)
+
+        start = time.perf_counter()
+        cameras = {}
+        try:
+            while len(cameras) < len(self.cameras):
+                try:
+                    result = results.get(timeout=0.2)
+                    cameras[result['camera']] = result
+                    continue
+                except queue.Empty:
+                    pass
+                if not any(process.is_alive() for process in workers):
+                    break  # 推理进程异常退出
+                for idx, (camera, ring) in enumerate(zip(self.cameras, rings)):
+                    self._supervise(idx, camera, ring, decoders, restart_at)
+        except KeyboardInterrupt:
+            self.stop()
+            # 推理进程收到停止信号后上报结果
+            while len(cameras) < len(self.cameras) and any(process.is_alive() for process in workers):
+                try:
+                    result = results.get(timeout=0.5)
+                    cameras[result['camera']] = result
+                except queue.Empty:
+                    pass
+        finally:
+            self.stop()
+            for process in workers + [d for d in decoders if d is not None]:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            elapsed = time.perf_counter() - start
+            for camera, ring in zip(self.cameras, rings):
+                if camera['name'] in cameras:
+                    cameras[camera['name']]['dropped'] = ring.dropped
+                    cameras[camera['name']]['restarts'] = self.restarts[camera['name']]
+                ring.close()
+
+        frames = sum(result['frames'] for result in cameras.values())
+        return {
+            'cameras': cameras,
+            'frames': frames,
+            'seconds': elapsed,
+            'fps': frames / elapsed if elapsed > 0 else 0.0
+        }
+
+    def _start_decoder(self, camera: Dict, ring: FrameRing):
+        policy = self.policy
+        if policy == "auto":
+            policy = "block" if _is_file(camera['source']) else "drop"
+        process = self._context.Process(target=_decoder_main, name=f"decoder-{camera['name']}",
+                                        args=(camera['source'], ring.spec, policy, self._stop))
+        process.start()
+        return process
+
+    def _supervise(self, idx: int, camera: Dict, ring: FrameRing, decoders: List, restart_at: List) -> None:
+        """检查一路解码进程，异常退出时按延迟重启，超过次数后结束该路"""
+        process = decoders[idx]
+        if process is not None and (process.is_alive() or ring.closed):
+            return
+        if process is not None:
+            process.join()
+            decoders[idx] = None
+            if self.restarts[camera['name']] >= self.max_restarts:
+                print(f"[{camera['name']}] 解码进程已重启 {self.max_restarts} 次，停止该路")
+                ring.close_writer()
+                return
+            print(f"[{camera['name']}] 解码进程异常退出（状态 {process.exitcode}），"
+                  f"{self.restart_delay:g} 秒后重启")
+            restart_at[idx] = time.monotonic() + self.restart_delay
+        elif restart_at[idx] is not None and time.monotonic() >= restart_at[idx]:
+            self.restarts[camera['name']] += 1
+            restart_at[idx] = None
+            decoders[idx] = self._start_decoder(camera, ring)
@@ -3,15 +3,20 @@
 用于统计车辆穿越检测线的数量和分类
 """
 
-from typing import Dict, List, Set
+import numpy as np
+from typing import Dict, List, Optional, Set
 from .vehicle_tracker import VehicleTracker
+from .flow_stats import FlowAggregator
 
 
 class TrafficCounter:
     """车流量计数器"""
     
-    def __init__(self, lines: List[Dict]):
+    def __init__(self, lines: List[Dict], verbose: bool = True, event_sink=None,
+                 flow_config: Optional[Dict] = None):
         self.lines = lines
+        self.verbose = verbose  # 是否在控制台打印每次穿越
+        self.event_sink = event_sink  # 穿越事件写入器（EventSink），为空时不记录事件
         self.line_counts = [0] * len(lines)  # 每条线的计数
         self.line_passed_ids = [set() for _ in range(len(lines))]  # 每条线已通过的车辆ID
         
@@ -21,6 +26,26 @@ class TrafficCounter:
             self.line_class_counts.append({
                 'car': 0, 'motorcycle': 0, 'bus': 0, 'truck': 0
             })
+        
+        # 分时段统计（FLOW_CONFIG 格式），为空时只保留累计值
+        self.flow = None
+        self.flow_windows = []
+        if flow_config and flow_config.get("enabled", True):
+            self.flow_windows = list(flow_config["windows_minutes"])
+            self.flow = FlowAggregator(
+                [line_data['name'] for line_data in lines],
+                ['car', 'motorcycle', 'bus', 'truck'],
+                bin_seconds=flow_config["bin_seconds"],
+                max_window_seconds=max(self.flow_windows) * 60,
+                clock=flow_config["clock"]
+            )
+        
+        # 预先计算检测线几何（批量检测使用）
+        points = np.array([line_data['points'] for line_data in lines], dtype=np.float64).reshape(-1, 2, 2)
+        self._line_start = points[:, 0]                    # (L, 2)
+        self._line_end = points[:, 1]                      # (L, 2)
+        self._line_vec = self._line_end - self._line_start # (L, 2)
+        self._line_length = np.hypot(self._line_vec[:, 0], self._line_vec[:, 1])
     
     def check_crossing(self, track_id: int, current_pos, prev_pos, cls_id: int, 
                       vehicle_tracker: VehicleTracker) -> None:
@@ -36,7 +61,8 @@ class TrafficCounter:
             if track_id not in self.line_passed_ids[line_idx] and prev_pos is not None:
                 # 使用轨迹穿越检测
                 if vehicle_tracker.is_crossing_line(prev_pos, current_pos, line_start, line_end):
-                    self._record_crossing(track_id, line_idx, line_data, vehicle_type)
+                    self._record_crossing(track_id, line_idx, line_data, vehicle_type,
+                                          vehicle_tracker, prev_pos, current_pos)
                 
                 # 备用方案：距离检测
                 else:
@@ -47,18 +73,84 @@ class TrafficCounter:
                     
                     if dist < 8:  # 8像素阈值
                         # 检查车辆是否从检测线的一侧移动到另一侧
-                        if track_id in vehicle_tracker.vehicle_tracks and len(vehicle_tracker.vehicle_tracks[track_id]) >= 2:
-                            prev_side = vehicle_tracker.get_line_side(
-                                vehicle_tracker.vehicle_tracks[track_id][-2], line_start, line_end
-                            )
+                        last_pos = vehicle_tracker.get_previous_position(track_id)
+                        if last_pos is not None:
+                            prev_side = vehicle_tracker.get_line_side(last_pos, line_start, line_end)
                             curr_side = vehicle_tracker.get_line_side(current_pos, line_start, line_end)
                             
                             # 如果符号不同，说明穿越了检测线
                             if prev_side * curr_side < 0:
-                                self._record_crossing(track_id, line_idx, line_data, vehicle_type)
+                                self._record_crossing(track_id, line_idx, line_data, vehicle_type,
+                                                      vehicle_tracker, last_pos, current_pos)
+    
+    def check_crossings(self, track_ids, current_pos, prev_pos, cls_ids, 
+                        vehicle_tracker: VehicleTracker) -> None:
+        """批量检查一帧内所有轨迹是否穿越检测线，结果与逐个调用 check_crossing 相同
+        
+        track_ids: (N,)；current_pos / prev_pos: (N, 2)，没有前一位置的行填 NaN；cls_ids: (N,)。
+        调用前各轨迹应已通过 update_tracks 加入当前位置。
+        """
+        if self.flow is not None:
+            self.flow.advance(vehicle_tracker.timestamp)
+        
+        current_pos = np.asarray(current_pos, dtype=np.float64).reshape(-1, 2)
+        prev_pos = np.asarray(prev_pos, dtype=np.float64).reshape(-1, 2)
+        if len(current_pos) == 0 or len(self.lines) == 0:
+            return
+        
+        # 轨迹线段 (N, 1) 与检测线 (1, L) 广播为 (N, L)
+        x1, y1 = prev_pos[:, 0:1], prev_pos[:, 1:2]
+        x2, y2 = current_pos[:, 0:1], current_pos[:, 1:2]
+        x3, y3 = self._line_start[:, 0], self._line_start[:, 1]
+        x4, y4 = self._line_end[:, 0], self._line_end[:, 1]
+        
+        # 线段相交（与 VehicleTracker.is_crossing_line 相同的公式）
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denom = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+            t = ((x1 - x3) * (y3 - y4) - (y1 - y3) * (x3 - x4)) / denom
+            u = -((x1 - x2) * (y1 - y3) - (y1 - y2) * (x1 - x3)) / denom
+            crossing = (np.abs(denom) >= 1e-10) & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+            
+            # 备用方案的候选：当前位置到检测线的距离小于阈值
+            dist = np.abs((y4 - y3) * x2 - (x4 - x3) * y2 + x4 * y3 - y4 * x3) / self._line_length
+            near = dist < 8
+        
+        has_prev = ~np.isnan(prev_pos).any(axis=1)[:, None]
+        candidates = np.nonzero(has_prev & (crossing | near))
+        
+        # 候选很少，逐个处理已通过ID和侧向判断，顺序与逐轨迹、逐线检查一致
+        for row, line_idx in zip(*candidates):
+            track_id = track_ids[row]
+            if track_id in self.line_passed_ids[line_idx]:
+                continue
+            
+            line_data = self.lines[line_idx]
+            position = (current_pos[row, 0], current_pos[row, 1])
+            if crossing[row, line_idx]:
+                last_pos = (prev_pos[row, 0], prev_pos[row, 1])
+            else:
+                last_pos = vehicle_tracker.get_previous_position(track_id)
+                if last_pos is None:
+                    continue
+                line_start, line_end = line_data['points']
+                prev_side = vehicle_tracker.get_line_side(last_pos, line_start, line_end)
+                curr_side = vehicle_tracker.get_line_side(position, line_start, line_end)
+                if prev_side * curr_side >= 0:
+                    continue
+            
+            vehicle_type = vehicle_tracker.get_vehicle_type(int(cls_ids[row]))
+            self._record_crossing(track_id, line_idx, line_data, vehicle_type,
+                                  vehicle_tracker, last_pos, position)
     
-    def _record_crossing(self, track_id: int, line_idx: int, line_data: Dict, vehicle_type: str) -> None:
-        """记录车辆穿越检测线"""
+    def _record_crossing(self, track_id: int, line_idx: int, line_data: Dict, vehicle_type: str,
+                         vehicle_tracker: Optional[VehicleTracker] = None, prev_pos=None,
+                         current_pos=None, timestamp: Optional[float] = None, frame_idx: Optional[int] = None,
+                         direction: Optional[int] = None) -> None:
+        """记录车辆穿越检测线
+        
+        给出 vehicle_tracker 时时间、帧号取自追踪器，方向由穿越前后的位置计算；
+        否则使用传入的 timestamp、frame_idx 和 direction。
+        """
         self.line_passed_ids[line_idx].add(track_id)
         self.line_counts[line_idx] += 1
         
@@ -66,7 +158,41 @@ class TrafficCounter:
         if vehicle_type in self.line_class_counts[line_idx]:
             self.line_class_counts[line_idx][vehicle_type] += 1
         
-        print(f"车辆 ID-{track_id} ({vehicle_type}) 穿越了 {line_data['name']}! 该线计数: {self.line_counts[line_idx]}")
+        if vehicle_tracker is not None:
+            timestamp, frame_idx = vehicle_tracker.timestamp, vehicle_tracker.frame_idx
+            track_id = int(track_id)
+            line_start, line_end = line_data['points']
+            side = vehicle_tracker.get_line_side(current_pos, line_start, line_end)
+            if side == 0:
+                side = -vehicle_tracker.get_line_side(prev_pos, line_start, line_end)
+            direction = 1 if side > 0 else -1
+        
+        if self.flow is not None:
+            self.flow.record(timestamp, line_idx, vehicle_type)
+        
+        # 结构化事件交给后台线程写入
+        if self.event_sink is not None:
+            self.event_sink.emit(timestamp, frame_idx, track_id, vehicle_type, line_data['name'], direction)
+        
+        if self.verbose:
+            print(f"车辆 ID-{track_id} ({vehicle_type}) 穿越了 {line_data['name']}! 该线计数: {self.line_counts[line_idx]}")
+    
+    def add_crossing(self, track_id, line_idx: int, vehicle_type: str, timestamp: Optional[float] = None,
+                     frame_idx: Optional[int] = None, direction: Optional[int] = None) -> bool:
+        """记录一次在其他地方检测到的穿越（如分段处理后合并），同一车辆在同一条线只计一次，返回是否计入
+        
+        与 check_crossings 检测到的穿越一样更新分时段统计并写入事件。
+        """
+        if track_id in self.line_passed_ids[line_idx]:
+            return False
+        self._record_crossing(track_id, line_idx, self.lines[line_idx], vehicle_type,
+                              timestamp=timestamp, frame_idx=frame_idx, direction=direction)
+        return True
+    
+    def forget_tracks(self, track_ids) -> None:
+        """从各线的已通过ID集合中移除已淘汰的车辆，保持内存有界"""
+        for passed_ids in self.line_passed_ids:
+            passed_ids.difference_update(track_ids)
     
     def get_total_count(self) -> int:
         """获取总车辆数"""
@@ -80,6 +206,43 @@ class TrafficCounter:
         """获取指定线的分类计数"""
         return self.line_class_counts[line_idx]
     
+    def get_flow(self, minutes: float) -> Dict[str, Dict]:
+        """最近 minutes 分钟内每条线的计数和每小时流量（未启用分时段统计时返回空字典）"""
+        if self.flow is None:
+            return {}
+        return self.flow.window_summary(minutes * 60)
+    
+    def snapshot(self) -> "TrafficCounter":
+        """复制当前计数（不含已通过的ID集合），供其他线程绘制统计信息"""
+        snap = TrafficCounter.__new__(TrafficCounter)
+        snap.lines = self.lines
+        snap.verbose = False
+        snap.event_sink = None
+        snap.flow = None
+        snap.flow_windows = []
+        snap.line_counts = list(self.line_counts)
+        snap.line_passed_ids = []
+        snap.line_class_counts = [dict(class_counts) for class_counts in self.line_class_counts]
+        return snap
+    
+    def to_dict(self) -> Dict:
+        """导出统计结果（用于写入报告文件）"""
+        result = {
+            'total': self.get_total_count(),
+            'lines': [
+                {
+                    'name': line_data['name'],
+                    'points': [list(point) for point in line_data['points']],
+                    'count': self.line_counts[line_idx],
+                    'classes': dict(self.line_class_counts[line_idx])
+                }
+                for line_idx, line_data in enumerate(self.lines)
+            ]
+        }
+        if self.flow is not None:
+            result['flow'] = {f"{minutes}min": self.get_flow(minutes) for minutes in self.flow_windows}
+        return result
+    
     def print_report(self) -> None:
         """打印统计报告"""
         print("\n" + "="*50)
@@ -116,4 +279,13 @@ class TrafficCounter:
                 class_percentage = (total_class_count / total_vehicles * 100) if total_vehicles > 0 else 0
                 print(f"{vehicle_class}: {total_class_count} 辆 ({class_percentage:.1f}%)")
         
+        if self.flow is not None:
+            print("-" * 30)
+            print("最近时段车流量:")
+            for minutes in self.flow_windows:
+                flow = self.get_flow(minutes)
+                details = ", ".join(f"{name} {item['total']} 辆 ({item['per_hour']:.0f} 辆/小时)"
+                                    for name, item in flow.items())
+                print(f"最近 {minutes} 分钟: {details}")
+        
         print("="*50)
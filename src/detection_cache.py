@@ -0,0 +1,156 @@
+"""
+检测缓存模块
+将每帧的追踪结果（框、置信度、类别、轨迹ID）写入可内存映射的磁盘缓存，
+修改检测线后可直接回放缓存重新计数，无需再次运行模型
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .counter import TrafficCounter
+from .detector import Detections
+from .vehicle_tracker import VehicleTracker
+
+
+TRACK_DTYPE = np.dtype([
+    ('frame', np.int32),
+    ('track_id', np.int32),
+    ('x1', np.float32), ('y1', np.float32), ('x2', np.float32), ('y2', np.float32),
+    ('conf', np.float32),
+    ('cls', np.int16),
+])
+
+_HASH_CHUNK = 8 * 1024 * 1024  # 视频只哈希首尾各 8MB 和文件大小
+
+
+def file_fingerprint(path: str) -> str:
+    """计算文件指纹（大小 + 首尾数据块），长视频也能快速计算"""
+    sha = hashlib.sha1()
+    size = os.path.getsize(path)
+    sha.update(str(size).encode())
+    with open(path, "rb") as f:
+        sha.update(f.read(_HASH_CHUNK))
+        if size > _HASH_CHUNK:
+            f.seek(max(size - _HASH_CHUNK, _HASH_CHUNK))
+            sha.update(f.read(_HASH_CHUNK))
+    return sha.hexdigest()
+
+
+def cache_key(video_path: str, model_path: str, thresholds: Dict, detection: Optional[Dict] = None) -> str:
+    """由视频指纹、模型、阈值和检测方式（后端、输入尺寸、分块/区域裁剪/运动门控/检测间隔配置）生成缓存键"""
+    model_id = file_fingerprint(model_path) if os.path.isfile(model_path) else model_path
+    payload = json.dumps({
+        'video': file_fingerprint(video_path),
+        'model': model_id,
+        'thresholds': thresholds,
+        'detection': detection
+    }, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+class DetectionCacheWriter:
+    """逐帧追加写入缓存，关闭时生成 .npy 文件"""
+
+    def __init__(self, cache_dir: str, meta: Dict):
+        self.cache_dir = cache_dir
+        self.meta = meta
+        os.makedirs(cache_dir, exist_ok=True)
+        self._rows_path = os.path.join(cache_dir, "tracks.bin.tmp")
+        self._rows = open(self._rows_path, "wb")
+        self._row_count = 0
+        self._offsets = [0]
+        self._timestamps = []
+
+    def add_frame(self, tracks: Detections, timestamp: Optional[float] = None) -> None:
+        """写入一帧的追踪结果"""
+        rows = np.empty(len(tracks), dtype=TRACK_DTYPE)
+        rows['frame'] = len(self._timestamps)
+        if len(tracks):
+            rows['track_id'] = tracks.track_ids
+            rows['x1'], rows['y1'], rows['x2'], rows['y2'] = tracks.xyxy.T
+            rows['conf'] = tracks.conf
+            rows['cls'] = tracks.cls
+        self._rows.write(rows.tobytes())
+        self._row_count += len(rows)
+        self._offsets.append(self._row_count)
+        self._timestamps.append(np.nan if timestamp is None else timestamp)
+
+    def close(self) -> str:
+        """生成 tracks.npy / index.npy / timestamps.npy / meta.json，返回缓存目录"""
+        self._rows.close()
+        with open(os.path.join(self.cache_dir, "tracks.npy"), "wb") as out:
+            header = {'descr': np.lib.format.dtype_to_descr(TRACK_DTYPE),
+                      'fortran_order': False, 'shape': (self._row_count,)}
+            np.lib.format.write_array_header_2_0(out, header)
+            with open(self._rows_path, "rb") as rows:
+                while True:
+                    chunk = rows.read(_HASH_CHUNK)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+        os.remove(self._rows_path)
+
+        np.save(os.path.join(self.cache_dir, "index.npy"), np.asarray(self._offsets, dtype=np.int64))
+        np.save(os.path.join(self.cache_dir, "timestamps.npy"), np.asarray(self._timestamps, dtype=np.float64))
+
+        meta = dict(self.meta, frames=len(self._timestamps), rows=self._row_count, created=time.time())
+        with open(os.path.join(self.cache_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        return self.cache_dir
+
+
+class DetectionCache:
+    """只读缓存，追踪结果以内存映射方式加载"""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.tracks = np.load(os.path.join(cache_dir, "tracks.npy"), mmap_mode="r")
+        self.index = np.load(os.path.join(cache_dir, "index.npy"))
+        self.timestamps = np.load(os.path.join(cache_dir, "timestamps.npy"))
+
+    @staticmethod
+    def exists(cache_dir: str) -> bool:
+        """缓存是否已完整生成"""
+        return os.path.isfile(os.path.join(cache_dir, "meta.json"))
+
+    def __len__(self) -> int:
+        return len(self.index) - 1
+
+    def frame_rows(self, frame_idx: int) -> np.ndarray:
+        """某一帧的原始记录"""
+        return self.tracks[self.index[frame_idx]:self.index[frame_idx + 1]]
+
+    def frame(self, frame_idx: int) -> Detections:
+        """某一帧的追踪结果"""
+        rows = self.frame_rows(frame_idx)
+        xyxy = np.stack([rows['x1'], rows['y1'], rows['x2'], rows['y2']], axis=1)
+        return Detections(xyxy, rows['conf'], rows['cls'], rows['track_id'])
+
+    def iter_frames(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, float, Detections]]:
+        """按顺序遍历 (帧号, 时间戳, 追踪结果)"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for frame_idx in range(start, stop):
+            timestamp = self.timestamps[frame_idx]
+            yield frame_idx, None if np.isnan(timestamp) else float(timestamp), self.frame(frame_idx)
+
+
+def replay_cache(cache: DetectionCache, lines, vehicle_tracker: Optional[VehicleTracker] = None,
+                 counter: Optional[TrafficCounter] = None) -> TrafficCounter:
+    """用新的检测线回放缓存，逻辑与 TrafficFlowCounter.update_counts 相同"""
+    vehicle_tracker = vehicle_tracker or VehicleTracker()
+    counter = counter or TrafficCounter(lines)
+    for _, timestamp, tracks in cache.iter_frames():
+        evicted = vehicle_tracker.start_frame(timestamp)
+        if evicted:
+            counter.forget_tracks(evicted)
+        centers = tracks.centers()
+        prev_positions = vehicle_tracker.update_tracks_batch(tracks.track_ids, centers)
+        counter.check_crossings(tracks.track_ids, centers, prev_positions, tracks.cls, vehicle_tracker)
+    return counter
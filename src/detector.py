@@ -0,0 +1,271 @@
+"""
+检测模块
+封装YOLO推理，每帧只做一次检测，结果按不同阈值分发给追踪、计数和显示。
+推理后端可选 PyTorch（ultralytics）或 ONNX Runtime（CPU），两者返回相同格式的 Detections
+"""
+
+import hashlib
+import os
+import shutil
+
+import cv2
+import numpy as np
+from typing import List, Optional
+
+
+DETECTOR_BACKENDS = ("torch", "onnx")
+
+
+class Detections:
+    """单帧检测结果
+
+    与 ultralytics ``Boxes.cpu().numpy()`` 的接口兼容（conf / cls / xyxy / xywh，
+    支持布尔索引），可以直接送入 BYTETracker。
+    """
+
+    def __init__(self, xyxy=None, conf=None, cls=None, track_ids=None):
+        self.xyxy = np.asarray(xyxy if xyxy is not None else [], dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf if conf is not None else [], dtype=np.float32).reshape(-1)
+        self.cls = np.asarray(cls if cls is not None else [], dtype=np.int32).reshape(-1)
+        self.track_ids = None if track_ids is None else np.asarray(track_ids, dtype=np.int64).reshape(-1)
+
+    @classmethod
+    def from_result(cls, result) -> "Detections":
+        """从 ultralytics 的单帧 Results 构造"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls()
+        boxes = boxes.cpu().numpy()
+        return cls(boxes.xyxy, boxes.conf, boxes.cls)
+
+    @classmethod
+    def from_tracks(cls, tracks: np.ndarray) -> "Detections":
+        """从 BYTETracker 输出 [x1, y1, x2, y2, track_id, score, cls, idx] 构造"""
+        if len(tracks) == 0:
+            return cls(track_ids=[])
+        return cls(tracks[:, :4], tracks[:, 5], tracks[:, 6], tracks[:, 4])
+
+    @property
+    def xywh(self) -> np.ndarray:
+        """中心点+宽高格式的检测框"""
+        xywh = np.empty_like(self.xyxy)
+        xywh[:, 0] = (self.xyxy[:, 0] + self.xyxy[:, 2]) / 2
+        xywh[:, 1] = (self.xyxy[:, 1] + self.xyxy[:, 3]) / 2
+        xywh[:, 2] = self.xyxy[:, 2] - self.xyxy[:, 0]
+        xywh[:, 3] = self.xyxy[:, 3] - self.xyxy[:, 1]
+        return xywh
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    def __getitem__(self, index) -> "Detections":
+        track_ids = None if self.track_ids is None else self.track_ids[index]
+        return Detections(self.xyxy[index], self.conf[index], self.cls[index], track_ids)
+
+    def filter(self, min_conf: float = 0.0, max_conf: Optional[float] = None) -> "Detections":
+        """按置信度区间 [min_conf, max_conf) 筛选"""
+        mask = self.conf >= min_conf
+        if max_conf is not None:
+            mask &= self.conf < max_conf
+        return self[mask]
+
+    def int_boxes(self) -> np.ndarray:
+        """整数像素坐标的检测框"""
+        return self.xyxy.astype(int)
+
+    def centers(self) -> np.ndarray:
+        """检测框中心点（整数像素坐标）"""
+        boxes = self.int_boxes()
+        return np.stack([(boxes[:, 0] + boxes[:, 2]) // 2, (boxes[:, 1] + boxes[:, 3]) // 2], axis=1)
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """两组框两两之间的 IoU，形状 (len(a), len(b))"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nan_to_num(inter / (area_a[:, None] + area_b[None, :] - inter))
+
+
+class YOLODetector:
+    """YOLO检测器
+
+    以所有下游阈值中的最小值做一次推理，由调用方再按各自阈值筛选。
+    """
+
+    def __init__(self, model_path: str = "yolov8m.pt", classes: Optional[List[int]] = None,
+                 conf: float = 0.1, imgsz: int = 640, threads: Optional[int] = None):
+        from ultralytics import YOLO
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = YOLO(model_path)
+        self.model_path = model_path
+        self.classes = classes if classes is not None else [2, 3, 5, 7]
+        self.conf = conf
+        self.imgsz = imgsz
+
+    def detect(self, frame, imgsz: Optional[int] = None) -> Detections:
+        """对单帧做一次推理（imgsz 临时覆盖推理输入尺寸）"""
+        results = self.model(frame, classes=self.classes, conf=self.conf, imgsz=imgsz or self.imgsz, verbose=False)
+        return Detections.from_result(results[0])
+
+    def detect_batch(self, frames: List, imgsz: Optional[int] = None) -> List[Detections]:
+        """多帧（可来自不同视频流）合并为一次批量推理"""
+        if not frames:
+            return []
+        results = self.model(frames, classes=self.classes, conf=self.conf, imgsz=imgsz or self.imgsz, verbose=False)
+        return [Detections.from_result(result) for result in results]
+
+
+class ONNXDetector:
+    """ONNX Runtime 检测器（CPU）
+
+    预处理（按最小矩形 letterbox）、NMS 和坐标还原与 ultralytics 的预测流程一致，
+    因此与 YOLODetector 对同一帧给出相同的检测结果（浮点误差范围内），运行时不依赖 PyTorch。
+    模型需要以动态输入尺寸导出（见 export_onnx）。
+    """
+
+    def __init__(self, model_path: str, classes: Optional[List[int]] = None, conf: float = 0.1,
+                 imgsz: int = 640, threads: Optional[int] = None, iou: float = 0.7, max_det: int = 300):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.model_path = model_path
+        self.classes = classes if classes is not None else [2, 3, 5, 7]
+        self.conf = conf
+        self.imgsz = imgsz
+        self.iou = iou
+        self.max_det = max_det
+        self.stride = 32
+
+    def detect(self, frame, imgsz: Optional[int] = None) -> Detections:
+        """对单帧做一次推理（imgsz 临时覆盖推理输入尺寸）"""
+        return self.detect_batch([frame], imgsz)[0]
+
+    def detect_batch(self, frames: List, imgsz: Optional[int] = None) -> List[Detections]:
+        """多帧合并为一次推理（尺寸不同的帧按正方形 letterbox，与 ultralytics 相同）"""
+        if not frames:
+            return []
+        blob = self.preprocess(frames, imgsz)
+        predictions = self.session.run(None, {self.input_name: blob})[0]
+        return [self._postprocess(prediction, blob.shape[2:], frame.shape[:2])
+                for prediction, frame in zip(predictions, frames)]
+
+    def preprocess(self, frames: List, imgsz: Optional[int] = None) -> np.ndarray:
+        """BGR 帧 -> 模型输入 (N, 3, H, W)，RGB、归一化到 [0, 1]"""
+        auto = len({frame.shape for frame in frames}) == 1
+        images = np.stack([self._letterbox(frame, auto, imgsz or self.imgsz) for frame in frames])
+        return np.ascontiguousarray(images[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+    def _letterbox(self, frame, auto: bool, imgsz: int) -> np.ndarray:
+        """等比缩放后填充灰边；auto 时只填充到 stride 的整数倍"""
+        height, width = frame.shape[:2]
+        ratio = min(imgsz / height, imgsz / width)
+        new_w, new_h = round(width * ratio), round(height * ratio)
+        dw, dh = imgsz - new_w, imgsz - new_h
+        if auto:
+            dw, dh = dw % self.stride, dh % self.stride
+        dw, dh = dw / 2, dh / 2
+        if (width, height) != (new_w, new_h):
+            frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        return cv2.copyMakeBorder(frame, round(dh - 0.1), round(dh + 0.1), round(dw - 0.1), round(dw + 0.1),
+                                  cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+    def _postprocess(self, prediction: np.ndarray, input_shape, frame_shape) -> Detections:
+        """(4 + 类别数, N) 的原始输出 -> 置信度筛选、按类别 NMS、还原到原图坐标"""
+        scores = prediction[4:]
+        cls = scores.argmax(0)
+        conf = scores[cls, np.arange(scores.shape[1])]
+        keep = (conf > self.conf) & np.isin(cls, self.classes)
+        if not keep.any():
+            return Detections()
+        xywh, conf, cls = prediction[:4, keep].T, conf[keep], cls[keep]
+        boxes = np.empty_like(xywh)
+        boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+        # 按类别 NMS：每个类别的框平移到互不重叠的区域后统一做一次 NMS
+        order = conf.argsort()[::-1][:30000]
+        boxes, conf, cls = boxes[order], conf[order], cls[order]
+        kept = _nms(boxes + cls[:, None] * 7680.0, conf, self.iou)[:self.max_det]
+        boxes, conf, cls = boxes[kept], conf[kept], cls[kept]
+
+        # 去掉填充、按缩放比例还原并裁剪到画面内
+        height, width = frame_shape
+        gain = min(input_shape[0] / height, input_shape[1] / width)
+        new_h, new_w = round(height * gain), round(width * gain)
+        pad_x = round((input_shape[1] - new_w) / 2 - 0.1)
+        pad_y = round((input_shape[0] - new_h) / 2 - 0.1)
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad_x) / (new_w / width)).clip(0, width)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad_y) / (new_h / height)).clip(0, height)
+        return Detections(boxes, conf, cls)
+
+
+def _nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """贪心 NMS，boxes 已按分数从高到低排序，返回保留的下标"""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.arange(len(boxes))
+    kept = []
+    while len(order):
+        i = order[0]
+        kept.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(kept, dtype=np.int64)
+
+
+def export_onnx(model_path: str, imgsz: int = 640, cache_dir: str = "output/models") -> str:
+    """把 PyTorch 权重导出为动态输入尺寸的 ONNX 模型并缓存，已导出时直接返回缓存路径
+
+    缓存文件名包含权重文件的路径、大小和修改时间的摘要，权重更新后会重新导出。
+    传入的已是 .onnx 文件时原样返回。
+    """
+    if model_path.lower().endswith(".onnx"):
+        return model_path
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    if os.path.isfile(model_path):
+        stat = os.stat(model_path)
+        identity = f"{os.path.abspath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    else:
+        identity = model_path  # 由 ultralytics 按名称下载的官方权重
+    digest = hashlib.sha1(f"{identity}:{imgsz}".encode()).hexdigest()[:10]
+    cached = os.path.join(cache_dir, f"{stem}_{imgsz}_{digest}.onnx")
+    if os.path.isfile(cached):
+        return cached
+
+    from ultralytics import YOLO
+
+    print(f"导出 ONNX 模型（只需一次）: {model_path} -> {cached}")
+    exported = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, verbose=False)
+    os.makedirs(cache_dir, exist_ok=True)
+    shutil.move(exported, cached)
+    return cached
+
+
+def create_detector(backend: str = "torch", model_path: str = "yolov8m.pt", classes: Optional[List[int]] = None,
+                    conf: float = 0.1, imgsz: int = 640, threads: Optional[int] = None,
+                    cache_dir: str = "output/models"):
+    """按后端名称创建检测器：torch 使用 ultralytics，onnx 先导出（缓存）再用 ONNX Runtime 推理"""
+    if backend == "torch":
+        return YOLODetector(model_path, classes=classes, conf=conf, imgsz=imgsz, threads=threads)
+    if backend == "onnx":
+        return ONNXDetector(export_onnx(model_path, imgsz, cache_dir), classes=classes, conf=conf,
+                            imgsz=imgsz, threads=threads)
+    raise ValueError(f"不支持的推理后端: {backend}（可选 {', '.join(DETECTOR_BACKENDS)}）")
@@ -0,0 +1,171 @@
+"""
+穿越事件输出模块
+把每次穿越记录为结构化事件，由后台线程批量写入 JSONL / CSV / Parquet / 文本文件，
+处理循环只做一次入队操作，不承担文件和控制台 I/O
+"""
+
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+EVENT_FIELDS = ('timestamp', 'frame', 'track_id', 'class', 'line', 'direction')
+
+# OUTPUT_CONFIG["report_format"] 到事件文件格式和扩展名的对应关系
+EVENT_FORMATS = {
+    'txt': ('txt', '.txt'),
+    'json': ('jsonl', '.jsonl'),
+    'jsonl': ('jsonl', '.jsonl'),
+    'csv': ('csv', '.csv'),
+    'parquet': ('parquet', '.parquet'),
+}
+
+_CLOSE = object()  # 关闭标记
+
+
+def event_path(output_dir: str, name: str, report_format: str) -> str:
+    """事件文件路径：<output_dir>/<name>_events.<ext>"""
+    if report_format not in EVENT_FORMATS:
+        raise ValueError(f"不支持的事件格式: {report_format}（可选 {', '.join(EVENT_FORMATS)}）")
+    return os.path.join(output_dir, f"{name}_events{EVENT_FORMATS[report_format][1]}")
+
+
+class EventSink:
+    """缓冲的穿越事件写入器
+
+    emit() 只把事件元组放入队列；后台线程每隔 flush_interval 秒或积累 batch_size 条时
+    批量写入并刷新文件。事件元组字段顺序见 EVENT_FIELDS，direction 为 1 表示
+    车辆穿越后位于检测线（起点→终点）的右侧（图像坐标），-1 表示左侧；帧号从 1 开始。
+    """
+
+    def __init__(self, path: str, report_format: str = "json", flush_interval: float = 1.0,
+                 batch_size: int = 1000):
+        if report_format not in EVENT_FORMATS:
+            raise ValueError(f"不支持的事件格式: {report_format}（可选 {', '.join(EVENT_FORMATS)}）")
+        self.path = path
+        self.format = EVENT_FORMATS[report_format][0]
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.event_count = 0
+
+        if self.format == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("Parquet 格式需要安装 pyarrow: pip install pyarrow")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._csv = None
+        self._parquet = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="event-sink", daemon=True)
+        self._thread.start()
+
+    def emit(self, timestamp: Optional[float], frame: int, track_id: int, vehicle_type: str,
+             line_name: str, direction: int) -> None:
+        """记录一次穿越（线程安全，不阻塞）"""
+        self._queue.put((timestamp, frame, track_id, vehicle_type, line_name, direction))
+        self.event_count += 1
+
+    def close(self) -> None:
+        """写出剩余事件并关闭文件"""
+        if self._thread is None:
+            return
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._thread = None
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "EventSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        """后台线程：按间隔或批量大小写入"""
+        batch: List[Tuple] = []
+        deadline = time.monotonic() + self.flush_interval
+        closing = False
+        try:
+            self._open()
+            while not closing:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+                except queue.Empty:
+                    item = None
+                if item is _CLOSE:
+                    closing = True
+                elif item is not None:
+                    batch.append(item)
+                    if len(batch) < self.batch_size and time.monotonic() < deadline:
+                        continue
+                if batch:
+                    self._write(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+        except Exception as e:
+            self._error = e
+            # 出错后继续取走事件直到关闭，避免调用方等待
+            while self._queue.get() is not _CLOSE:
+                pass
+        finally:
+            self._close_file()
+
+    def _open(self) -> None:
+        if self.format == 'parquet':
+            return  # ParquetWriter 在第一批数据写入时创建
+        self._file = open(self.path, "w", encoding="utf-8", newline="")
+        if self.format == 'csv':
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(EVENT_FIELDS)
+
+    def _write(self, batch: List[Tuple]) -> None:
+        if self.format == 'jsonl':
+            self._file.write("".join(json.dumps(dict(zip(EVENT_FIELDS, event)), ensure_ascii=False) + "\n"
+                                     for event in batch))
+        elif self.format == 'csv':
+            self._csv.writerows(batch)
+        elif self.format == 'txt':
+            self._file.write("".join(
+                f"[{'-' if timestamp is None else f'{timestamp:.3f}'}] 帧 {frame}: 车辆 ID-{track_id} ({vehicle_type}) "
+                f"穿越了 {line_name} (方向 {direction:+d})\n"
+                for timestamp, frame, track_id, vehicle_type, line_name, direction in batch))
+        else:
+            self._write_parquet(batch)
+        if self._file is not None:
+            self._file.flush()
+
+    def _write_parquet(self, batch: List[Tuple]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = list(zip(*batch)) or [()] * len(EVENT_FIELDS)
+        table = pa.table({
+            'timestamp': pa.array(columns[0], pa.float64()),
+            'frame': pa.array(columns[1], pa.int64()),
+            'track_id': pa.array(columns[2], pa.int64()),
+            'class': pa.array(columns[3], pa.string()),
+            'line': pa.array(columns[4], pa.string()),
+            'direction': pa.array(columns[5], pa.int8()),
+        })
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.path, table.schema)
+        self._parquet.write_table(table)  # 每次刷新写入一个 row group
+
+    def _close_file(self) -> None:
+        if self.format == 'parquet' and self._parquet is None and self._error is None:
+            self._write_parquet([])  # 没有事件时也生成带表头的空文件
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
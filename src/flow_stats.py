@@ -0,0 +1,92 @@
+"""
+车流量时间统计模块
+按固定时间桶累计各检测线、各类别的穿越数，用定长环形缓冲保存每个桶结束时的累计值，
+"最近 N 分钟" 的流量只需两次查表相减，内存与运行时长无关
+"""
+
+import math
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class FlowAggregator:
+    """分时段车流量统计
+
+    时间轴被切成 bin_seconds 秒的桶，环形缓冲保存最近 max_window_seconds 内每个桶结束时的
+    累计计数。查询最近 N 秒时返回当前累计值减去 N 秒前那个桶结束时的累计值，精度为一个桶。
+    clock 为 "video" 时使用传入的视频时间戳，为 "wall" 时使用系统时间。
+    """
+
+    def __init__(self, line_names: List[str], classes: List[str], bin_seconds: float = 10.0,
+                 max_window_seconds: float = 900.0, clock: str = "video"):
+        if clock not in ("video", "wall"):
+            raise ValueError(f"不支持的时钟: {clock}（可选 video, wall）")
+        self.line_names = list(line_names)
+        self.classes = list(classes)
+        self.bin_seconds = bin_seconds
+        self.clock = clock
+        self.num_bins = int(math.ceil(max_window_seconds / bin_seconds)) + 1
+        self._class_index = {name: idx for idx, name in enumerate(self.classes)}
+
+        # 最后一列统计不在 classes 中的类别
+        shape = (len(self.line_names), len(self.classes) + 1)
+        self.totals = np.zeros(shape, dtype=np.int64)
+        self.cumulative = np.zeros((self.num_bins,) + shape, dtype=np.int64)
+        self.first_bin: Optional[int] = None
+        self.current_bin: Optional[int] = None
+
+    def advance(self, timestamp: Optional[float] = None) -> None:
+        """推进到给定时间（每帧调用，使没有穿越的时段也能正确衰减）"""
+        if self.clock == "wall" or timestamp is None:
+            timestamp = time.time()
+        bin_idx = int(timestamp // self.bin_seconds)
+        if self.current_bin is None:
+            self.first_bin = self.current_bin = bin_idx
+            return
+        if bin_idx <= self.current_bin:
+            return  # 时间戳回退或仍在当前桶内
+
+        # 关闭从当前桶到新桶之前的所有桶（间隔超过缓冲长度时只需写满一圈）
+        for closed in range(max(self.current_bin, bin_idx - self.num_bins), bin_idx):
+            self.cumulative[closed % self.num_bins] = self.totals
+        self.current_bin = bin_idx
+
+    def record(self, timestamp: Optional[float], line_idx: int, vehicle_type: str) -> None:
+        """记录一次穿越"""
+        self.advance(timestamp)
+        self.totals[line_idx, self._class_index.get(vehicle_type, len(self.classes))] += 1
+
+    def window_counts(self, seconds: float) -> np.ndarray:
+        """最近 seconds 秒（按桶取整，含当前桶）内的计数，形状 (线数, 类别数 + 1)"""
+        if self.current_bin is None:
+            return np.zeros_like(self.totals)
+        bins = max(int(round(seconds / self.bin_seconds)), 1)
+        if bins >= self.num_bins:
+            raise ValueError(f"查询窗口超过保存的时长 {(self.num_bins - 1) * self.bin_seconds:.0f} 秒")
+        start_bin = self.current_bin - bins
+        if start_bin < self.first_bin:
+            return self.totals.copy()
+        return self.totals - self.cumulative[start_bin % self.num_bins]
+
+    def window_summary(self, seconds: float) -> Dict[str, Dict]:
+        """最近 seconds 秒内每条线的总数、分类数和折算的每小时流量"""
+        counts = self.window_counts(seconds)
+        covered = self._covered_seconds(seconds)
+        result = {}
+        for line_idx, name in enumerate(self.line_names):
+            total = int(counts[line_idx].sum())
+            item = {'total': total}
+            item.update({cls: int(counts[line_idx, idx]) for idx, cls in enumerate(self.classes)})
+            item['per_hour'] = total * 3600 / covered if covered > 0 else 0.0
+            result[name] = item
+        return result
+
+    def _covered_seconds(self, seconds: float) -> float:
+        """窗口实际覆盖的时长（运行时间不足窗口长度时按实际时长折算）"""
+        if self.current_bin is None:
+            return 0.0
+        bins = max(int(round(seconds / self.bin_seconds)), 1)
+        elapsed_bins = self.current_bin - self.first_bin
+        return min(bins, elapsed_bins + 1) * self.bin_seconds
@@ -0,0 +1,121 @@
+"""
+共享内存帧环形缓冲模块
+一个写入进程（解码）和一个读取进程（推理）通过 multiprocessing.shared_memory 交换帧，
+读取方直接使用共享内存上的 NumPy 视图，不经过管道序列化
+"""
+
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+# 头部计数器（int64）
+_HEAD = 0       # 已写入的帧数
+_TAIL = 1       # 已释放的帧数
+_CLOSED = 2     # 写入方已结束（不会再有新帧）
+_DROPPED = 3    # 缓冲已满被丢弃的帧数
+_DECODED = 4    # 从视频源读取的帧数（重启解码进程时据此续读文件）
+_HEADER_FIELDS = 8
+
+
+class FrameRing:
+    """单写单读的帧环形缓冲
+
+    内存布局：头部计数器 | 每个槽位的时间戳 | slots 帧图像。写入方只修改 head，读取方只修改 tail，
+    写入方在图像和时间戳写完之后才推进 head，读取方在用完视图之后才推进 tail，因此不需要锁
+    （依赖 x86/ARM 上对齐 int64 的原子写和写入顺序）。读取方持有的槽位在 release 之前不会被覆盖。
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape: Tuple[int, ...], slots: int, owner: bool):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = owner  # 创建方负责 unlink
+        header_bytes = _HEADER_FIELDS * 8
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        self._timestamps = np.ndarray((slots,), dtype=np.float64, buffer=shm.buf, offset=header_bytes)
+        self._frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=shm.buf,
+                                  offset=header_bytes + slots * 8)
+
+    @classmethod
+    def create(cls, shape: Tuple[int, ...], slots: int = 8) -> "FrameRing":
+        """创建新的共享内存缓冲"""
+        size = _HEADER_FIELDS * 8 + slots * 8 + slots * int(np.prod(shape))
+        ring = cls(shared_memory.SharedMemory(create=True, size=size), shape, slots, owner=True)
+        ring._header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, shape: Tuple[int, ...], slots: int) -> "FrameRing":
+        """在其他进程中按名称打开已有的缓冲"""
+        return cls(shared_memory.SharedMemory(name=name), shape, slots, owner=False)
+
+    @property
+    def spec(self) -> Tuple[str, Tuple[int, ...], int]:
+        """传给子进程的 (名称, 形状, 槽位数)，用于 attach"""
+        return self.shm.name, self.shape, self.slots
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._header[_CLOSED])
+
+    @property
+    def dropped(self) -> int:
+        return int(self._header[_DROPPED])
+
+    @property
+    def decoded(self) -> int:
+        return int(self._header[_DECODED])
+
+    def pending(self) -> int:
+        """已写入但还未释放的帧数"""
+        return int(self._header[_HEAD] - self._header[_TAIL])
+
+    def finished(self) -> bool:
+        """写入方已结束且所有帧都已读完"""
+        return self.closed and self.pending() == 0
+
+    # ---- 写入方 ----
+
+    def put(self, frame: np.ndarray, timestamp: float) -> bool:
+        """写入一帧，缓冲已满时丢弃并返回 False（需要等待时由调用方轮询 full()）"""
+        head = int(self._header[_HEAD])
+        if head - int(self._header[_TAIL]) >= self.slots:
+            self._header[_DROPPED] += 1
+            self._header[_DECODED] += 1
+            return False
+        slot = head % self.slots
+        self._frames[slot] = frame
+        self._timestamps[slot] = timestamp
+        self._header[_HEAD] = head + 1
+        self._header[_DECODED] += 1
+        return True
+
+    def full(self) -> bool:
+        return self.pending() >= self.slots
+
+    def close_writer(self) -> None:
+        """标记不会再有新帧"""
+        self._header[_CLOSED] = 1
+
+    # ---- 读取方 ----
+
+    def peek(self, offset: int = 0) -> Optional[Tuple[np.ndarray, float]]:
+        """第 offset 个未释放的帧 (共享内存视图, 时间戳)，没有时返回 None"""
+        tail = int(self._header[_TAIL]) + offset
+        if tail >= int(self._header[_HEAD]):
+            return None
+        slot = tail % self.slots
+        return self._frames[slot], float(self._timestamps[slot])
+
+    def release(self, count: int = 1) -> None:
+        """释放最早的 count 个帧，槽位可被写入方复用（释放后视图不能再使用）"""
+        self._header[_TAIL] += count
+
+    def close(self) -> None:
+        """关闭本进程的映射，创建方同时删除共享内存"""
+        self._header = self._timestamps = self._frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,64 @@
+"""
+检测线配置模块
+从 JSON/YAML 文件加载或保存检测线定义，供无界面模式使用
+"""
+
+import json
+import os
+from typing import Dict, List
+
+from config.settings import LINE_CONFIG
+
+
+def load_lines(path: str) -> List[Dict]:
+    """从 JSON 或 YAML 文件加载检测线
+
+    文件内容可以是线的列表，也可以是包含 ``lines`` 键的字典；每条线需要
+    ``points``（两个 [x, y] 点），``name`` 和 ``color``（BGR）可选。
+    """
+    with open(path, encoding="utf-8") as f:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    return parse_lines(data, path)
+
+
+def parse_lines(data, source: str = "lines") -> List[Dict]:
+    """将列表（或含 ``lines`` 键的字典）形式的线定义转换为 LineDrawer 的格式"""
+    if isinstance(data, dict):
+        data = data.get("lines", [])
+
+    colors = LINE_CONFIG["colors"]
+    lines = []
+    for idx, item in enumerate(data):
+        points = item.get("points")
+        if not points or len(points) != 2:
+            raise ValueError(f"{source}: 第 {idx + 1} 条检测线需要两个端点")
+        lines.append({
+            'points': [tuple(int(v) for v in point) for point in points],
+            'color': tuple(item.get("color", colors[idx % len(colors)])),
+            'name': item.get("name", f"Line {idx + 1}")
+        })
+
+    if not lines:
+        raise ValueError(f"{source}: 未定义任何检测线")
+    return lines
+
+
+def save_lines(lines: List[Dict], path: str) -> None:
+    """将检测线保存为 JSON 文件（例如保存交互设置的线，供无界面模式复用）"""
+    data = {
+        "lines": [
+            {
+                "name": line['name'],
+                "points": [list(point) for point in line['points']],
+                "color": list(line['color'])
+            }
+            for line in lines
+        ]
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,56 @@
+"""
+检测线扫描模块
+在多个 CPU 核心上并行回放同一份检测缓存，批量评估多组候选检测线
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from .counter import TrafficCounter
+from .detection_cache import DetectionCache, replay_cache
+from .vehicle_tracker import VehicleTracker
+
+
+_worker_cache = None  # 每个工作进程只打开（内存映射）一次缓存
+_worker_tracking_config = None
+
+
+def _init_worker(cache_dir: str, tracking_config: Dict) -> None:
+    """工作进程初始化"""
+    global _worker_cache, _worker_tracking_config
+    _worker_cache = DetectionCache(cache_dir)
+    _worker_tracking_config = tracking_config
+
+
+def _evaluate(config: Dict) -> Dict:
+    """回放缓存并统计一组检测线"""
+    counter = TrafficCounter(config['lines'], verbose=False)
+    replay_cache(_worker_cache, config['lines'], VehicleTracker.from_config(_worker_tracking_config), counter)
+    return dict(counter.to_dict(), name=config['name'])
+
+
+def sweep_line_configs(cache_dir: str, configs: List[Dict], tracking_config: Dict,
+                       workers: Optional[int] = None) -> List[Dict]:
+    """并行评估多组检测线，configs 中每项为 {'name': ..., 'lines': [...]}，结果顺序与输入一致"""
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache_dir, tracking_config)) as pool:
+        return list(pool.map(_evaluate, configs))
+
+
+def compare_ground_truth(result: Dict, ground_truth: Dict) -> Dict:
+    """与人工计数比较，ground_truth 为 {线名: {'total': n, 'car': n, ...}}，返回每条线的误差"""
+    errors = {}
+    for line in result['lines']:
+        expected = ground_truth.get(line['name'])
+        if expected is None:
+            continue
+        line_errors = {}
+        if 'total' in expected:
+            line_errors['total'] = line['count'] - expected['total']
+        for vehicle_class, count in line['classes'].items():
+            if vehicle_class in expected:
+                line_errors[vehicle_class] = count - expected[vehicle_class]
+        errors[line['name']] = line_errors
+    return errors
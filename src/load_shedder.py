@@ -0,0 +1,116 @@
+"""
+负载控制模块
+按端到端帧延迟与目标值的比较逐级降级（关闭预览、降低输入尺寸、加大检测间隔、换用更小的模型），
+有余量时逐级恢复，并记录每次级别变化
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+
+LOAD_LEVELS = ("normal", "no-preview", "reduced-imgsz", "higher-stride", "smaller-model")
+
+
+class LoadShedder:
+    """端到端延迟 SLO 控制器
+
+    帧的端到端延迟为该帧处理完成的时间与它按视频时间应当到达的时间之差（以第一帧为基准），
+    处理跟不上帧率时延迟持续增长。延迟超过 target_latency 持续 degrade_after 秒、且这段时间内没有下降时
+    降一级（降级后积压仍在消化、延迟正在下降时不再继续降级）；延迟低于 target_latency × recover_ratio
+    持续 recover_after 秒时恢复一级；恢复后又因延迟超标降级时，下一次恢复前的等待时间加倍（最多 8 倍），
+    避免在两个级别之间反复切换。级别是累加的：第 n 级同时包含前面所有级别的降级措施。
+    """
+
+    def __init__(self, target_latency: float = 0.5, degrade_after: float = 2.0, recover_ratio: float = 0.5,
+                 recover_after: float = 10.0, max_level: int = len(LOAD_LEVELS) - 1,
+                 log_path: Optional[str] = None):
+        self.target_latency = target_latency
+        self.degrade_after = degrade_after
+        self.recover_ratio = recover_ratio
+        self.recover_after = recover_after
+        self.max_level = min(max_level, len(LOAD_LEVELS) - 1)
+        self.log_path = log_path
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config: Dict, max_level: int = len(LOAD_LEVELS) - 1) -> "LoadShedder":
+        return cls(config["target_latency"], config["degrade_after"], config["recover_ratio"],
+                   config["recover_after"], max_level, config["log_path"])
+
+    def reset(self) -> None:
+        """处理下一个视频前调用（回到正常级别，清空记录）"""
+        self.level = 0
+        self.latency = 0.0
+        self.events: List[Dict] = []
+        self.recover_wait = self.recover_after
+        self._recovered = False  # 上一次级别变化是否为恢复
+        self._start = None
+        self._origin = None
+        self._over = None   # (开始时间, 开始时的延迟)
+        self._under = None  # 开始时间
+
+    @property
+    def level_name(self) -> str:
+        return LOAD_LEVELS[self.level]
+
+    def start(self, now: Optional[float] = None) -> None:
+        """开始读取视频时调用，第一帧按这一时刻到达计算延迟"""
+        self._start = time.monotonic() if now is None else now
+        self._origin = None
+
+    def observe(self, timestamp: float, now: Optional[float] = None) -> Optional[int]:
+        """一帧处理完成时调用（timestamp 为该帧的视频时间），级别变化时返回新级别"""
+        now = time.monotonic() if now is None else now
+        if self._start is None:
+            self._start = now
+        if self._origin is None:
+            self._origin = self._start - timestamp
+        self.latency = latency = max(now - (self._origin + timestamp), 0.0)
+
+        if latency > self.target_latency:
+            self._under = None
+            if self._over is None:
+                self._over = (now, latency)
+            elif now - self._over[0] >= self.degrade_after:
+                if latency >= self._over[1] and self.level < self.max_level:
+                    return self._change(self.level + 1, timestamp, now)
+                self._over = (now, latency)
+        elif latency < self.target_latency * self.recover_ratio:
+            self._over = None
+            if self._under is None:
+                self._under = now
+            elif now - self._under >= self.recover_wait and self.level > 0:
+                return self._change(self.level - 1, timestamp, now)
+        else:
+            self._over = self._under = None
+        return None
+
+    def _change(self, level: int, timestamp: float, now: float) -> int:
+        """切换级别并记录（墙上时间、视频时间、运行时间和当时的延迟）"""
+        event = {
+            'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'video_time': round(timestamp, 3),
+            'elapsed': round(now - self._start, 3),
+            'from': LOAD_LEVELS[self.level],
+            'to': LOAD_LEVELS[level],
+            'latency': round(self.latency, 3)
+        }
+        degrade = level > self.level
+        if degrade:
+            self.recover_wait = (min(self.recover_wait * 2, 8 * self.recover_after) if self._recovered
+                                 else self.recover_after)
+        self._recovered = not degrade
+        self.events.append(event)
+        self.level = level
+        self._over = self._under = None
+        print(f"[{event['time']}] 负载{'降级' if degrade else '恢复'}: {event['from']} -> {event['to']} "
+              f"(视频时间 {timestamp:.1f} s, 端到端延迟 {self.latency:.2f} s)")
+        if self.log_path:
+            directory = os.path.dirname(self.log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        return level
@@ -0,0 +1,173 @@
+"""
+指标服务模块
+在后台线程中提供 Prometheus 格式的 HTTP 指标端点（计数、分时段流量、帧数、FPS、队列深度、阶段耗时、活动轨迹数）
+
+处理循环按固定间隔发布一份不可变快照，抓取请求只读取最近一次快照，不与处理循环共享锁，
+因此抓取不会阻塞处理循环。
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+STAGE_QUANTILES = (50, 90, 99)
+
+
+def _escape(value) -> str:
+    """转义标签值"""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsServer:
+    """Prometheus 指标端点
+
+    每路视频（camera 标签）调用 publish() 发布状态，调用本身只比较一次时间，
+    距上次发布不足 publish_interval 秒时立即返回。
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 9108, publish_interval: float = 1.0):
+        self.host = host
+        self.port = port
+        self.publish_interval = publish_interval
+        self._snapshots: Dict[str, Dict] = {}
+        self._last_publish: Dict[str, float] = {}
+        self._queue_sources: Dict[str, Callable[[], Dict[str, int]]] = {}
+        self._server = None
+        self._thread = None
+
+    def start(self) -> "MetricsServer":
+        """启动后台 HTTP 服务"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 不在控制台打印访问日志
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]  # port=0 时取实际端口
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        print(f"指标端点: http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self) -> None:
+        """停止 HTTP 服务"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def watch_queues(self, camera: str, source: Optional[Callable[[], Dict[str, int]]]) -> None:
+        """登记队列深度的读取函数（流水线模式），传入 None 取消登记"""
+        if source is None:
+            self._queue_sources.pop(camera, None)
+        else:
+            self._queue_sources[camera] = source
+
+    def publish(self, camera: str, counter, frames: int, active_tracks: int, profiler=None,
+                force: bool = False) -> None:
+        """发布一路视频的当前状态（按 publish_interval 限频）"""
+        now = time.monotonic()
+        last = self._last_publish.get(camera)
+        if not force and last is not None and now - last < self.publish_interval:
+            return
+
+        previous = self._snapshots.get(camera)
+        fps = 0.0
+        if previous is not None and now > previous['monotonic']:
+            fps = (frames - previous['frames']) / (now - previous['monotonic'])
+
+        latency = {}
+        if profiler is not None:
+            for name in list(profiler.order):
+                histogram = profiler.histograms[name]
+                if histogram.count:
+                    latency[name] = {
+                        'count': histogram.count,
+                        'sum': histogram.total,
+                        'quantiles': {q: histogram.percentile(q) for q in STAGE_QUANTILES}
+                    }
+
+        queues = self._queue_sources.get(camera)
+        self._snapshots[camera] = {
+            'monotonic': now,
+            'time': time.time(),
+            'frames': frames,
+            'fps': fps,
+            'active_tracks': active_tracks,
+            'lines': [(line['name'], counter.line_counts[idx], dict(counter.line_class_counts[idx]))
+                      for idx, line in enumerate(counter.lines)],
+            'queues': queues() if queues is not None else {},
+            'latency': latency,
+            'flow': [(f"{minutes}m", name, item['per_hour'])
+                     for minutes in getattr(counter, "flow_windows", [])
+                     for name, item in counter.get_flow(minutes).items()]
+        }
+        self._last_publish[camera] = now
+
+    def render(self) -> str:
+        """生成 Prometheus 文本格式（只读取已发布的快照）"""
+        snapshots = list(self._snapshots.items())
+        out: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(samples)
+
+        metric("traffic_vehicles_total", "counter", "Vehicles counted per line",
+               [f"traffic_vehicles_total{_labels(camera=camera, line=name)} {count}"
+                for camera, snap in snapshots for name, count, _ in snap['lines']])
+        metric("traffic_vehicles_by_class_total", "counter", "Vehicles counted per line and class",
+               [f"traffic_vehicles_by_class_total{_labels(camera=camera, line=name, **{'class': cls})} {value}"
+                for camera, snap in snapshots for name, _, classes in snap['lines']
+                for cls, value in classes.items()])
+        metric("traffic_flow_vehicles_per_hour", "gauge", "Hourly flow rate over recent windows",
+               [f"traffic_flow_vehicles_per_hour{_labels(camera=camera, line=name, window=window)} {rate:.1f}"
+                for camera, snap in snapshots for window, name, rate in snap['flow']])
+        metric("traffic_frames_processed_total", "counter", "Frames processed",
+               [f"traffic_frames_processed_total{_labels(camera=camera)} {snap['frames']}"
+                for camera, snap in snapshots])
+        metric("traffic_fps", "gauge", "Frames per second since the previous publish",
+               [f"traffic_fps{_labels(camera=camera)} {snap['fps']:.3f}" for camera, snap in snapshots])
+        metric("traffic_active_tracks", "gauge", "Tracks currently held by the vehicle tracker",
+               [f"traffic_active_tracks{_labels(camera=camera)} {snap['active_tracks']}"
+                for camera, snap in snapshots])
+        metric("traffic_queue_depth", "gauge", "Items waiting in pipeline queues",
+               [f"traffic_queue_depth{_labels(camera=camera, queue=name)} {depth}"
+                for camera, snap in snapshots for name, depth in snap['queues'].items()])
+        metric("traffic_last_publish_timestamp_seconds", "gauge", "Unix time of the last published snapshot",
+               [f"traffic_last_publish_timestamp_seconds{_labels(camera=camera)} {snap['time']:.3f}"
+                for camera, snap in snapshots])
+
+        samples = []
+        for camera, snap in snapshots:
+            for stage, stats in snap['latency'].items():
+                for q, value in stats['quantiles'].items():
+                    labels = _labels(camera=camera, stage=stage, quantile=q / 100)
+                    samples.append(f"traffic_stage_latency_seconds{labels} {value:.6f}")
+                samples.append(f"traffic_stage_latency_seconds_sum{_labels(camera=camera, stage=stage)} "
+                               f"{stats['sum']:.6f}")
+                samples.append(f"traffic_stage_latency_seconds_count{_labels(camera=camera, stage=stage)} "
+                               f"{stats['count']}")
+        metric("traffic_stage_latency_seconds", "summary", "Per-stage processing latency", samples)
+        return "\n".join(out) + "\n"
@@ -0,0 +1,104 @@
+"""
+运动门控模块
+在检测器之前用缩小的灰度帧做帧差，检测线区域内没有运动时跳过检测，沿用上一次的检测结果
+"""
+
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from .roi import line_roi, merge_regions
+
+
+class MotionGate:
+    """帧差运动门控
+
+    当前帧缩小到 width 像素宽的灰度图后与上一次检测时的帧比较，检测线区域（与区域裁剪的定义相同）内
+    差值超过 pixel_threshold 的像素比例达到 min_changed_ratio 即认为有运动。与上一次检测的帧比较
+    而不是与前一帧比较，缓慢移动的车辆的位移会逐帧累积，最终仍会触发检测。
+    没有运动时跳过检测，但每 refresh_frames 帧强制检测一次。
+    """
+
+    def __init__(self, width: int = 320, pixel_threshold: int = 25, min_changed_ratio: float = 0.002,
+                 refresh_frames: int = 30, approach: int = 150, padding: int = 64):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.refresh_frames = refresh_frames
+        self.approach = approach
+        self.padding = padding
+        self.lines = None
+        self._mask = None
+        self._mask_key = None
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config: Dict, roi_config: Dict) -> "MotionGate":
+        return cls(config["width"], config["pixel_threshold"], config["min_changed_ratio"],
+                   config["refresh_frames"], roi_config["approach"], roi_config["padding"])
+
+    def set_lines(self, lines: Optional[List[Dict]]) -> None:
+        """设置检测线，并清空参考帧（下一帧一定检测）"""
+        self.lines = lines
+        self._mask_key = None
+        self._reference = None
+
+    def reset(self) -> None:
+        """处理下一个视频前调用（同时清零统计）"""
+        self._reference = None
+        self._since_detect = 0
+        self.frames_checked = 0
+        self.frames_skipped = 0
+
+    def should_detect(self, frame) -> bool:
+        """判断这一帧是否需要检测；需要检测时以这一帧作为新的参考帧"""
+        self.frames_checked += 1
+        small = self._downscale(frame)
+        detect = (self._reference is None or self._reference.shape != small.shape
+                  or self._since_detect + 1 >= self.refresh_frames
+                  or self._moving(small, self._region_mask(frame.shape, small.shape)))
+        if detect:
+            self._reference = small
+            self._since_detect = 0
+        else:
+            self._since_detect += 1
+            self.frames_skipped += 1
+        return detect
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.frames_skipped / self.frames_checked if self.frames_checked else 0.0
+
+    def _downscale(self, frame) -> np.ndarray:
+        height, width = frame.shape[:2]
+        scale = min(self.width / width, 1.0)
+        small = cv2.resize(frame, (max(round(width * scale), 1), max(round(height * scale), 1)),
+                           interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)  # 压低传感器噪声
+
+    def _region_mask(self, frame_shape, small_shape) -> Optional[np.ndarray]:
+        """缩小后画面上检测线区域的掩码（没有检测线、或检测线区域全在画面外时为 None，即整帧）"""
+        key = (frame_shape[:2], small_shape)
+        if key != self._mask_key:
+            self._mask_key = key
+            self._mask = None
+            if self.lines:
+                scale = small_shape[1] / frame_shape[1]
+                self._mask = np.zeros(small_shape, dtype=bool)
+                regions = merge_regions([line_roi(line_data, self.approach, self.padding)
+                                         for line_data in self.lines], frame_shape)
+                for x1, y1, x2, y2 in regions:
+                    x1, y1 = int(x1 * scale), int(y1 * scale)
+                    x2, y2 = int(np.ceil(x2 * scale)), int(np.ceil(y2 * scale))
+                    self._mask[y1:y2, x1:x2] = True
+                if not self._mask.any():
+                    self._mask = None
+        return self._mask
+
+    def _moving(self, small: np.ndarray, mask: Optional[np.ndarray]) -> bool:
+        changed = cv2.absdiff(small, self._reference) > self.pixel_threshold
+        if mask is not None:
+            changed = changed[mask]
+        return changed.mean() >= self.min_changed_ratio
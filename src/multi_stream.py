@@ -0,0 +1,112 @@
+"""
+多路视频流模块
+多个摄像头共享一个检测模型，每轮把各路的帧合并成一次批量推理，
+追踪器、轨迹和计数器按路独立
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import cv2
+
+
+class CameraStream:
+    """单路摄像头：独立的视频源、检测线、追踪状态和计数器"""
+
+    def __init__(self, name: str, source, system, lines: List[Dict]):
+        self.name = name
+        self.source = source
+        self.system = system  # 该路专用的 TrafficFlowCounter（检测器与其他路共享）
+        self.lines = lines
+        self.counter = system.create_counter(lines, name)
+        self.frame_count = 0
+        self._counter_closed = False
+
+        # 纯数字视为本地摄像头编号
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        self.cap = cv2.VideoCapture(source)
+        self.active = self.cap.isOpened()
+        if not self.active:
+            print(f"[{name}] 无法打开视频源: {self.source}")
+
+    def read(self):
+        """读取下一帧，读取失败时关闭该路"""
+        ret, frame = self.cap.read()
+        if not ret:
+            self.close()
+            return None
+        return frame
+
+    def close(self) -> None:
+        """释放视频源并写完事件文件"""
+        if self.active:
+            self.cap.release()
+            self.active = False
+        if not self._counter_closed:
+            self.system.close_counter(self.counter)
+            self._counter_closed = True
+
+
+class MultiStreamRunner:
+    """多路批量推理运行器"""
+
+    def __init__(self, detector, streams: List[CameraStream], max_batch: Optional[int] = None):
+        self.detector = detector
+        self.streams = streams
+        self.max_batch = max_batch  # 单次推理的最大帧数，None 表示所有路一次推理
+        self._running = False
+
+    def stop(self) -> None:
+        """在当前一轮结束后停止"""
+        self._running = False
+
+    def run(self, max_rounds: Optional[int] = None) -> Dict:
+        """运行直到所有视频流结束（或达到 max_rounds 轮），返回运行统计"""
+        self._running = True
+        rounds = 0
+        total_frames = 0
+        start = time.perf_counter()
+
+        while self._running and any(stream.active for stream in self.streams):
+            batch = []
+            for stream in self.streams:
+                if stream.active:
+                    frame = stream.read()
+                    if frame is not None:
+                        batch.append((stream, frame))
+            if not batch:
+                break
+
+            detections = self._detect([frame for _, frame in batch])
+
+            # 追踪和计数按路独立进行
+            for (stream, frame), stream_detections in zip(batch, detections):
+                tracks = stream.system.track(stream_detections, frame)
+                stream.system.update_counts(tracks, stream.counter)
+                stream.frame_count += 1
+
+            total_frames += len(batch)
+            rounds += 1
+            if max_rounds is not None and rounds >= max_rounds:
+                break
+
+        for stream in self.streams:
+            stream.close()
+
+        elapsed = time.perf_counter() - start
+        return {
+            'rounds': rounds,
+            'frames': total_frames,
+            'seconds': elapsed,
+            'fps': total_frames / elapsed if elapsed > 0 else 0.0
+        }
+
+    def _detect(self, frames: List) -> List:
+        """按 max_batch 分块做批量推理"""
+        if self.max_batch is None:
+            return self.detector.detect_batch(frames)
+        detections = []
+        for i in range(0, len(frames), self.max_batch):
+            detections.extend(self.detector.detect_batch(frames[i:i + self.max_batch]))
+        return detections
@@ -0,0 +1,34 @@
+"""
+多目标追踪模块
+在检测结果之上运行 ByteTrack，与检测解耦以便检测只做一次
+"""
+
+import yaml
+from .detector import Detections
+
+
+class ByteTracker:
+    """ByteTrack 追踪器封装"""
+
+    def __init__(self, tracker_config: str = "bytetrack.yaml"):
+        from ultralytics.trackers.byte_tracker import BYTETracker
+        from ultralytics.utils import IterableSimpleNamespace
+        from ultralytics.utils.checks import check_yaml
+
+        with open(check_yaml(tracker_config), encoding="utf-8") as f:
+            args = IterableSimpleNamespace(**yaml.safe_load(f))
+        self.tracker = BYTETracker(args)
+        self.new_track_thresh = args.new_track_thresh  # 未匹配的检测达到该置信度才建立新轨迹
+
+    def update(self, detections: Detections, frame=None) -> Detections:
+        """用当前帧的检测更新追踪器，返回带 track_ids 的已确认轨迹"""
+        tracks = self.tracker.update(detections, frame)
+        return Detections.from_tracks(tracks)
+
+    def advance(self) -> None:
+        """没有检测的帧：轨迹按卡尔曼滤波预测前进一帧，丢失帧数照常累计"""
+        self.tracker.update(Detections())
+
+    def reset(self) -> None:
+        """清空所有轨迹"""
+        self.tracker.reset()
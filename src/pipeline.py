@@ -0,0 +1,141 @@
+"""
+流水线模块
+将解码、检测+追踪、计数、绘制分别放在独立线程中，用有界队列连接
+"""
+
+import queue
+import threading
+from typing import Callable, Dict, Optional
+
+import cv2
+
+
+_END = object()  # 流结束标记
+
+
+class FramePipeline:
+    """帧处理流水线
+
+    每个阶段只有一个线程并按 FIFO 顺序处理，因此帧顺序和计数语义与串行循环一致；
+    整体吞吐接近最慢阶段的吞吐。显示（cv2.imshow）由调用线程通过 on_frame 完成。
+    """
+
+    def __init__(self, system, lines, counter, queue_size: int = 8, render: bool = True, preview=None):
+        self.system = system  # TrafficFlowCounter，提供 detect/track/update_counts/render 阶段
+        self.lines = lines
+        self.counter = counter
+        self.queue_size = queue_size
+        self.render = render
+        self.preview = preview  # PreviewThrottle，决定哪些帧交给 on_frame 显示，为空时全部显示
+        self.frame_count = 0
+        self._stop = threading.Event()
+        self._error = None
+        self._queues = {}
+
+    def stop(self) -> None:
+        """请求停止：解码阶段不再读取新帧，已读取的帧继续处理完"""
+        self._stop.set()
+
+    def queue_depths(self) -> Dict[str, int]:
+        """各阶段输出队列当前的长度（近似值，可在任意线程调用）"""
+        return {name: q.qsize() for name, q in self._queues.items()}
+
+    def run(self, cap, on_frame: Optional[Callable] = None) -> int:
+        """运行流水线直到视频结束或 on_frame 返回 False，返回处理的帧数"""
+        decoded = queue.Queue(self.queue_size)
+        detected = queue.Queue(self.queue_size)
+        counted = queue.Queue(self.queue_size)
+        rendered = queue.Queue(self.queue_size)
+        self._queues = {'decoded': decoded, 'detected': detected, 'counted': counted, 'rendered': rendered}
+        metrics = getattr(self.system, "metrics", None)
+        if metrics is not None:
+            metrics.watch_queues(self.system.metrics_label, self.queue_depths)
+
+        threads = [
+            threading.Thread(target=self._stage, args=(self._decode, cap, decoded), daemon=True),
+            threading.Thread(target=self._stage, args=(self._detect, decoded, detected), daemon=True),
+            threading.Thread(target=self._stage, args=(self._count, detected, counted), daemon=True),
+            threading.Thread(target=self._stage, args=(self._render, counted, rendered), daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        # 调用线程消费最终结果（GUI 调用必须在主线程）；Ctrl+C 时停止读取并处理完已读取的帧
+        while True:
+            try:
+                item = rendered.get()
+                if item is _END:
+                    break
+                frame_idx, frame, show = item
+                self.frame_count += 1
+                if show and on_frame is not None and on_frame(frame_idx, frame) is False:
+                    self.stop()
+            except KeyboardInterrupt:
+                self.stop()
+                on_frame = None
+
+        for thread in threads:
+            thread.join()
+        if metrics is not None:
+            metrics.watch_queues(self.system.metrics_label, None)
+        if self._error is not None:
+            raise self._error
+        return self.frame_count
+
+    def _stage(self, work: Callable, source, output: queue.Queue) -> None:
+        """阶段线程：出错时停止解码并继续向下游传递结束标记"""
+        try:
+            work(source, output)
+        except Exception as e:
+            self._error = e
+            self._stop.set()
+            # 排空上游，避免上游阶段阻塞在已满的队列上
+            if isinstance(source, queue.Queue):
+                while source.get() is not _END:
+                    pass
+        output.put(_END)
+
+    def _decode(self, cap, output: queue.Queue) -> None:
+        """解码阶段"""
+        frame_idx = 0
+        while not self._stop.is_set():
+            with self.system.profiler.stage("decode"):
+                ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            output.put((frame_idx, frame, timestamp))
+            frame_idx += 1
+
+    def _detect(self, source: queue.Queue, output: queue.Queue) -> None:
+        """检测+追踪阶段"""
+        for item in iter(source.get, _END):
+            frame_idx, frame, timestamp = item
+            detections = self.system.detect(frame)
+            tracks = self.system.track(detections, frame)
+            output.put((frame_idx, frame, timestamp, detections, tracks))
+
+    def _count(self, source: queue.Queue, output: queue.Queue) -> None:
+        """计数阶段：绘制所需的计数和轨迹在此处做快照，保证与本帧一致"""
+        for item in iter(source.get, _END):
+            frame_idx, frame, timestamp, detections, tracks = item
+            self.system.update_counts(tracks, self.counter, timestamp)
+            # 需要显示或写入结果视频的帧才绘制
+            show = self.render and (self.preview is None or self.preview.should_render(frame_idx))
+            if show or (self.render and self.system.video_writer is not None):
+                snapshot = self.counter.snapshot()
+                history = self.system.vehicle_tracker.get_track_snapshot(tracks.track_ids)
+                output.put((frame_idx, frame, detections, tracks, snapshot, history, show))
+            else:
+                output.put((frame_idx, frame, detections, tracks, None, None, False))
+
+    def _render(self, source: queue.Queue, output: queue.Queue) -> None:
+        """绘制阶段：计数阶段没有提供快照的帧不绘制"""
+        for item in iter(source.get, _END):
+            frame_idx, frame, detections, tracks, snapshot, history, show = item
+            if snapshot is not None:
+                self.system.render(frame, self.lines, snapshot, detections, tracks, history)
+                if self.system.video_writer is not None:
+                    # 帧号从 0 开始，VehicleTracker.frame_idx 从 1 开始（每个视频重置）
+                    self.system.write_frame(frame, frame_idx + 1)
+            output.put((frame_idx, frame, show))
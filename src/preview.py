@@ -0,0 +1,37 @@
+"""
+预览控制模块
+决定哪些帧需要绘制和显示，使显示帧率与分析帧率解耦
+"""
+
+import time
+from typing import Dict, Optional
+
+
+class PreviewThrottle:
+    """预览限速
+
+    every 为 N 时每 N 帧显示一帧；target_fps 设置时显示帧之间至少间隔 1/target_fps 秒；
+    enabled 为 False 时为零绘制模式，所有帧都不绘制、不显示，计数不受影响。
+    """
+
+    def __init__(self, every: int = 1, target_fps: Optional[float] = None, enabled: bool = True):
+        self.every = max(int(every), 1)
+        self.min_interval = 1.0 / target_fps if target_fps else 0.0
+        self.enabled = enabled
+        self._last_shown = None
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "PreviewThrottle":
+        """按 DISPLAY_CONFIG 创建"""
+        return cls(config["display_every"], config["preview_fps"], config["render"])
+
+    def should_render(self, frame_idx: int) -> bool:
+        """第 frame_idx 帧（从 0 开始）是否需要绘制和显示"""
+        if not self.enabled or frame_idx % self.every:
+            return False
+        if self.min_interval:
+            now = time.monotonic()
+            if self._last_shown is not None and now - self._last_shown < self.min_interval:
+                return False
+            self._last_shown = now
+        return True
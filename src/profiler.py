@@ -0,0 +1,184 @@
+"""
+性能分析模块
+按阶段记录每帧耗时，使用对数分桶直方图，内存固定、记录开销很小，可在运行时开关
+"""
+
+import json
+import math
+import time
+from typing import Dict, List
+
+
+class LatencyHistogram:
+    """对数分桶的延迟直方图
+
+    覆盖 10us ~ 100s，每个 2 倍区间分 8 个桶，分位数的相对误差约 4%。
+    """
+
+    MIN_SECONDS = 1e-5
+    BUCKETS_PER_OCTAVE = 8
+    NUM_BUCKETS = 8 * 24
+
+    def __init__(self):
+        self.counts = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """记录一次耗时（秒）"""
+        if seconds <= self.MIN_SECONDS:
+            index = 0
+        else:
+            index = min(int(math.log2(seconds / self.MIN_SECONDS) * self.BUCKETS_PER_OCTAVE),
+                        self.NUM_BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def bucket_bounds(self, index: int):
+        """第 index 个桶的上下界（秒）"""
+        lower = self.MIN_SECONDS * 2 ** (index / self.BUCKETS_PER_OCTAVE)
+        upper = self.MIN_SECONDS * 2 ** ((index + 1) / self.BUCKETS_PER_OCTAVE)
+        return (0.0 if index == 0 else lower), upper
+
+    def percentile(self, q: float) -> float:
+        """估算第 q 百分位的耗时（秒），取所在桶的几何中点并限制在 [min, max] 内"""
+        if self.count == 0:
+            return 0.0
+        target = q / 100 * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if bucket_count and cumulative >= target:
+                lower, upper = self.bucket_bounds(index)
+                estimate = math.sqrt(max(lower, self.MIN_SECONDS) * upper)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        """毫秒单位的统计摘要"""
+        if self.count == 0:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.total / self.count * 1000,
+            'p50': self.percentile(50) * 1000,
+            'p90': self.percentile(90) * 1000,
+            'p99': self.percentile(99) * 1000,
+            'min': self.min * 1000,
+            'max': self.max * 1000
+        }
+
+    def to_dict(self) -> Dict:
+        """导出全部数据（非空桶），便于离线分析"""
+        buckets = []
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count:
+                lower, upper = self.bucket_bounds(index)
+                buckets.append({'lower_ms': lower * 1000, 'upper_ms': upper * 1000, 'count': bucket_count})
+        return dict(self.summary(), buckets=buckets)
+
+
+class _StageTimer:
+    """单个阶段的计时上下文"""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.record(time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    """关闭时使用的空计时上下文"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class StageProfiler:
+    """分阶段性能分析器
+
+    用法: ``with profiler.stage("detect"): ...``。enabled 可在运行时随时切换，
+    关闭时 stage() 返回空上下文，几乎没有开销。
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.order: List[str] = []  # 阶段首次出现的顺序
+
+    def stage(self, name: str):
+        """返回该阶段的计时上下文"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._histogram(name))
+
+    def record(self, name: str, seconds: float) -> None:
+        """直接记录一次耗时（秒）"""
+        if self.enabled:
+            self._histogram(name).record(seconds)
+
+    def toggle(self) -> bool:
+        """切换开关状态，返回切换后的状态"""
+        self.enabled = not self.enabled
+        return self.enabled
+
+    def reset(self) -> None:
+        """清空已记录的数据"""
+        self.histograms.clear()
+        self.order.clear()
+
+    def summary(self) -> Dict[str, Dict]:
+        """各阶段的统计摘要（毫秒）"""
+        return {name: self.histograms[name].summary() for name in self.order}
+
+    def print_summary(self) -> None:
+        """打印各阶段耗时统计"""
+        if not self.order:
+            return
+        print("\n" + "=" * 50)
+        print("各阶段耗时统计 (ms)")
+        print("=" * 50)
+        print(f"{'阶段':<14}{'次数':>8}{'平均':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'最大':>9}")
+        for name, stats in self.summary().items():
+            if stats['count'] == 0:
+                continue
+            print(f"{name:<16}{stats['count']:>8}{stats['mean']:>9.2f}{stats['p50']:>9.2f}"
+                  f"{stats['p90']:>9.2f}{stats['p99']:>9.2f}{stats['max']:>9.2f}")
+        print("=" * 50)
+
+    def dump_json(self, path: str) -> None:
+        """将全部直方图数据写入 JSON 文件"""
+        data = {
+            'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'stages': {name: self.histograms[name].to_dict() for name in self.order}
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+            self.order.append(name)
+        return histogram
@@ -0,0 +1,129 @@
+"""
+INT8 量化模块
+用从现场视频中抽取的帧校准，把导出的 FP32 ONNX 模型静态量化为 INT8（QDQ 格式），
+并提供 FP32 与 INT8 计数结果的比较
+"""
+
+import os
+from typing import Dict, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from .detector import ONNXDetector, export_onnx
+
+
+CALIBRATE_METHODS = ("minmax", "entropy", "percentile")
+
+
+def sample_frames(video_paths: List[str], num_frames: int) -> Iterator[np.ndarray]:
+    """从各视频中按帧数比例均匀抽取共 num_frames 帧"""
+    totals = []
+    for path in video_paths:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise IOError(f"无法打开视频: {path}")
+        totals.append(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        cap.release()
+
+    total = sum(totals)
+    for path, frames in zip(video_paths, totals):
+        count = max(round(num_frames * frames / total), 1) if total else 0
+        cap = cv2.VideoCapture(path)
+        for frame_idx in np.linspace(0, max(frames - 1, 0), count).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_idx))
+            ret, frame = cap.read()
+            if ret:
+                yield frame
+        cap.release()
+
+
+def _head_nodes_to_exclude(model_path: str) -> List[str]:
+    """检测头中框解码部分（DFL、锚点、Sigmoid、拼接）的节点名
+
+    这些节点的输出是像素坐标和置信度，量化为 8 位会明显损失定位精度，保留为浮点计算；
+    检测头的分支卷积（cv2 / cv3）仍然量化。
+    """
+    import onnx
+
+    graph = onnx.load(model_path, load_external_data=False).graph
+    outputs = {output.name for output in graph.output}
+    last = next(node.name for node in graph.node if outputs & set(node.output))
+    prefix = last[:last.rfind("/") + 1]  # 例如 /model.22/
+    return [node.name for node in graph.node
+            if node.name.startswith(prefix) and not node.name.startswith((prefix + "cv2", prefix + "cv3"))]
+
+
+class _CalibrationReader:
+    """按 ONNXDetector 的预处理逐帧提供校准输入（onnxruntime CalibrationDataReader 接口）"""
+
+    def __init__(self, preprocessor: ONNXDetector, frames: Iterator[np.ndarray]):
+        self.preprocessor = preprocessor
+        self.frames = frames
+
+    def get_next(self) -> Optional[Dict]:
+        frame = next(self.frames, None)
+        if frame is None:
+            return None
+        return {self.preprocessor.input_name: self.preprocessor.preprocess([frame])}
+
+
+def quantize_int8(model_path: str, video_paths: List[str], num_frames: int = 200, imgsz: int = 640,
+                  cache_dir: str = "output/models", output: Optional[str] = None, per_channel: bool = True,
+                  calibrate_method: str = "minmax") -> str:
+    """用视频帧校准并静态量化模型，返回 INT8 ONNX 模型路径
+
+    model_path 为 PyTorch 权重（先导出 ONNX）或 FP32 ONNX 模型；
+    激活值按 uint8、权重按 int8 量化，默认保存为 <FP32 模型名>_int8.onnx。
+    """
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if calibrate_method not in CALIBRATE_METHODS:
+        raise ValueError(f"不支持的校准方法: {calibrate_method}（可选 {', '.join(CALIBRATE_METHODS)}）")
+    fp32_path = export_onnx(model_path, imgsz, cache_dir)
+    root = os.path.splitext(fp32_path)[0]
+    output = output or f"{root}_int8.onnx"
+
+    # 量化前做图优化和形状推断，量化节点才能覆盖到融合后的算子
+    prepared = f"{root}_prepared.onnx"
+    quant_pre_process(fp32_path, prepared, skip_symbolic_shape=True)
+    preprocessor = ONNXDetector(fp32_path, imgsz=imgsz)
+    methods = {'minmax': CalibrationMethod.MinMax, 'entropy': CalibrationMethod.Entropy,
+               'percentile': CalibrationMethod.Percentile}
+    print(f"用 {len(video_paths)} 个视频中的 {num_frames} 帧校准 INT8 模型...")
+    try:
+        quantize_static(
+            prepared, output, _CalibrationReader(preprocessor, sample_frames(video_paths, num_frames)),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            calibrate_method=methods[calibrate_method],
+            nodes_to_exclude=_head_nodes_to_exclude(prepared)
+        )
+    finally:
+        os.remove(prepared)
+    return output
+
+
+def compare_counts(reference: Dict, candidate: Dict, tolerance: float = 0.05, abs_tolerance: int = 1) -> List[Dict]:
+    """逐线、逐类别比较两份 TrafficCounter.to_dict() 的计数
+
+    每项允许的误差为 max(abs_tolerance, tolerance × 基准计数)，返回
+    [{'line', 'class', 'reference', 'candidate', 'diff', 'ok'}]，class 为 'total' 表示该线总数。
+    候选结果中缺少的线和类别按 0 计，只出现在候选结果中的类别按基准为 0 比较。
+    """
+    candidate_lines = {line['name']: line for line in candidate['lines']}
+    rows = []
+    for line in reference['lines']:
+        other = candidate_lines.get(line['name'], {'count': 0, 'classes': {}})
+        classes = list(line['classes']) + [c for c in other['classes'] if c not in line['classes']]
+        pairs = [('total', line['count'], other['count'])]
+        pairs += [(vehicle_class, line['classes'].get(vehicle_class, 0), other['classes'].get(vehicle_class, 0))
+                  for vehicle_class in classes]
+        for vehicle_class, expected, actual in pairs:
+            allowed = max(abs_tolerance, tolerance * expected)
+            rows.append({'line': line['name'], 'class': vehicle_class, 'reference': expected,
+                         'candidate': actual, 'diff': actual - expected, 'ok': abs(actual - expected) <= allowed})
+    return rows
@@ -0,0 +1,112 @@
+"""
+检测线感兴趣区域模块
+只把检测线及其驶近区域附近的画面送入检测器，检测框再还原到整帧坐标；
+裁剪区域按整帧的缩放比例推理，推理开销大致与区域面积成正比
+"""
+
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .detector import Detections
+
+
+def line_roi(line_data: Dict, approach: int, padding: int) -> Tuple[float, float, float, float]:
+    """一条检测线的区域：线段沿法线两侧各扩展 approach 像素（驶近/驶离区域），再向四周外扩 padding 像素"""
+    (x1, y1), (x2, y2) = line_data['points']
+    length = math.hypot(x2 - x1, y2 - y1) or 1.0
+    nx, ny = -(y2 - y1) / length * approach, (x2 - x1) / length * approach
+    xs = [x1 + nx, x1 - nx, x2 + nx, x2 - nx]
+    ys = [y1 + ny, y1 - ny, y2 + ny, y2 - ny]
+    return min(xs) - padding, min(ys) - padding, max(xs) + padding, max(ys) + padding
+
+
+def merge_regions(regions: List[Tuple], frame_shape: Tuple[int, ...]) -> List[Tuple[int, int, int, int]]:
+    """裁剪到画面内，相交的区域合并为外接矩形（避免同一车辆被检测两次）"""
+    height, width = frame_shape[:2]
+    boxes = [[max(int(x1), 0), max(int(y1), 0), min(int(math.ceil(x2)), width), min(int(math.ceil(y2)), height)]
+             for x1, y1, x2, y2 in regions]
+    boxes = [box for box in boxes if box[2] > box[0] and box[3] > box[1]]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return [tuple(box) for box in boxes]
+
+
+class RegionCropper:
+    """检测线区域裁剪检测
+
+    每条检测线的区域为线段沿法线两侧扩展 approach 像素、再外扩 padding 像素的矩形，相交的区域合并。
+    各区域以整帧推理时的缩放比例送入检测器（输入尺寸按 stride 向上取整），因此远近目标的像素尺寸
+    与整帧推理一致。区域总面积超过画面的 max_area_ratio 时直接整帧检测。区域方案按画面尺寸缓存。
+    """
+
+    def __init__(self, approach: int = 150, padding: int = 64, max_area_ratio: float = 0.7,
+                 imgsz: int = 640, stride: int = 32):
+        self.approach = approach
+        self.padding = padding
+        self.max_area_ratio = max_area_ratio
+        self.imgsz = imgsz
+        self.stride = stride
+        self.lines = None
+        self._plans = {}
+
+    @classmethod
+    def from_config(cls, config: Dict, imgsz: int = 640) -> "RegionCropper":
+        return cls(config["approach"], config["padding"], config["max_area_ratio"], imgsz)
+
+    def set_lines(self, lines: List[Dict]) -> None:
+        """设置检测线（区域随检测线重新计算）"""
+        self.lines = lines
+        self._plans.clear()
+
+    def regions_for(self, frame_shape: Tuple[int, ...]) -> List[Tuple[Tuple[int, int, int, int], int]]:
+        """某一画面尺寸的区域方案 [(区域, 推理输入尺寸)]，空列表表示整帧检测"""
+        key = frame_shape[:2]
+        if key not in self._plans:
+            plan = []
+            if self.lines:
+                regions = merge_regions([line_roi(line_data, self.approach, self.padding)
+                                         for line_data in self.lines], frame_shape)
+                area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+                if area < self.max_area_ratio * key[0] * key[1]:
+                    scale = self.imgsz / max(key)
+                    for x1, y1, x2, y2 in regions:
+                        size = math.ceil(max(x2 - x1, y2 - y1) * scale / self.stride) * self.stride
+                        plan.append(((x1, y1, x2, y2), min(max(size, self.stride), self.imgsz)))
+            self._plans[key] = plan
+        return self._plans[key]
+
+    def area_ratio(self, frame_shape: Tuple[int, ...]) -> float:
+        """区域总面积占画面的比例（整帧检测时为 1）"""
+        plan = self.regions_for(frame_shape)
+        if not plan:
+            return 1.0
+        return sum((x2 - x1) * (y2 - y1) for (x1, y1, x2, y2), _ in plan) / (frame_shape[0] * frame_shape[1])
+
+    def detect(self, detector, frame) -> Detections:
+        """只检测各区域，检测框还原到整帧坐标"""
+        plan = self.regions_for(frame.shape)
+        if not plan:
+            return detector.detect(frame)
+        boxes, conf, cls = [], [], []
+        for (x1, y1, x2, y2), size in plan:
+            result = detector.detect(frame[y1:y2, x1:x2], imgsz=size)
+            if len(result):
+                boxes.append(result.xyxy + np.array([x1, y1, x1, y1], dtype=np.float32))
+                conf.append(result.conf)
+                cls.append(result.cls)
+        if not boxes:
+            return Detections()
+        return Detections(np.concatenate(boxes), np.concatenate(conf), np.concatenate(cls))
@@ -0,0 +1,194 @@
+"""
+分段并行处理模块
+把一个长视频按时间切成若干段，在进程池中各自加载模型、独立追踪和计数，
+再通过重叠区内的轨迹匹配拼接各段的轨迹并去重，合并后的计数与串行处理一致
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config.settings import MODEL_CONFIG
+from .counter import TrafficCounter
+from .detector import box_iou, export_onnx
+
+
+class _EventCollector:
+    """收集穿越事件的写入器（与 EventSink.emit 接口相同）"""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, timestamp, frame, track_id, vehicle_type, line_name, direction) -> None:
+        self.events.append((frame, timestamp, track_id, vehicle_type, line_name, direction))
+
+
+def plan_segments(total_frames: int, shards: int, overlap_frames: int) -> List[Tuple[int, int, Optional[int]]]:
+    """分段方案 [(起始帧, 结束帧, 读取截止帧)]
+
+    每段处理 [起始帧, 读取截止帧)，即在结束帧之后多读 overlap_frames 帧供下一段拼接；
+    最后一段的读取截止帧为 None，读到视频结束。
+    """
+    shards = max(min(shards, total_frames // max(overlap_frames, 1)), 1)
+    bounds = [round(total_frames * i / shards) for i in range(shards + 1)]
+    return [(bounds[i], bounds[i + 1], bounds[i + 1] + overlap_frames if i < shards - 1 else None)
+            for i in range(shards)]
+
+
+def _process_segment(task: Dict) -> Dict:
+    """工作进程：处理一段视频，返回穿越事件和两端重叠区内的轨迹框"""
+    from main import TrafficFlowCounter
+
+    start, stop, read_stop = task['segment']
+    factory = task['detector_factory']
+    system = TrafficFlowCounter(model_path=task['model_path'], detector=factory() if factory else None,
+                                backend=task['backend'], threads=task['threads'])
+    seek = getattr(system.detector, "seek", None)
+    if seek is not None:
+        seek(start)  # 按帧号产生结果的检测器（桩检测器）同步到起始帧
+
+    cap = cv2.VideoCapture(task['video_path'])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    collector = _EventCollector()
+    counter = TrafficCounter(task['lines'], verbose=False, event_sink=collector)
+    head_stop = start + task['overlap_frames']
+    head, tail = {}, {}
+
+    frame_idx = start
+    timestamp = first_timestamp = None
+    while read_stop is None or frame_idx < read_stop:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        if first_timestamp is None:
+            first_timestamp = timestamp
+        detections = system.detect(frame)
+        tracks = system.track(detections, frame)
+        system.update_counts(tracks, counter, timestamp)
+        if frame_idx < head_stop or frame_idx >= stop:
+            boxes = (tracks.track_ids.copy(), tracks.xyxy.copy())
+            if frame_idx < head_stop:
+                head[frame_idx] = boxes
+            if frame_idx >= stop:
+                tail[frame_idx] = boxes
+        frame_idx += 1
+    cap.release()
+
+    # 事件帧号为段内从 1 开始的序号，换算为全局帧号
+    events = [(start + frame - 1, event_time, track_id, vehicle_type, line_name, direction)
+              for frame, event_time, track_id, vehicle_type, line_name, direction in collector.events]
+    return {'segment': task['segment'], 'frames_read': frame_idx - start,
+            'first_timestamp': first_timestamp, 'last_timestamp': timestamp,
+            'events': events, 'head': head, 'tail': tail}
+
+
+def match_tracks(tail: Dict, head: Dict, iou_threshold: float = 0.5) -> Dict[int, int]:
+    """在重叠区内匹配前一段（tail）和后一段（head）的轨迹，返回 {后一段ID: 前一段ID}
+
+    逐帧统计两段轨迹框 IoU 达到阈值的次数，按次数从多到少一对一分配。
+    """
+    votes: Dict[Tuple[int, int], int] = {}
+    for frame_idx, (prev_ids, prev_boxes) in tail.items():
+        if frame_idx not in head:
+            continue
+        next_ids, next_boxes = head[frame_idx]
+        if len(prev_ids) == 0 or len(next_ids) == 0:
+            continue
+        rows, cols = np.nonzero(box_iou(prev_boxes, next_boxes) >= iou_threshold)
+        for row, col in zip(rows, cols):
+            key = (int(next_ids[col]), int(prev_ids[row]))
+            votes[key] = votes.get(key, 0) + 1
+
+    mapping, used = {}, set()
+    for (next_id, prev_id), _ in sorted(votes.items(), key=lambda item: -item[1]):
+        if next_id not in mapping and prev_id not in used:
+            mapping[next_id] = prev_id
+            used.add(prev_id)
+    return mapping
+
+
+def merge_segments(results: List[Dict], lines: List[Dict], overlap_frames: int, iou_threshold: float = 0.5,
+                   flow_config: Optional[Dict] = None) -> TrafficCounter:
+    """拼接各段轨迹并合并穿越事件
+
+    重叠区的穿越归前一段（其追踪器已连续运行），后一段只在重叠区之后的事件有效；
+    拼接后同一辆车使用同一个全局ID，按帧顺序重放事件，同一车辆在同一条线只计一次。
+    """
+    # 全局ID：(段号, 段内ID)，拼接到前一段的轨迹沿用前一段的全局ID
+    global_ids: List[Dict[int, Tuple[int, int]]] = [{} for _ in results]
+    for seg in range(1, len(results)):
+        for next_id, prev_id in match_tracks(results[seg - 1]['tail'], results[seg]['head'],
+                                             iou_threshold).items():
+            global_ids[seg][next_id] = global_ids[seg - 1].get(prev_id, (seg - 1, prev_id))
+
+    line_index = {line_data['name']: idx for idx, line_data in reversed(list(enumerate(lines)))}
+    counter = TrafficCounter(lines, verbose=False, flow_config=flow_config)
+    if counter.flow is not None and results and results[0]['first_timestamp'] is not None:
+        counter.flow.advance(results[0]['first_timestamp'])  # 时间窗口从视频开头算起
+    for seg, result in enumerate(results):
+        start = result['segment'][0]
+        accept_from = start + overlap_frames if seg > 0 else start
+        for frame, timestamp, track_id, vehicle_type, line_name, direction in result['events']:
+            if frame < accept_from:
+                continue
+            if seg + 1 < len(results) and frame >= results[seg + 1]['segment'][0] + overlap_frames:
+                continue  # 由下一段负责（读取截止帧之后不会有事件，此处只是防御）
+            global_id = global_ids[seg].get(track_id, (seg, track_id))
+            # 事件文件的帧号从 1 开始
+            counter.add_crossing(global_id, line_index[line_name], vehicle_type, timestamp, frame + 1, direction)
+
+    last_timestamp = results[-1]['last_timestamp'] if results else None
+    if counter.flow is not None and last_timestamp is not None:
+        counter.flow.advance(last_timestamp)  # 与串行处理一样推进到视频结束
+    return counter
+
+
+def count_video_sharded(video_path: str, lines: List[Dict], model_path: str, shards: Optional[int] = None,
+                        overlap_seconds: float = 2.0, iou_threshold: float = 0.5,
+                        detector_factory: Optional[Callable] = None,
+                        flow_config: Optional[Dict] = None, backend: str = "torch",
+                        threads: Optional[int] = None) -> Tuple[TrafficCounter, Dict]:
+    """分段并行处理整个视频，返回合并后的计数器和运行统计
+
+    shards 默认等于 CPU 核心数；detector_factory 为可序列化的无参函数，为空时每个进程按 backend 加载 model_path。
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"无法打开视频: {video_path}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+
+    if backend == "onnx" and detector_factory is None:
+        model_path = export_onnx(model_path, MODEL_CONFIG["imgsz"], MODEL_CONFIG["export_dir"])  # 各进程共用导出结果
+    overlap_frames = max(int(round(overlap_seconds * fps)), 1)
+    segments = plan_segments(total_frames, shards or os.cpu_count() or 1, overlap_frames)
+    tasks = [{'video_path': video_path, 'lines': lines, 'model_path': model_path,
+              'detector_factory': detector_factory, 'backend': backend, 'threads': threads,
+              'segment': segment, 'overlap_frames': overlap_frames}
+             for segment in segments]
+
+    start = time.perf_counter()
+    # spawn 启动的进程各自初始化模型和推理库，避免 fork 复制已加载的推理状态
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(tasks), mp_context=context) as pool:
+        results = list(pool.map(_process_segment, tasks))
+    counter = merge_segments(results, lines, overlap_frames, iou_threshold, flow_config)
+    elapsed = time.perf_counter() - start
+
+    frames = sum(min(result['frames_read'], segment[1] - segment[0]) if segment[2] is not None
+                 else result['frames_read'] for result, segment in zip(results, segments))
+    stats = {
+        'frames': frames,
+        'seconds': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+        'shards': len(segments),
+        'overlap_frames': overlap_frames
+    }
+    return counter, stats
@@ -0,0 +1,127 @@
+"""
+自适应检测间隔模块
+根据轨迹速度和到最近检测线的距离选择下一次检测前跳过的帧数；跳过的帧只 grab 不解码，
+其轨迹位置由前后两次检测线性插值，计数器仍然逐帧检查穿越
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+from .detector import Detections, box_iou
+
+
+def distance_to_lines(points: np.ndarray, lines: List[Dict]) -> np.ndarray:
+    """各点到最近检测线（线段）的距离 (N,)，没有检测线时为 inf"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if not lines:
+        return np.full(len(points), np.inf)
+    segments = np.array([line_data['points'] for line_data in lines], dtype=np.float64).reshape(-1, 2, 2)
+    start, vec = segments[:, 0], segments[:, 1] - segments[:, 0]                 # (L, 2)
+    length_sq = np.maximum((vec ** 2).sum(axis=1), 1e-9)
+    rel = points[:, None, :] - start[None]                                       # (N, L, 2)
+    t = np.clip((rel * vec[None]).sum(axis=2) / length_sq, 0.0, 1.0)              # (N, L)
+    nearest = start[None] + t[..., None] * vec[None]
+    return np.hypot(*(points[:, None, :] - nearest).transpose(2, 0, 1)).min(axis=1)
+
+
+class StrideScheduler:
+    """自适应检测间隔
+
+    跳过的帧仍然推进追踪器（ByteTracker.advance），卡尔曼滤波按帧预测，间隔变化不影响速度估计。
+    下一次检测的间隔取以下约束的最小值，再限制在 [1, max_stride] 内：
+    - 关联约束：两次检测之间每条轨迹在 x、y 方向的位移占检测框宽、高的比例之和不超过 max_shift，
+      限制车辆加减速时卡尔曼预测的误差，使 IoU 关联不断轨
+    - 检测线约束：距最近检测线 near_distance 像素以内且正在驶近的轨迹，间隔不超过其到达检测线所需帧数的
+      line_fraction 倍，越接近检测线检测越密
+    - 刚确认、还没有速度估计的轨迹，以及与所有轨迹的 IoU 都低于 match_iou 的检测（新驶入的车辆）逐帧检测：
+      ByteTrack 的新轨迹需要连续两帧检测才能确认。只考虑达到追踪器新轨迹阈值的检测，
+      更低的检测（如持续存在的低分误检）永远不会成为轨迹，不能因此一直逐帧检测
+    画面中没有车辆时使用 max_stride；间隔每次最多翻倍。
+    """
+
+    def __init__(self, max_stride: int = 6, max_shift: float = 1.0, near_distance: float = 150,
+                 line_fraction: float = 0.5, match_iou: float = 0.3):
+        self.max_stride = max(int(max_stride), 1)
+        self.max_shift = max_shift
+        self.near_distance = near_distance
+        self.line_fraction = line_fraction
+        self.match_iou = match_iou
+        self.lines = None
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "StrideScheduler":
+        return cls(config["max_stride"], config["max_shift"], config["near_distance"], config["line_fraction"],
+                   config["match_iou"])
+
+    def set_lines(self, lines: List[Dict]) -> None:
+        """设置检测线（检测线约束使用）"""
+        self.lines = lines
+
+    def reset(self) -> None:
+        """处理下一个视频前调用（同时清零统计）"""
+        self.stride = 1
+        self._prev = {}  # track_id -> 上一次检测时的检测框
+        self.frames = 0
+        self.detections_run = 0
+
+    @property
+    def detect_ratio(self) -> float:
+        """实际检测的帧占全部帧的比例"""
+        return self.detections_run / self.frames if self.frames else 1.0
+
+    def interpolate(self, tracks: Detections, skipped: int) -> List[Detections]:
+        """上一次检测与本次检测之间跳过的 skipped 帧的轨迹（按帧顺序）
+
+        只插值两次检测中都出现的轨迹；置信度和类别取本次检测的值。
+        """
+        if skipped <= 0:
+            return []
+        common = [row for row, track_id in enumerate(tracks.track_ids) if int(track_id) in self._prev]
+        if not common:
+            return [Detections(track_ids=[]) for _ in range(skipped)]
+        current = tracks[np.array(common)]
+        previous = np.stack([self._prev[int(track_id)] for track_id in current.track_ids])
+        result = []
+        for step in range(1, skipped + 1):
+            weight = step / (skipped + 1)
+            boxes = previous + (current.xyxy - previous) * weight
+            result.append(Detections(boxes, current.conf, current.cls, current.track_ids))
+        return result
+
+    def update(self, detections: Detections, tracks: Detections, elapsed: int) -> int:
+        """根据本次检测结果选择下一次检测的间隔
+
+        detections 为达到追踪器新轨迹阈值的检测，tracks 为本次输出的轨迹，elapsed 为距上一次检测的帧数。
+        """
+        self.frames += elapsed
+        self.detections_run += 1
+
+        stride = float(self.max_stride)
+        if len(detections) and (not len(tracks)
+                                or (box_iou(detections.xyxy, tracks.xyxy).max(axis=1) < self.match_iou).any()):
+            stride = 1
+        if len(tracks):
+            centers = (tracks.xyxy[:, :2] + tracks.xyxy[:, 2:]) / 2
+            sizes = np.maximum(tracks.xyxy[:, 2:] - tracks.xyxy[:, :2], 1.0)
+            distance = distance_to_lines(centers, self.lines)
+            for row, track_id in enumerate(tracks.track_ids):
+                prev = self._prev.get(int(track_id))
+                if prev is None:
+                    stride = 1
+                    continue
+                prev_center = (prev[:2] + prev[2:]) / 2
+                velocity = (centers[row] - prev_center) / max(elapsed, 1)
+                shift = (np.abs(velocity) / sizes[row]).sum()  # 每帧位移占检测框宽、高的比例
+                if shift < 1e-6:
+                    continue
+                stride = min(stride, self.max_shift / shift)
+                speed = np.hypot(*velocity)
+                prev_distance = distance_to_lines(prev_center, self.lines)[0]
+                if distance[row] < self.near_distance and distance[row] < prev_distance:
+                    stride = min(stride, self.line_fraction * distance[row] / speed)
+
+        self._prev = {int(track_id): box.copy() for track_id, box in zip(tracks.track_ids, tracks.xyxy)}
+        self.stride = int(min(max(stride, 1), self.max_stride, 2 * self.stride))
+        return self.stride
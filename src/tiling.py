@@ -0,0 +1,179 @@
+"""
+分块检测模块
+高分辨率画面切成互相重叠的原分辨率小块，与（可选的）缩小后的整帧一起做一次批量推理，
+各块的检测框还原到整帧坐标后跨块合并，远处的小目标不会因整帧缩小而丢失
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .detector import Detections
+
+
+def _positions(length: int, tile: int, stride: int) -> List[int]:
+    """一个方向上各块的起点，最后一块贴齐画面边缘"""
+    if length <= tile:
+        return [0]
+    positions = list(range(0, length - tile, stride))
+    return positions + [length - tile]
+
+
+def plan_tiles(frame_shape: Tuple[int, ...], tile_size: int = 640, overlap: float = 0.2,
+               regions: Optional[List[Tuple[int, int, int, int]]] = None) -> List[Tuple[int, int, int, int]]:
+    """分块方案 [(x1, y1, x2, y2)]
+
+    相邻块重叠 overlap × tile_size 像素；给出 regions 时只保留与其中任一区域相交的块。
+    """
+    height, width = frame_shape[:2]
+    stride = max(int(tile_size * (1 - overlap)), 1)
+    tiles = [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+             for y in _positions(height, tile_size, stride) for x in _positions(width, tile_size, stride)]
+    if regions is None:
+        return tiles
+    return [tile for tile in tiles
+            if any(tile[0] < rx2 and rx1 < tile[2] and tile[1] < ry2 and ry1 < tile[3]
+                   for rx1, ry1, rx2, ry2 in regions)]
+
+
+def line_regions(lines: List[Dict], margin: int) -> List[Tuple[int, int, int, int]]:
+    """每条检测线外扩 margin 像素的矩形区域（车辆驶近和驶离检测线的范围）"""
+    regions = []
+    for line_data in lines:
+        (x1, y1), (x2, y2) = line_data['points']
+        regions.append((min(x1, x2) - margin, min(y1, y2) - margin, max(x1, x2) + margin, max(y1, y2) + margin))
+    return regions
+
+
+def merge_detections(detections: Detections, sources: np.ndarray, truncated: Optional[np.ndarray] = None,
+                     threshold: float = 0.6) -> Detections:
+    """跨块合并：所有框按置信度从高到低贪心合并
+
+    sources 为每个框来自的块（整帧检测单独算一个来源），只合并来自不同来源的框：同一块内的框已经过
+    检测器的 NMS，互相重叠的是不同车辆；不同块的框相交时必然位于两块的重叠带内，即块的接缝附近。
+    交集占较小框面积的 threshold 以上、且类别相同时视为同一目标；truncated 标记被块的内侧边缘截断的框，
+    截断的半个车辆框常被识别为其他类别（如半辆轿车识别为摩托车），涉及截断框时不要求类别相同。
+    每个来源最多并入一个框（重叠比例最高者）。保留的框扩展为所有合并框的外接框、置信度取最高者，
+    类别取其中面积最大（最完整）的框。
+    """
+    if len(detections) < 2:
+        return detections
+    order = np.argsort(-detections.conf, kind="stable")
+    boxes = detections.xyxy[order].copy()
+    conf, cls = detections.conf[order], detections.cls[order].copy()
+    sources = np.asarray(sources)[order]
+    truncated = np.zeros(len(boxes), dtype=bool) if truncated is None else np.asarray(truncated)[order]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    alive = np.ones(len(boxes), dtype=bool)
+    kept = []
+    for i in range(len(boxes)):
+        if not alive[i]:
+            continue
+        kept.append(i)
+        rest = np.nonzero(alive)[0]
+        rest = rest[(rest > i) & (sources[rest] != sources[i])]
+        if len(rest) == 0:
+            continue
+        w = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        h = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        ios = w * h / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        same = (cls[rest] == cls[i]) | truncated[rest] | truncated[i]
+        candidates = np.nonzero((ios >= threshold) & same)[0]
+        candidates = candidates[np.argsort(-ios[candidates], kind="stable")]
+        _, first = np.unique(sources[rest[candidates]], return_index=True)
+        merged = rest[candidates[first]]
+        if len(merged):
+            largest = merged[areas[merged].argmax()]
+            if areas[largest] > areas[i]:
+                cls[i] = cls[largest]
+            boxes[i, :2] = np.minimum(boxes[i, :2], boxes[merged, :2].min(axis=0))
+            boxes[i, 2:] = np.maximum(boxes[i, 2:], boxes[merged, 2:].max(axis=0))
+            alive[merged] = False
+    return Detections(boxes[kept], conf[kept], cls[kept])
+
+
+def truncated_boxes(boxes: np.ndarray, tile: Tuple[int, int, int, int], frame_shape: Tuple[int, ...],
+                    margin: float = 2.0) -> np.ndarray:
+    """块内坐标的框是否贴着块的内侧边缘（不是画面边缘的那几条边），即被分块截断"""
+    x1, y1, x2, y2 = tile
+    height, width = frame_shape[:2]
+    result = np.zeros(len(boxes), dtype=bool)
+    if x1 > 0:
+        result |= boxes[:, 0] <= margin
+    if y1 > 0:
+        result |= boxes[:, 1] <= margin
+    if x2 < width:
+        result |= boxes[:, 2] >= x2 - x1 - margin
+    if y2 < height:
+        result |= boxes[:, 3] >= y2 - y1 - margin
+    return result
+
+
+class Tiler:
+    """分块检测
+
+    每帧的所有块（full_frame 时再加上整帧）合并为一次 detect_batch 调用，结果还原到整帧坐标后跨块合并
+    （只合并来自不同块或整帧的框）。
+    near_lines 时只检测与检测线外扩 line_margin 像素的区域相交的块，块数少得多，但区域之外的车辆
+    只能由整帧检测发现（full_frame 关闭时不检测）。分块方案按画面尺寸缓存。
+    """
+
+    def __init__(self, tile_size: int = 640, overlap: float = 0.2, near_lines: bool = False,
+                 line_margin: int = 200, full_frame: bool = True, merge_threshold: float = 0.6):
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.near_lines = near_lines
+        self.line_margin = line_margin
+        self.full_frame = full_frame
+        self.merge_threshold = merge_threshold
+        self.lines = None
+        self._plans = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "Tiler":
+        return cls(config["tile_size"], config["overlap"], config["near_lines"], config["line_margin"],
+                   config["full_frame"], config["merge_threshold"])
+
+    def set_lines(self, lines: List[Dict]) -> None:
+        """设置检测线（near_lines 时决定保留哪些块）"""
+        self.lines = lines
+        self._plans.clear()
+
+    def tiles_for(self, frame_shape: Tuple[int, ...]) -> List[Tuple[int, int, int, int]]:
+        """某一画面尺寸的分块方案"""
+        key = frame_shape[:2]
+        if key not in self._plans:
+            regions = line_regions(self.lines, self.line_margin) if self.near_lines and self.lines else None
+            tiles = plan_tiles(frame_shape, self.tile_size, self.overlap, regions)
+            # 画面不大于一块时分块没有意义
+            if len(tiles) == 1 and tiles[0] == (0, 0, key[1], key[0]):
+                tiles = []
+            self._plans[key] = tiles
+        return self._plans[key]
+
+    def detect(self, detector, frame) -> Detections:
+        """分块检测一帧"""
+        tiles = self.tiles_for(frame.shape)
+        if not tiles:
+            return detector.detect(frame)
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        regions = list(tiles)
+        if self.full_frame:
+            crops.append(frame)
+            regions.append((0, 0, frame.shape[1], frame.shape[0]))
+        results = detector.detect_batch(crops)
+
+        boxes, conf, cls, sources, truncated = [], [], [], [], []
+        for source, (region, result) in enumerate(zip(regions, results)):
+            if len(result) == 0:
+                continue
+            x, y = region[:2]
+            boxes.append(result.xyxy + np.array([x, y, x, y], dtype=np.float32))
+            conf.append(result.conf)
+            cls.append(result.cls)
+            sources.append(np.full(len(result), source))
+            truncated.append(truncated_boxes(result.xyxy, region, frame.shape))
+        if not boxes:
+            return Detections()
+        merged = Detections(np.concatenate(boxes), np.concatenate(conf), np.concatenate(cls))
+        return merge_detections(merged, np.concatenate(sources), np.concatenate(truncated), self.merge_threshold)
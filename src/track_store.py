@@ -0,0 +1,139 @@
+"""
+轨迹存储模块
+预分配的 NumPy 环形缓冲区，容量固定，长期运行时内存不增长
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+
+class TrackStore:
+    """定长轨迹存储
+
+    每个轨迹占用一个槽位，槽位内是长度为 history 的环形缓冲；轨迹ID到槽位的映射
+    随淘汰同步删除。槽位用尽时淘汰最久未出现的轨迹。
+    """
+
+    def __init__(self, capacity: int = 1024, history: int = 5):
+        self.capacity = capacity
+        self.history = history
+        self.positions = np.zeros((capacity, history, 2), dtype=np.int32)
+        self.lengths = np.zeros(capacity, dtype=np.int32)        # 有效点数（不超过 history）
+        self.heads = np.zeros(capacity, dtype=np.int32)          # 下一次写入的位置
+        self.last_frame = np.zeros(capacity, dtype=np.int64)     # 最近一次出现的帧号
+        self.last_time = np.zeros(capacity, dtype=np.float64)    # 最近一次出现的时间（秒）
+        self.slot_ids = np.full(capacity, -1, dtype=np.int64)    # 槽位对应的轨迹ID，-1 表示空闲
+        self._slots: Dict[int, int] = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self._evicted: List[int] = []  # 因容量不足被淘汰、尚未上报的ID
+
+    def __contains__(self, track_id) -> bool:
+        return track_id in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def append(self, track_id: int, position: Tuple[int, int], frame_idx: int, timestamp: float) -> None:
+        """追加轨迹点，超出 history 时覆盖最旧的点"""
+        slot = self._slots.get(track_id)
+        if slot is None:
+            slot = self._allocate(track_id, frame_idx, timestamp)
+
+        head = self.heads[slot]
+        self.positions[slot, head] = position
+        self.heads[slot] = (head + 1) % self.history
+        if self.lengths[slot] < self.history:
+            self.lengths[slot] += 1
+        self.last_frame[slot] = frame_idx
+        self.last_time[slot] = timestamp
+
+    def append_batch(self, track_ids, positions, frame_idx: int, timestamp: float) -> np.ndarray:
+        """批量追加一帧内各轨迹的点（同一帧内ID不重复），返回追加前的倒数第 2 个点，
+        不存在的行为 NaN（与逐个调用 point(track_id, 2) 后再 append 的结果相同）"""
+        positions = np.asarray(positions).reshape(-1, 2)
+        slots = np.array([self._slots.get(track_id, -1) for track_id in track_ids], dtype=np.int64)
+        # 先刷新已有轨迹的出现时间，避免为新轨迹腾槽位时淘汰本帧仍在的轨迹
+        self.last_frame[slots[slots >= 0]] = frame_idx
+        for row in np.nonzero(slots < 0)[0]:
+            slots[row] = self._allocate(track_ids[row], frame_idx, timestamp)
+
+        heads = self.heads[slots]
+        lengths = self.lengths[slots]
+        previous = self.positions[slots, (heads - 2) % self.history].astype(np.float64)
+        previous[lengths < 2] = np.nan
+
+        self.positions[slots, heads] = positions
+        self.heads[slots] = (heads + 1) % self.history
+        self.lengths[slots] = np.minimum(lengths + 1, self.history)
+        self.last_frame[slots] = frame_idx
+        self.last_time[slots] = timestamp
+        return previous
+
+    def get(self, track_id: int) -> List[Tuple[int, int]]:
+        """按时间顺序返回轨迹点（从旧到新）"""
+        slot = self._slots.get(track_id)
+        if slot is None:
+            return []
+        length = self.lengths[slot]
+        start = (self.heads[slot] - length) % self.history
+        order = (start + np.arange(length)) % self.history
+        return [(int(x), int(y)) for x, y in self.positions[slot, order]]
+
+    def point(self, track_id: int, offset: int) -> Optional[Tuple[int, int]]:
+        """返回倒数第 offset 个点（offset=1 为最新点），不存在时返回 None"""
+        slot = self._slots.get(track_id)
+        if slot is None or offset > self.lengths[slot]:
+            return None
+        x, y = self.positions[slot, (self.heads[slot] - offset) % self.history]
+        return int(x), int(y)
+
+    def length(self, track_id: int) -> int:
+        """轨迹点数"""
+        slot = self._slots.get(track_id)
+        return 0 if slot is None else int(self.lengths[slot])
+
+    def remove(self, track_id: int) -> None:
+        """删除轨迹并释放槽位"""
+        slot = self._slots.pop(track_id, None)
+        if slot is not None:
+            self.lengths[slot] = 0
+            self.heads[slot] = 0
+            self.slot_ids[slot] = -1
+            self._free.append(slot)
+
+    def evict_stale(self, frame_idx: int, timestamp: float, max_age_frames: Optional[int] = None,
+                    max_age_seconds: Optional[float] = None) -> List[int]:
+        """淘汰超过 max_age_frames 帧或 max_age_seconds 秒未出现的轨迹，
+        返回本次（以及此前因容量不足）被淘汰的ID"""
+        used = self.slot_ids >= 0
+        stale = np.zeros(self.capacity, dtype=bool)
+        if max_age_frames is not None:
+            stale |= frame_idx - self.last_frame > max_age_frames
+        if max_age_seconds is not None:
+            stale |= timestamp - self.last_time > max_age_seconds
+
+        evicted, self._evicted = self._evicted, []
+        for slot in np.nonzero(used & stale)[0]:
+            track_id = int(self.slot_ids[slot])
+            self.remove(track_id)
+            evicted.append(track_id)
+        return evicted
+
+    def _allocate(self, track_id: int, frame_idx: int, timestamp: float) -> int:
+        """为新轨迹分配槽位，已满时淘汰最久未出现的轨迹
+        （新槽位立即记为本帧出现，同一帧内后续的新轨迹不会把它当作最旧的轨迹淘汰）"""
+        if not self._free:
+            used = np.nonzero(self.slot_ids >= 0)[0]
+            oldest = used[np.argmin(self.last_frame[used])]
+            oldest_id = int(self.slot_ids[oldest])
+            self.remove(oldest_id)
+            self._evicted.append(oldest_id)
+
+        slot = self._free.pop()
+        self._slots[track_id] = slot
+        self.slot_ids[slot] = track_id
+        self.lengths[slot] = 0
+        self.heads[slot] = 0
+        self.last_frame[slot] = frame_idx
+        self.last_time[slot] = timestamp
+        return slot
@@ -3,41 +3,76 @@
 用于追踪车辆轨迹和检测车辆穿越检测线
 """
 
+import time
 import cv2
 import numpy as np
 from typing import Dict, List, Tuple, Optional
+from .track_store import TrackStore
 
 
 class VehicleTracker:
     """车辆追踪器"""
     
-    def __init__(self):
-        self.vehicle_tracks = {}  # 存储每个车辆的历史位置
+    def __init__(self, max_history: int = 5, capacity: int = 1024,
+                 max_age_frames: Optional[int] = 90, max_age_seconds: Optional[float] = None):
+        # 存储每个车辆的历史位置（定长环形缓冲，超期未出现的车辆会被淘汰）
+        self.track_store = TrackStore(capacity, max_history)
+        self.max_age_frames = max_age_frames
+        self.max_age_seconds = max_age_seconds
+        self.frame_idx = 0
+        self.timestamp = 0.0
         self.class_names = {2: 'car', 3: 'motorcycle', 5: 'bus', 7: 'truck'}
     
+    @classmethod
+    def from_config(cls, config: Dict) -> "VehicleTracker":
+        """按 TRACKING_CONFIG 创建"""
+        return cls(
+            max_history=config["max_track_length"],
+            capacity=config["track_capacity"],
+            max_age_frames=config["max_track_age_frames"],
+            max_age_seconds=config["max_track_age_seconds"]
+        )
+    
     def update_tracks(self, track_id: int, position: Tuple[int, int]) -> None:
         """更新车辆轨迹"""
-        if track_id not in self.vehicle_tracks:
-            self.vehicle_tracks[track_id] = []
-        
-        self.vehicle_tracks[track_id].append(position)
-        # 保留最近5个位置
-        if len(self.vehicle_tracks[track_id]) > 5:
-            self.vehicle_tracks[track_id].pop(0)
+        self.track_store.append(track_id, position, self.frame_idx, self.timestamp)
+    
+    def update_tracks_batch(self, track_ids, positions) -> np.ndarray:
+        """批量更新一帧内所有车辆的轨迹，返回更新前各车辆的前一个位置（没有时为 NaN）"""
+        return self.track_store.append_batch(track_ids, positions, self.frame_idx, self.timestamp)
     
     def get_previous_position(self, track_id: int) -> Optional[Tuple[int, int]]:
         """获取车辆的前一个位置"""
-        if track_id in self.vehicle_tracks and len(self.vehicle_tracks[track_id]) > 1:
-            return self.vehicle_tracks[track_id][-2]
-        return None
+        return self.track_store.point(track_id, 2)
+    
+    def get_track(self, track_id: int) -> List[Tuple[int, int]]:
+        """获取车辆的历史位置（从旧到新）"""
+        return self.track_store.get(track_id)
+    
+    def start_frame(self, timestamp: Optional[float] = None) -> List[int]:
+        """开始新的一帧：推进帧号并淘汰过期轨迹，返回被淘汰的车辆ID
+        
+        timestamp 为视频时间或系统时间（秒），为空时使用单调时钟
+        """
+        self.frame_idx += 1
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        return self.track_store.evict_stale(
+            self.frame_idx, self.timestamp, self.max_age_frames, self.max_age_seconds
+        )
     
     def draw_tracks(self, frame, track_id: int) -> None:
         """绘制车辆轨迹"""
-        if track_id in self.vehicle_tracks and len(self.vehicle_tracks[track_id]) > 1:
-            for i in range(1, len(self.vehicle_tracks[track_id])):
-                pt1 = self.vehicle_tracks[track_id][i-1]
-                pt2 = self.vehicle_tracks[track_id][i]
-                cv2.line(frame, pt1, pt2, (0, 255, 255), 1)
+        self.draw_track_points(frame, self.get_track(track_id))
+    
+    def get_track_snapshot(self, track_ids) -> Dict[int, List[Tuple[int, int]]]:
+        """复制指定车辆的轨迹点（供其他线程绘制）"""
+        return {track_id: self.get_track(track_id) for track_id in track_ids}
+    
+    @staticmethod
+    def draw_track_points(frame, points: List[Tuple[int, int]]) -> None:
+        """按顺序连接轨迹点"""
+        for i in range(1, len(points)):
+            cv2.line(frame, points[i-1], points[i], (0, 255, 255), 1)
     
     @staticmethod
     def point_to_line_distance(px: int, py: int, x1: int, y1: int, x2: int, y2: int) -> float:
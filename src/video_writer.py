@@ -0,0 +1,170 @@
+"""
+结果视频输出模块
+标注后的帧由后台线程通过 cv2.VideoWriter 编码写入，处理循环只做一次入队操作；
+可以写出完整视频，也可以只写出每次穿越前后的片段
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+from typing import Optional
+
+import cv2
+
+
+VIDEO_POLICIES = ("block", "drop")
+
+_CLOSE = object()  # 关闭标记
+
+
+def video_path(output_dir: str, name: str, ext: str = ".mp4") -> str:
+    """结果视频路径：<output_dir>/<name>_annotated<ext>"""
+    return os.path.join(output_dir, f"{name}_annotated{ext}")
+
+
+class AsyncVideoWriter:
+    """后台线程视频写入器
+
+    write() 把帧放入容量为 queue_size 的队列：队列满时 policy 为 "block" 则等待（不丢帧），
+    为 "drop" 则丢弃该帧并计数（不拖慢处理循环）。入队的帧在写出前不能再被修改。
+
+    clip_seconds 为 (前, 后) 秒数时只写片段：mark_event() 标记发生穿越的帧，写出该帧之前和之后
+    指定时长的画面，每个片段一个文件 <path 去掉扩展名>_clip<序号><扩展名>，重叠的片段合并。
+    片段模式下最近 前 秒的帧保存在后台线程的缓冲中。
+    """
+
+    def __init__(self, path: str, fps: float, fourcc: str = "mp4v", queue_size: int = 64,
+                 policy: str = "block", clip_seconds: Optional[tuple] = None):
+        if policy not in VIDEO_POLICIES:
+            raise ValueError(f"不支持的队列策略: {policy}（可选 {', '.join(VIDEO_POLICIES)}）")
+        self.path = path
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.policy = policy
+        self.clip_seconds = clip_seconds
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.clip_paths = []
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 片段模式的状态，只在后台线程中使用
+        if clip_seconds is not None:
+            self._pre_frames = int(round(clip_seconds[0] * self.fps))
+            self._post_frames = int(round(clip_seconds[1] * self.fps))
+            self._preroll = deque(maxlen=max(self._pre_frames, 1))
+        self._clip_from = None   # 待开始片段的第一帧
+        self._clip_until = None  # 当前（或待开始）片段的最后一帧
+
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._events = queue.SimpleQueue()  # 事件不受队列容量限制，也不会被丢弃
+        self._writer = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, frame, frame_idx: int) -> bool:
+        """提交一帧（frame_idx 与 mark_event 使用同一编号），被丢弃时返回 False"""
+        if self.policy == "drop":
+            try:
+                self._frames.put_nowait((frame_idx, frame))
+            except queue.Full:
+                self.frames_dropped += 1
+                return False
+        else:
+            self._frames.put((frame_idx, frame))
+        return True
+
+    def mark_event(self, frame_idx: int) -> None:
+        """标记第 frame_idx 帧发生了穿越（须在该帧 write 之前调用，非片段模式下忽略）"""
+        if self.clip_seconds is not None:
+            self._events.put(frame_idx)
+
+    def close(self) -> None:
+        """写完队列中剩余的帧并关闭文件"""
+        if self._thread is None:
+            return
+        self._frames.put(_CLOSE)
+        self._thread.join()
+        self._thread = None
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "AsyncVideoWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        """后台线程：按顺序编码写入"""
+        try:
+            while True:
+                item = self._frames.get()
+                if item is _CLOSE:
+                    break
+                frame_idx, frame = item
+                if self.clip_seconds is None:
+                    self._write(self.path, frame)
+                    continue
+                while True:
+                    try:
+                        self._on_event(self._events.get_nowait())
+                    except queue.Empty:
+                        break
+                self._on_clip_frame(frame_idx, frame)
+        except Exception as e:
+            self._error = e
+            # 出错后继续取走帧直到关闭，避免调用方在队列满时等待
+            while self._frames.get() is not _CLOSE:
+                pass
+        finally:
+            self._release()
+
+    def _on_event(self, frame_idx: int) -> None:
+        """穿越事件：延长当前片段，或登记一个新片段"""
+        if self._writer is not None:
+            self._clip_until = max(self._clip_until, frame_idx + self._post_frames)
+        elif self._clip_from is not None and frame_idx - self._pre_frames <= self._clip_until:
+            self._clip_until = max(self._clip_until, frame_idx + self._post_frames)
+        else:
+            self._clip_from = frame_idx - self._pre_frames
+            self._clip_until = frame_idx + self._post_frames
+
+    def _on_clip_frame(self, frame_idx: int, frame) -> None:
+        """片段模式下处理一帧：写入片段或放入前置缓冲"""
+        if self._writer is None:
+            if self._clip_from is None or frame_idx < self._clip_from:
+                if self._pre_frames:
+                    self._preroll.append((frame_idx, frame))
+                return
+            root, ext = os.path.splitext(self.path)
+            path = f"{root}_clip{len(self.clip_paths) + 1:03d}{ext}"
+            self.clip_paths.append(path)
+            for buffered_idx, buffered in self._preroll:
+                if buffered_idx >= self._clip_from:
+                    self._write(path, buffered)
+            self._preroll.clear()
+        self._write(self.clip_paths[-1], frame)
+        if frame_idx >= self._clip_until:
+            self._release()
+            self._clip_from = self._clip_until = None
+
+    def _write(self, path: str, frame) -> None:
+        """写入一帧，第一帧时按画面尺寸打开 VideoWriter"""
+        if self._writer is None:
+            height, width = frame.shape[:2]
+            self._writer = cv2.VideoWriter(path, self.fourcc, self.fps, (width, height))
+            if not self._writer.isOpened():
+                self._writer = None
+                raise IOError(f"无法创建视频文件: {path}")
+        self._writer.write(frame)
+        self.frames_written += 1
+
+    def _release(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
@@ -4,11 +4,27 @@
 """
 
 import cv2
-from typing import List, Dict
+import numpy as np
+from typing import List, Dict, Tuple
 
 
 class Visualizer:
-    """可视化工具"""
+    """可视化工具
+    
+    静态方法逐帧直接绘制；draw_overlay 使用缓存图层：检测线几何只渲染一次，
+    计数文字和统计面板只在计数变化时重新渲染，每帧只做一次合成。
+    """
+    
+    def __init__(self):
+        self._base_lines = None    # 检测线几何图层对应的检测线列表
+        self._base_shape = None    # 以及画面尺寸
+        self._base = None          # (黑底图层, 覆盖率)，只含检测线和端点
+        self._layer = None         # (黑底图层, 覆盖率)，含计数文字和统计面板
+        self._layer_key = None     # 图层对应的计数
+        self._overlay = None       # 合成用的颜色
+        self._mask = None          # 合成用的掩码
+        self._text_rects = []      # 当前文字占用的区域
+        self._panel_bottom = 0     # 统计面板最后一行的纵坐标
     
     @staticmethod
     def draw_detection_box(frame, box, track_id: int, vehicle_type: str) -> None:
@@ -23,21 +39,13 @@ class Visualizer:
         cv2.circle(frame, (cx, cy), 4, (255, 0, 0), -1)
     
     @staticmethod
-    def draw_low_confidence_detections(frame, detections) -> None:
-        """绘制低置信度检测结果"""
-        for detection in detections:
-            boxes = detection.boxes
-            if boxes is not None:
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    conf = box.conf[0].cpu().numpy()
-                    
-                    # 只显示置信度在0.2-0.3之间的检测
-                    if 0.2 <= conf < 0.3:
-                        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (128, 128, 128), 1)
-                        cv2.putText(frame, f"Low:{conf:.2f}", (x1, y1 - 5), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (128, 128, 128), 1)
+    def draw_low_confidence_detections(frame, detections, min_conf: float = 0.2, max_conf: float = 0.3) -> None:
+        """绘制低置信度检测结果（只显示置信度在 [min_conf, max_conf) 之间的检测）"""
+        low_conf = detections.filter(min_conf, max_conf)
+        for (x1, y1, x2, y2), conf in zip(low_conf.int_boxes(), low_conf.conf):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (128, 128, 128), 1)
+            cv2.putText(frame, f"Low:{conf:.2f}", (x1, y1 - 5), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (128, 128, 128), 1)
     
     @staticmethod
     def draw_detection_lines(frame, lines: List[Dict], line_counts: List[int]) -> None:
@@ -45,8 +53,6 @@ class Visualizer:
         for line_idx, line_data in enumerate(lines):
             points = line_data['points']
             color = line_data['color']
-            name = line_data['name']
-            count = line_counts[line_idx]
             
             # 绘制检测线
             cv2.line(frame, points[0], points[1], color, 3)
@@ -54,18 +60,37 @@ class Visualizer:
             cv2.circle(frame, points[1], 6, color, -1)
             
             # 在线的中点显示计数
-            mid_x = (points[0][0] + points[1][0]) // 2
-            mid_y = (points[0][1] + points[1][1]) // 2
-            cv2.putText(frame, f"{name}: {count}", (mid_x + 15, mid_y), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+            Visualizer._put_text(frame, Visualizer.line_label(line_data, line_counts[line_idx]))
     
     @staticmethod
     def draw_statistics(frame, lines: List[Dict], counter, detected_count: int) -> None:
         """绘制统计信息"""
+        texts, y_offset = Visualizer.statistics_texts(lines, counter)
+        for text in texts:
+            Visualizer._put_text(frame, text)
+        Visualizer.draw_detected_count(frame, detected_count, y_offset)
+    
+    @staticmethod
+    def draw_detected_count(frame, detected_count: int, y_offset: int) -> None:
+        """显示当前检测到的车辆数"""
+        cv2.putText(frame, f"Detected: {detected_count}", 
+                   (20, y_offset + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+    
+    @staticmethod
+    def line_label(line_data: Dict, count: int) -> Tuple:
+        """检测线中点的计数文字 (文字, 位置, 字号, 颜色, 线宽)"""
+        points = line_data['points']
+        mid_x = (points[0][0] + points[1][0]) // 2
+        mid_y = (points[0][1] + points[1][1]) // 2
+        return f"{line_data['name']}: {count}", (mid_x + 15, mid_y), 0.8, line_data['color'], 2
+    
+    @staticmethod
+    def statistics_texts(lines: List[Dict], counter) -> Tuple[List[Tuple], int]:
+        """统计面板的文字列表和最后一行的纵坐标"""
+        texts = []
         y_offset = 30
         total_count = counter.get_total_count()
-        cv2.putText(frame, f"Total Vehicles: {total_count}", (20, y_offset), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        texts.append((f"Total Vehicles: {total_count}", (20, y_offset), 1, (255, 255, 255), 2))
         
         # 显示每条线的详细计数和分类统计
         for line_idx, line_data in enumerate(lines):
@@ -76,8 +101,7 @@ class Visualizer:
             class_count = counter.get_class_counts(line_idx)
             
             # 显示总计数
-            cv2.putText(frame, f"{name}: {count} total", (20, y_offset), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+            texts.append((f"{name}: {count} total", (20, y_offset), 0.8, color, 2))
             
             # 显示分类计数（只显示非零的类别）
             y_offset += 25
@@ -88,9 +112,92 @@ class Visualizer:
             
             if class_info:
                 class_text = " | ".join(class_info)
-                cv2.putText(frame, f"  {class_text}", (30, y_offset), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 1)
+                texts.append((f"  {class_text}", (30, y_offset), 0.6, color, 1))
+        return texts, y_offset
+    
+    @staticmethod
+    def _put_text(canvas, text: Tuple, color=None) -> None:
+        """绘制 (文字, 位置, 字号, 颜色, 线宽)，color 不为空时替换颜色"""
+        content, org, scale, text_color, thickness = text
+        cv2.putText(canvas, content, org, cv2.FONT_HERSHEY_SIMPLEX, scale,
+                    text_color if color is None else color, thickness)
+    
+    @staticmethod
+    def _text_rect(text: Tuple, shape) -> Tuple[int, int, int, int]:
+        """文字占用的矩形区域 (x1, y1, x2, y2)，已裁剪到画面内"""
+        content, (x, y), scale, _, thickness = text
+        (width, height), baseline = cv2.getTextSize(content, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        pad = thickness + 2
+        return (max(x - pad, 0), max(y - height - pad, 0),
+                min(x + width + pad, shape[1]), min(y + baseline + pad, shape[0]))
+    
+    def draw_overlay(self, frame, lines: List[Dict], counter, detected_count: int) -> None:
+        """绘制检测线、计数和统计信息（效果同 draw_detection_lines + draw_statistics）"""
+        layer_key = (tuple(counter.line_counts),
+                     tuple(tuple(class_counts.values()) for class_counts in counter.line_class_counts))
+        if lines is not self._base_lines or frame.shape != self._base_shape:
+            self._render_base(frame.shape, lines)
+            self._layer_key = None
+        if layer_key != self._layer_key:
+            self._render_texts(lines, counter)
+            self._layer_key = layer_key
         
-        # 显示当前检测到的车辆数
-        cv2.putText(frame, f"Detected: {detected_count}", 
-                   (20, y_offset + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+        # 一次带掩码拷贝完成合成，耗时与检测线数量基本无关
+        cv2.copyTo(self._overlay, self._mask, frame)
+        self.draw_detected_count(frame, detected_count, self._panel_bottom)
+    
+    def _render_base(self, shape, lines: List[Dict]) -> None:
+        """渲染检测线几何（只在画面尺寸或检测线变化时执行）"""
+        overlay = np.zeros(shape, dtype=np.uint8)
+        alpha = np.zeros(shape[:2], dtype=np.uint8)
+        for line_data in lines:
+            points = line_data['points']
+            for canvas, color in ((overlay, line_data['color']), (alpha, 255)):
+                cv2.line(canvas, points[0], points[1], color, 3)
+                cv2.circle(canvas, points[0], 6, color, -1)
+                cv2.circle(canvas, points[1], 6, color, -1)
+        self._base = (overlay, alpha)
+        self._base_lines = lines
+        self._base_shape = shape
+        self._layer = (overlay.copy(), alpha.copy())
+        self._overlay = overlay.copy()
+        self._mask = np.zeros(shape[:2], dtype=np.uint8)
+        self._text_rects = []
+        self._finalize((0, 0, shape[1], shape[0]))
+    
+    def _render_texts(self, lines: List[Dict], counter) -> None:
+        """重新渲染计数文字和统计面板，只更新文字所在的矩形区域"""
+        texts, self._panel_bottom = self.statistics_texts(lines, counter)
+        texts = [self.line_label(line_data, counter.line_counts[line_idx])
+                 for line_idx, line_data in enumerate(lines)] + texts
+        rects = [self._text_rect(text, self._base_shape) for text in texts]
+        
+        # 先用检测线几何覆盖旧文字和新文字的区域，再画文字，最后更新这些区域的合成图层
+        dirty = list(dict.fromkeys(self._text_rects + rects))
+        layer, layer_alpha = self._layer
+        base, base_alpha = self._base
+        for x1, y1, x2, y2 in dirty:
+            layer[y1:y2, x1:x2] = base[y1:y2, x1:x2]
+            layer_alpha[y1:y2, x1:x2] = base_alpha[y1:y2, x1:x2]
+        for text in texts:
+            self._put_text(layer, text)
+            self._put_text(layer_alpha, text, 255)
+        for rect in dirty:
+            self._finalize(rect)
+        self._text_rects = rects
+    
+    def _finalize(self, rect: Tuple[int, int, int, int]) -> None:
+        """由黑底图层和覆盖率计算合成用的颜色和掩码
+        
+        文字抗锯齿时（OpenCV 5），覆盖不足一半的边缘像素不参与合成，其余像素按覆盖率还原颜色
+        """
+        x1, y1, x2, y2 = rect
+        layer = self._layer[0][y1:y2, x1:x2]
+        alpha = self._layer[1][y1:y2, x1:x2]
+        overlay = self._overlay[y1:y2, x1:x2]
+        overlay[:] = layer
+        edge = (alpha >= 128) & (alpha < 255)
+        if edge.any():
+            scale = 255.0 / alpha[edge][:, None]
+            overlay[edge] = np.minimum(layer[edge] * scale, 255).astype(np.uint8)
+        self._mask[y1:y2, x1:x2] = alpha >= 128
@@ -0,0 +1,86 @@
+"""
+车流量统计系统 - 检测线参数扫描
+基于检测缓存，在多核上并行评估多组候选检测线，并可与人工计数对比
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+
+from config.settings import OUTPUT_CONFIG, TRACKING_CONFIG
+from src.detection_cache import DetectionCache
+from src.line_config import load_lines
+from src.line_sweep import compare_ground_truth, sweep_line_configs
+
+
+CLASSES = ['car', 'motorcycle', 'bus', 'truck']
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="车流量统计 - 检测线参数扫描")
+    parser.add_argument("cache", help="检测缓存目录")
+    parser.add_argument("configs", nargs="+", help="候选检测线文件（JSON/YAML），支持通配符")
+    parser.add_argument("--ground-truth", default=None,
+                        help="人工计数 JSON，格式为 {线名: {\"total\": n, \"car\": n, ...}}")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数，默认使用全部 CPU 核心")
+    parser.add_argument("--output", default=None, help="结果表路径，默认 output/sweep_<缓存键>.csv")
+    return parser.parse_args()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    cache = DetectionCache(args.cache)
+
+    paths = []
+    for pattern in args.configs:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    configs = [{'name': os.path.splitext(os.path.basename(path))[0], 'lines': load_lines(path)}
+               for path in paths]
+
+    ground_truth = None
+    if args.ground_truth:
+        with open(args.ground_truth, encoding="utf-8") as f:
+            ground_truth = json.load(f)
+
+    print(f"缓存: {cache.meta['video']} ({len(cache)} 帧)，共 {len(configs)} 组检测线")
+    start = time.perf_counter()
+    results = sweep_line_configs(args.cache, configs, TRACKING_CONFIG, args.workers)
+    elapsed = time.perf_counter() - start
+
+    header = ['config', 'line', 'total'] + CLASSES
+    if ground_truth is not None:
+        header += ['error_total', 'class_abs_error']
+    rows = []
+    for result in results:
+        errors = compare_ground_truth(result, ground_truth) if ground_truth is not None else {}
+        for line in result['lines']:
+            row = [result['name'], line['name'], line['count']] + [line['classes'].get(c, 0) for c in CLASSES]
+            if ground_truth is not None:
+                line_errors = errors.get(line['name'])
+                if line_errors is None:
+                    row += ['', '']
+                else:
+                    # 分类绝对误差之和（人工计数没有分类时留空），不含总数误差
+                    class_errors = [abs(v) for k, v in line_errors.items() if k != 'total']
+                    row += [line_errors.get('total', ''), sum(class_errors) if class_errors else '']
+            rows.append(row)
+
+    output_file = args.output or os.path.join(OUTPUT_CONFIG["output_path"], f"sweep_{cache.meta['key']}.csv")
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+    widths = [max(len(str(v)) for v in column) for column in zip(header, *rows)]
+    for row in [header] + rows:
+        print("  ".join(str(v).ljust(width) for v, width in zip(row, widths)))
+    print(f"评估 {len(configs)} 组检测线耗时 {elapsed:.1f} s，结果已保存到 {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""后端对比基准的检测一致率测试"""
+
+import numpy as np
+
+from benchmarks.bench_backends import detection_agreement
+
+
+BOXES = np.array([[100, 100, 200, 180], [400, 300, 520, 400]], dtype=np.float32)
+CLASSES = np.array([2, 7])
+
+
+def test_agreement_tolerates_small_box_differences():
+    """不同后端的框有亚像素级差异时仍判定为一致"""
+    rng = np.random.default_rng(0)
+    noisy = BOXES + rng.uniform(-1.0, 1.0, BOXES.shape).astype(np.float32)
+    assert detection_agreement([(BOXES, CLASSES)], [(noisy, CLASSES)]) == 1.0
+
+
+def test_agreement_rejects_shifted_boxes_and_class_changes():
+    """超出 IoU 容差的偏移或类别不同不算一致"""
+    shifted = BOXES + np.array([15, 0, 15, 0], dtype=np.float32)
+    assert detection_agreement([(BOXES, CLASSES)], [(shifted, CLASSES)]) == 0.0
+    assert detection_agreement([(BOXES, CLASSES)], [(BOXES, CLASSES[::-1])]) == 0.0
+
+
+def test_agreement_counts_missing_detections():
+    assert detection_agreement([(BOXES, CLASSES)], [(BOXES[:1], CLASSES[:1])]) == 1 / 1.5
@@ -0,0 +1,49 @@
+"""TrafficCounter 测试"""
+
+from src.counter import TrafficCounter
+from src.vehicle_tracker import VehicleTracker
+
+
+LINES = [{'name': "Line 1", 'points': [(100, 0), (100, 200)]}]
+
+
+class RecordingSink:
+    """记录事件的写入器（与 EventSink.emit 接口相同）"""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, timestamp, frame, track_id, vehicle_type, line_name, direction) -> None:
+        self.events.append((timestamp, frame, track_id, vehicle_type, line_name, direction))
+
+
+def test_check_crossings_emits_event():
+    sink = RecordingSink()
+    counter = TrafficCounter(LINES, verbose=False, event_sink=sink)
+    tracker = VehicleTracker()
+    for timestamp, x in ((0.0, 90), (0.1, 95), (0.2, 110)):
+        tracker.start_frame(timestamp)
+        previous = tracker.update_tracks_batch([7], [(x, 50)])
+        counter.check_crossings([7], [(x, 50)], previous, [2], tracker)
+
+    assert counter.line_counts == [1]
+    assert sink.events == [(0.2, 3, 7, 'car', "Line 1", -1)]
+
+
+def test_add_crossing_emits_event():
+    """合并后的穿越与直接检测到的穿越一样写入事件，同一车辆只计一次"""
+    sink = RecordingSink()
+    counter = TrafficCounter(LINES, verbose=False, event_sink=sink)
+
+    assert counter.add_crossing(7, 0, 'truck', timestamp=12.5, frame_idx=375, direction=1)
+    assert not counter.add_crossing(7, 0, 'truck', timestamp=13.0, frame_idx=390, direction=1)
+    assert counter.line_counts == [1]
+    assert counter.get_class_counts(0)['truck'] == 1
+    assert sink.events == [(12.5, 375, 7, 'truck', "Line 1", 1)]
+
+
+def test_add_crossing_records_flow():
+    counter = TrafficCounter(LINES, verbose=False, flow_config={
+        'bin_seconds': 60, 'windows_minutes': [1], 'clock': "video"})
+    counter.add_crossing(7, 0, 'car', timestamp=5.0)
+    assert counter.get_flow(1)["Line 1"]['car'] == 1
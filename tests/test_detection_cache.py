@@ -0,0 +1,17 @@
+"""检测缓存测试"""
+
+from src.detection_cache import cache_key
+
+
+def test_cache_key_covers_detection_config(tmp_path):
+    """检测方式不同的运行使用不同的缓存键"""
+    video = tmp_path / "video.avi"
+    video.write_bytes(b"frames")
+    thresholds = {'detect': 0.1, 'track': 0.1, 'count': 0.1, 'tracker': "bytetrack.yaml"}
+    plain = {'backend': "torch", 'imgsz': 640, 'tiling': None, 'roi': None, 'motion': None, 'stride': None}
+
+    key = cache_key(str(video), "yolov8n.pt", thresholds, plain)
+    assert key == cache_key(str(video), "yolov8n.pt", thresholds, dict(plain))
+    assert key != cache_key(str(video), "yolov8n.pt", thresholds, dict(plain, imgsz=1280))
+    assert key != cache_key(str(video), "yolov8n.pt", thresholds, dict(plain, backend="onnx"))
+    assert key != cache_key(str(video), "yolov8n.pt", thresholds, dict(plain, stride={'max_stride': 6}))
@@ -0,0 +1,90 @@
+"""负载控制测试"""
+
+import json
+
+from src.load_shedder import LoadShedder
+
+
+def make_shedder(**kwargs):
+    """以 0 秒开始、第一帧视频时间为 0 的控制器"""
+    shedder = LoadShedder(**kwargs)
+    shedder.start(now=0.0)
+    shedder.observe(0.0, now=0.0)
+    return shedder
+
+
+def feed(shedder, now, latency):
+    """在 now 时刻完成一帧，该帧的端到端延迟为 latency"""
+    return shedder.observe(now - latency, now=now)
+
+
+def overload(shedder, start, seconds=3.0):
+    """延迟从 1 秒起持续上升，返回结束时间"""
+    for step in range(int(seconds * 2) + 1):
+        feed(shedder, start + step / 2, 1.0 + step / 2)
+    return start + seconds
+
+
+def idle(shedder, start, seconds):
+    """延迟为 0 持续 seconds 秒，返回结束时间"""
+    for step in range(int(seconds) + 1):
+        feed(shedder, start + step, 0.0)
+    return start + seconds
+
+
+def test_degrades_after_sustained_rising_latency():
+    shedder = make_shedder(target_latency=0.5, degrade_after=2.0)
+    assert feed(shedder, 1.0, 1.0) is None
+    assert feed(shedder, 2.0, 1.5) is None
+    assert feed(shedder, 3.0, 2.0) == 1
+    assert shedder.level_name == "no-preview"
+    assert shedder.events[0]['from'] == "normal" and shedder.events[0]['latency'] == 2.0
+
+
+def test_no_degrade_while_latency_is_falling():
+    """降级后积压仍在消化时不继续降级"""
+    shedder = make_shedder(target_latency=0.5, degrade_after=2.0)
+    for now, latency in [(1.0, 4.0), (2.0, 3.5), (3.0, 3.0), (4.0, 2.5), (5.0, 2.0), (6.0, 1.5), (7.0, 1.0)]:
+        assert feed(shedder, now, latency) is None
+    assert shedder.level == 0
+
+
+def test_recovers_with_doubling_wait_capped_at_eight_times():
+    shedder = make_shedder(target_latency=0.5, degrade_after=2.0, recover_after=10.0)
+    now = overload(shedder, 1.0)
+    assert shedder.level == 1 and shedder.recover_wait == 10.0
+
+    expected_waits = [20.0, 40.0, 80.0, 80.0]
+    for wait in [10.0] + expected_waits:
+        assert shedder.recover_wait == wait
+        now = idle(shedder, now + 1, wait - 1)
+        assert shedder.level == 1  # 等待时间未满
+        assert feed(shedder, now + 1, 0.0) == 0
+        now = overload(shedder, now + 2)
+        assert shedder.level == 1
+    assert shedder.recover_wait == 80.0
+
+
+def test_degrade_without_recent_recovery_resets_wait():
+    shedder = make_shedder(target_latency=0.5, degrade_after=2.0, recover_after=10.0, max_level=2)
+    now = overload(shedder, 1.0)
+    now = overload(shedder, now + 1)
+    assert shedder.level == 2 and shedder.recover_wait == 10.0
+
+
+def test_max_level():
+    shedder = make_shedder(target_latency=0.5, degrade_after=2.0, max_level=1)
+    overload(shedder, 1.0, seconds=20.0)
+    assert shedder.level == 1 and len(shedder.events) == 1
+
+
+def test_level_changes_are_logged_as_jsonl(tmp_path):
+    log_path = tmp_path / "logs" / "load.jsonl"
+    shedder = make_shedder(target_latency=0.5, degrade_after=2.0, recover_after=5.0, log_path=str(log_path))
+    now = overload(shedder, 1.0)
+    idle(shedder, now + 1, 5.0)
+
+    lines = [json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()]
+    assert [(line['from'], line['to']) for line in lines] == [("normal", "no-preview"), ("no-preview", "normal")]
+    assert lines == shedder.events
+    assert set(lines[0]) == {'time', 'video_time', 'elapsed', 'from', 'to', 'latency'}
@@ -0,0 +1,70 @@
+"""运动门控测试"""
+
+import warnings
+
+import cv2
+import numpy as np
+
+from src.motion_gate import MotionGate
+
+
+LINES = [{'points': [(640, 100), (640, 620)]}]
+
+
+def frame_with(*boxes):
+    """灰色背景上画若干白色方块"""
+    frame = np.full((720, 1280, 3), 70, dtype=np.uint8)
+    for x1, y1, x2, y2 in boxes:
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 255, 255), -1)
+    return frame
+
+
+def make_gate(lines=LINES, refresh_frames=30):
+    gate = MotionGate(width=320, refresh_frames=refresh_frames, approach=100, padding=20)
+    gate.set_lines(lines)
+    return gate
+
+
+def test_static_frame_is_skipped():
+    gate = make_gate()
+    assert gate.should_detect(frame_with())  # 第一帧没有参考帧
+    assert not gate.should_detect(frame_with())
+    assert gate.frames_skipped == 1 and gate.skip_ratio == 0.5
+
+
+def test_motion_inside_line_region_triggers_detection():
+    gate = make_gate()
+    gate.should_detect(frame_with())
+    assert gate.should_detect(frame_with((600, 300, 680, 350)))
+
+
+def test_motion_outside_line_region_is_ignored():
+    gate = make_gate()
+    gate.should_detect(frame_with())
+    assert not gate.should_detect(frame_with((50, 300, 130, 350)))
+
+
+def test_refresh_frames_forces_detection():
+    gate = make_gate(refresh_frames=4)
+    results = [gate.should_detect(frame_with()) for _ in range(9)]
+    assert results == [True, False, False, False, True, False, False, False, True]
+
+
+def test_set_lines_and_reset_clear_reference():
+    gate = make_gate()
+    gate.should_detect(frame_with())
+    gate.set_lines(LINES)
+    assert gate.should_detect(frame_with())
+    gate.reset()
+    assert gate.frames_checked == 0
+    assert gate.should_detect(frame_with())
+
+
+def test_empty_region_watches_whole_frame():
+    """检测线区域全在画面外时按整帧判断运动"""
+    gate = make_gate(lines=[{'points': [(3000, 100), (3000, 620)]}])
+    gate.should_detect(frame_with())
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert not gate.should_detect(frame_with())
+        assert gate.should_detect(frame_with((50, 300, 130, 350)))
@@ -0,0 +1,39 @@
+"""INT8 验证的计数比较测试"""
+
+from src.quantization import compare_counts
+
+
+def result(lines):
+    return {'lines': [{'name': name, 'count': sum(classes.values()), 'classes': classes}
+                      for name, classes in lines.items()]}
+
+
+def rows_by_key(rows):
+    return {(row['line'], row['class']): row for row in rows}
+
+
+def test_tolerance_edge():
+    """误差恰好等于 max(abs_tolerance, tolerance × 基准计数) 时通过，超过时不通过"""
+    reference = result({"Line 1": {'car': 100, 'truck': 10}})
+    rows = rows_by_key(compare_counts(reference, result({"Line 1": {'car': 105, 'truck': 11}}), 0.05, 1))
+    assert rows[("Line 1", 'car')]['ok'] and rows[("Line 1", 'truck')]['ok']
+    assert rows[("Line 1", 'total')]['diff'] == 6 and not rows[("Line 1", 'total')]['ok']  # 允许 5.5
+
+    rows = rows_by_key(compare_counts(reference, result({"Line 1": {'car': 106, 'truck': 12}}), 0.05, 1))
+    assert rows[("Line 1", 'car')]['diff'] == 6 and not rows[("Line 1", 'car')]['ok']
+    assert rows[("Line 1", 'truck')]['diff'] == 2 and not rows[("Line 1", 'truck')]['ok']
+
+
+def test_missing_line_counts_as_zero():
+    reference = result({"Line 1": {'car': 3}, "Line 2": {'car': 20}})
+    rows = rows_by_key(compare_counts(reference, result({"Line 1": {'car': 3}})))
+    assert rows[("Line 2", 'total')]['candidate'] == 0
+    assert not rows[("Line 2", 'total')]['ok'] and not rows[("Line 2", 'car')]['ok']
+    assert rows[("Line 1", 'total')]['ok']
+
+
+def test_extra_class_is_compared_against_zero():
+    reference = result({"Line 1": {'car': 10}})
+    rows = rows_by_key(compare_counts(reference, result({"Line 1": {'car': 10, 'bus': 4}})))
+    assert rows[("Line 1", 'bus')]['reference'] == 0
+    assert rows[("Line 1", 'bus')]['diff'] == 4 and not rows[("Line 1", 'bus')]['ok']
@@ -0,0 +1,60 @@
+"""检测线区域裁剪测试"""
+
+import numpy as np
+
+from src.detector import Detections
+from src.roi import RegionCropper, line_roi, merge_regions
+
+
+class RecordingDetector:
+    """记录输入的检测器：每个输入都返回同一个（输入坐标下的）框"""
+
+    def __init__(self, box=(10, 20, 50, 60)):
+        self.box = box
+        self.calls = []
+
+    def detect(self, frame, imgsz=None):
+        self.calls.append((frame.shape[:2], imgsz))
+        return Detections(np.array([self.box], dtype=np.float32), [0.9], [2])
+
+
+def test_line_roi_expands_along_normal_and_padding():
+    assert line_roi({'points': [(100, 50), (100, 250)]}, 30, 10) == (60, 40, 140, 260)
+
+
+def test_merge_regions_chains_overlaps():
+    """A 与 B 相交、B 与 C 相交（A 与 C 不相交）时三者合并；合并后的外接框与 D 相交时继续合并"""
+    regions = [(0, 0, 100, 100), (90, 0, 200, 100), (190, 0, 300, 100), (150, 95, 160, 300), (500, 500, 600, 600)]
+    assert sorted(merge_regions(regions, (1000, 1000))) == [(0, 0, 300, 300), (500, 500, 600, 600)]
+
+
+def test_merge_regions_clips_to_frame():
+    regions = [(-20.5, -10, 50.2, 40), (950, 700, 1100, 900), (1200, 0, 1300, 50)]
+    assert merge_regions(regions, (720, 1000)) == [(0, 0, 51, 40), (950, 700, 1000, 720)]
+
+
+def test_full_frame_above_max_area_ratio():
+    lines = [{'points': [(100, 0), (100, 480)]}]
+    cropper = RegionCropper(approach=150, padding=64, max_area_ratio=0.5)
+    cropper.set_lines(lines)
+    assert cropper.regions_for((480, 640)) == [((0, 0, 314, 480), 480)]  # 区域约占画面的 49%
+    cropper = RegionCropper(approach=150, padding=64, max_area_ratio=0.45)
+    cropper.set_lines(lines)
+    assert cropper.regions_for((480, 640)) == []
+    assert cropper.area_ratio((480, 640)) == 1.0
+
+    detector = RecordingDetector()
+    cropper.detect(detector, np.zeros((480, 640, 3), dtype=np.uint8))
+    assert detector.calls == [((480, 640), None)]
+
+
+def test_detect_maps_boxes_back_with_crop_offset():
+    cropper = RegionCropper(approach=50, padding=10, imgsz=640)
+    cropper.set_lines([{'points': [(400, 300), (600, 300)]}])
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    assert cropper.regions_for(frame.shape) == [((390, 240, 610, 360), 128)]
+
+    detector = RecordingDetector()
+    detections = cropper.detect(detector, frame)
+    assert detector.calls == [((120, 220), 128)]
+    assert detections.xyxy.tolist() == [[400, 260, 440, 300]]
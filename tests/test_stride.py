@@ -0,0 +1,73 @@
+"""自适应检测间隔测试"""
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import BlobDetector, SyntheticScene
+from src.detector import Detections
+from src.stride import StrideScheduler
+
+
+BOX = np.array([[100, 100, 160, 140]], dtype=np.float32)
+
+
+def tracks_at(boxes):
+    return Detections(boxes, np.full(len(boxes), 0.9), np.full(len(boxes), 2), np.arange(1, len(boxes) + 1))
+
+
+def test_matched_detections_allow_longer_stride():
+    stride = StrideScheduler(max_stride=6)
+    stride.update(Detections(BOX, [0.9], [2]), tracks_at(BOX), 1)
+    assert stride.update(Detections(BOX, [0.9], [2]), tracks_at(BOX), 1) == 2
+    assert stride.update(Detections(BOX, [0.9], [2]), tracks_at(BOX), 2) == 4
+
+
+def test_unmatched_detection_forces_every_frame():
+    """没有对应轨迹的检测是新驶入的车辆，逐帧检测直到轨迹确认"""
+    stride = StrideScheduler(max_stride=6)
+    stride.update(Detections(), tracks_at(BOX), 1)
+    stride.update(Detections(), tracks_at(BOX), 1)
+    new = np.array([[400, 300, 460, 340]], dtype=np.float32)
+    assert stride.update(Detections(np.concatenate([BOX, new]), [0.9, 0.9], [2, 2]), tracks_at(BOX), 2) == 1
+
+
+@pytest.fixture(scope="module")
+def scene_video(tmp_path_factory):
+    scene = SyntheticScene(300)
+    return scene, scene.write_video(str(tmp_path_factory.mktemp("stride") / "scene.avi"))
+
+
+def run_stride(video, lines, output_dir=None):
+    from main import TrafficFlowCounter
+
+    # 干扰框（0.22）低于 ByteTrack 的新轨迹阈值，永远不会成为轨迹
+    system = TrafficFlowCounter(detector=BlobDetector(distractor_conf=0.22))
+    system.stride = StrideScheduler()
+    system.verbose = False
+    system.event_format = None
+    system.save_video = output_dir is not None
+    system.output_dir = output_dir
+    return system.count_video(video, lines)
+
+
+def test_low_confidence_detections_do_not_pin_stride(scene_video):
+    scene, video = scene_video
+    counter, stats = run_stride(video, scene.lines)
+    assert stats['detect_ratio'] < 0.8
+    actual = {line['name']: dict(line['classes'], total=line['count']) for line in counter.to_dict()['lines']}
+    assert actual == scene.expected_counts()
+
+
+def test_result_video_keeps_every_frame(scene_video, tmp_path):
+    """跳过的帧也写入结果视频，帧数与原视频相同"""
+    scene, video = scene_video
+    _, stats = run_stride(video, scene.lines, str(tmp_path))
+    assert stats['detect_ratio'] < 1.0
+
+    cap = cv2.VideoCapture(str(tmp_path / "scene_annotated.mp4"))
+    frames = 0
+    while cap.grab():
+        frames += 1
+    cap.release()
+    assert frames == scene.num_frames
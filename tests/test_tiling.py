@@ -0,0 +1,48 @@
+"""分块检测合并测试"""
+
+import numpy as np
+
+from src.detector import Detections
+from src.tiling import merge_detections, truncated_boxes
+
+
+def test_same_tile_overlapping_boxes_survive():
+    """同一块内互相重叠的两个框是两辆车，都保留"""
+    detections = Detections(np.array([[100, 100, 200, 200], [110, 105, 205, 200]], dtype=np.float32),
+                            np.array([0.9, 0.8]), np.array([2, 2]))
+    merged = merge_detections(detections, np.array([0, 0]))
+    assert len(merged) == 2
+
+
+def test_cross_tile_duplicate_merges_to_union():
+    """相邻两块的同一车辆合并为外接框，置信度取最高者"""
+    detections = Detections(np.array([[600, 100, 640, 160], [580, 100, 700, 160]], dtype=np.float32),
+                            np.array([0.6, 0.9]), np.array([3, 2]))
+    merged = merge_detections(detections, np.array([0, 1]), np.array([True, False]))
+    assert len(merged) == 1
+    assert merged.xyxy.tolist() == [[580, 100, 700, 160]]
+    assert np.allclose(merged.conf, [0.9])
+    assert merged.cls.tolist() == [2]
+
+
+def test_cross_tile_class_check():
+    """没有被截断的框类别不同时不合并"""
+    boxes = np.array([[100, 100, 200, 200], [102, 100, 200, 198]], dtype=np.float32)
+    detections = Detections(boxes, np.array([0.9, 0.8]), np.array([2, 7]))
+    assert len(merge_detections(detections, np.array([0, 1]))) == 2
+    assert len(merge_detections(detections, np.array([0, 1]), np.array([False, True]))) == 1
+
+
+def test_each_source_merges_at_most_one_box():
+    """整帧的一个大框不会吞掉同一块内的两辆车"""
+    boxes = np.array([[0, 0, 200, 100], [0, 0, 95, 100], [105, 0, 200, 100]], dtype=np.float32)
+    detections = Detections(boxes, np.array([0.9, 0.8, 0.7]), np.array([2, 2, 2]))
+    merged = merge_detections(detections, np.array([1, 0, 0]))
+    assert len(merged) == 2
+
+
+def test_truncated_boxes_ignores_frame_edges():
+    """只有贴着块内侧边缘（与其他块相邻）的框算作截断"""
+    boxes = np.array([[0, 10, 50, 60], [590, 10, 640, 60], [200, 200, 300, 300]], dtype=np.float32)
+    assert truncated_boxes(boxes, (0, 0, 640, 640), (1080, 1920)).tolist() == [False, True, False]
+    assert truncated_boxes(boxes, (1280, 0, 1920, 640), (1080, 1920)).tolist() == [True, False, False]
@@ -0,0 +1,39 @@
+"""TrackStore 测试"""
+
+import numpy as np
+
+from src.track_store import TrackStore
+
+
+def test_append_batch_overflow_evicts_stale_tracks():
+    """同一帧内多个新轨迹腾槽位时淘汰最久未出现的轨迹，而不是本帧刚分配的轨迹"""
+    store = TrackStore(capacity=2)
+    store.append_batch([1], [(10, 10)], frame_idx=0, timestamp=0.0)
+    store.append_batch([2], [(20, 20)], frame_idx=1, timestamp=0.1)
+    store.append_batch([3, 4], [(30, 30), (40, 40)], frame_idx=2, timestamp=0.2)
+
+    assert sorted(int(track_id) for track_id in store.slot_ids) == [3, 4]
+    assert store.get(3) == [(30, 30)]
+    assert store.get(4) == [(40, 40)]
+    assert store.evict_stale(2, 0.2) == [1, 2]
+
+
+def test_append_overflow_keeps_current_frame_tracks():
+    """逐个追加时同样不淘汰本帧已出现的轨迹"""
+    store = TrackStore(capacity=2)
+    store.append(1, (10, 10), frame_idx=0, timestamp=0.0)
+    store.append(2, (20, 20), frame_idx=1, timestamp=0.1)
+    store.append(3, (30, 30), frame_idx=2, timestamp=0.2)
+    store.append(4, (40, 40), frame_idx=2, timestamp=0.2)
+
+    assert 3 in store and 4 in store
+    assert 1 not in store and 2 not in store
+
+
+def test_append_batch_returns_previous_point():
+    """返回追加前的倒数第 2 个点，点数不足时为 NaN"""
+    store = TrackStore(capacity=4, history=3)
+    for frame_idx in range(3):
+        previous = store.append_batch([7], [(frame_idx, frame_idx)], frame_idx, frame_idx / 30)
+    assert previous.tolist() == [[0.0, 0.0]]
+    assert np.isnan(store.append_batch([8], [(1, 1)], 3, 0.1)).all()
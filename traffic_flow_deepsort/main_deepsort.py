@@ -2,8 +2,9 @@
 车流量统计系统主程序 - DeepSORT版本
 """
 
+import os
+import time
 import cv2
-from ultralytics import YOLO
 # 尝试多种DeepSORT导入方式
 DeepSort = None
 import_error_msg = ""
@@ -37,13 +38,17 @@ from src.line_drawer import LineDrawer
 from src.vehicle_tracker_deepsort import VehicleTrackerDeepSORT
 from src.counter import TrafficCounter
 from src.visualizer import Visualizer
+from src.profiler import StageProfiler
+from src.detector import create_detector
 
 
 class TrafficFlowCounterDeepSORT:
     """车流量统计系统主类 - DeepSORT版本"""
     
-    def __init__(self, model_path: str = "yolov8m.pt", video_path: str = None):
-        self.yolo_model = YOLO(model_path)
+    def __init__(self, model_path: str = "yolov8m.pt", video_path: str = None, profile: bool = False,
+                 profile_path: str = "output/stage_latency.json", backend: str = "torch", threads: int = None):
+        # 推理后端：torch（ultralytics）或 onnx（ONNX Runtime CPU，首次使用时导出并缓存模型）
+        self.detector = create_detector(backend, model_path, classes=[2, 3, 5, 7], conf=0.1, threads=threads)
         self.video_path = video_path
         self.line_drawer = LineDrawer()
         self.vehicle_tracker = VehicleTrackerDeepSORT()
@@ -62,6 +67,10 @@ class TrafficFlowCounterDeepSORT:
             embedder_gpu=True
         )
         
+        # 分阶段耗时统计，运行中按 P 键切换
+        self.profiler = StageProfiler(profile)
+        self.profile_path = profile_path
+        
     def run(self):
         """运行车流量统计"""
         # 打开视频
@@ -85,44 +94,50 @@ class TrafficFlowCounterDeepSORT:
         # 重置视频到开头
         cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
         
-        print("开始车流量统计... 按 ESC 键退出")
+        print("开始车流量统计... 按 ESC 键退出，按 P 键开关耗时统计")
+        
+        frame_count = 0
+        total_latency = 0.0
+        
+        profiler = self.profiler
         
         while True:
-            ret, frame = cap.read()
+            with profiler.stage("decode"):
+                ret, frame = cap.read()
             if not ret:
                 break
             
-            # YOLO检测
-            results = self.yolo_model(frame, classes=[2, 3, 5, 7], conf=0.1)
-            
-            # 低置信度检测（用于显示）
-            all_detections = self.yolo_model(frame, classes=[2, 3, 5, 7], conf=0.2)
+            # YOLO检测：只推理一次，追踪使用全部结果（conf>=0.1），
+            # 低置信度显示由 Visualizer 从同一结果中筛选 0.2-0.3 区间
+            start = time.perf_counter()
+            with profiler.stage("detect"):
+                detections = self.detector.detect(frame)
             
             detected_count = 0
             
             # 处理检测结果
-            if results[0].boxes is not None and len(results[0].boxes) > 0:
-                boxes = results[0].boxes.xyxy.cpu().numpy()
-                confs = results[0].boxes.conf.cpu().numpy()
-                clss = results[0].boxes.cls.cpu().numpy().astype(int)
-                
+            if len(detections) > 0:
                 # 转换为DeepSORT格式
                 detection_list = []
-                for box, conf, cls_id in zip(boxes, confs, clss):
+                for box, conf, cls_id in zip(detections.xyxy, detections.conf, detections.cls):
                     x1, y1, x2, y2 = box
                     w = x2 - x1
                     h = y2 - y1
                     detection_list.append(([x1, y1, w, h], conf, cls_id))
                 
                 # DeepSORT跟踪
-                tracks = self.deepsort.update_tracks(detection_list, frame=frame)
+                with profiler.stage("track"):
+                    tracks = self.deepsort.update_tracks(detection_list, frame=frame)
                 detected_count = len([t for t in tracks if t.is_confirmed()])
                 
-                # 处理跟踪结果
+                # 处理跟踪结果：计数与绘制交替进行，分别累计耗时
+                count_time = 0.0
+                draw_time = 0.0
                 for track in tracks:
                     if not track.is_confirmed():
                         continue
                     
+                    step_start = time.perf_counter()
                     track_id = track.track_id
                     ltrb = track.to_ltrb()
                     cls_id = track.get_det_class()
@@ -139,25 +154,39 @@ class TrafficFlowCounterDeepSORT:
                     
                     # 检查是否穿越检测线
                     counter.check_crossing(track_id, current_pos, prev_pos, cls_id, self.vehicle_tracker)
+                    step_end = time.perf_counter()
+                    count_time += step_end - step_start
                     
                     # 绘制检测框和轨迹
                     vehicle_type = self.vehicle_tracker.get_vehicle_type(cls_id)
                     box = [x1, y1, x2, y2]
                     self.visualizer.draw_detection_box(frame, box, track_id, vehicle_type)
                     self.vehicle_tracker.draw_tracks(frame, track_id)
+                    draw_time += time.perf_counter() - step_end
+                profiler.record("count", count_time)
+                profiler.record("render", draw_time)
             
-            # 绘制低置信度检测
-            self.visualizer.draw_low_confidence_detections(frame, all_detections)
-            
-            # 绘制检测线和统计信息
-            self.visualizer.draw_detection_lines(frame, lines, counter.line_counts)
-            self.visualizer.draw_statistics(frame, lines, counter, detected_count)
+            with profiler.stage("overlay"):
+                # 绘制低置信度检测
+                self.visualizer.draw_low_confidence_detections(frame, detections)
+                
+                # 绘制检测线和统计信息
+                self.visualizer.draw_detection_lines(frame, lines, counter.line_counts)
+                self.visualizer.draw_statistics(frame, lines, counter, detected_count)
+            frame_latency = time.perf_counter() - start
+            total_latency += frame_latency
+            profiler.record("frame", frame_latency)
+            frame_count += 1
             
             # 显示结果
-            cv2.namedWindow("Traffic Flow Counter - DeepSORT", cv2.WINDOW_NORMAL)
-            cv2.imshow("Traffic Flow Counter - DeepSORT", frame)
+            with profiler.stage("display"):
+                cv2.namedWindow("Traffic Flow Counter - DeepSORT", cv2.WINDOW_NORMAL)
+                cv2.imshow("Traffic Flow Counter - DeepSORT", frame)
+                key = cv2.waitKey(1) & 0xFF
             
-            if cv2.waitKey(1) & 0xFF == 27:  # ESC键退出
+            if key == ord("p"):
+                print(f"耗时统计已{'开启' if profiler.toggle() else '暂停'}")
+            if key == 27:  # ESC键退出
                 break
         
         cap.release()
@@ -165,6 +194,17 @@ class TrafficFlowCounterDeepSORT:
         
         # 打印最终统计报告
         counter.print_report()
+        if frame_count > 0:
+            avg_ms = total_latency / frame_count * 1000
+            print(f"平均每帧处理耗时: {avg_ms:.1f} ms ({1000 / avg_ms:.1f} FPS, 共 {frame_count} 帧)")
+        
+        # 打印各阶段耗时统计
+        if profiler.order:
+            profiler.print_summary()
+            if self.profile_path:
+                os.makedirs(os.path.dirname(self.profile_path) or ".", exist_ok=True)
+                profiler.dump_json(self.profile_path)
+                print(f"各阶段耗时数据已保存到 {self.profile_path}")
 
 
 def main():
@@ -24,20 +24,13 @@ class Visualizer:
     
     @staticmethod
     def draw_low_confidence_detections(frame, detections) -> None:
-        """绘制低置信度检测结果"""
-        for detection in detections:
-            boxes = detection.boxes
-            if boxes is not None:
-                for box in boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    conf = box.conf[0].cpu().numpy()
-                    
-                    # 只显示置信度在0.2-0.3之间的检测
-                    if 0.2 <= conf < 0.3:
-                        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), (128, 128, 128), 1)
-                        cv2.putText(frame, f"Low:{conf:.2f}", (x1, y1 - 5), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (128, 128, 128), 1)
+        """绘制低置信度检测结果（detections 为 Detections）"""
+        # 只显示置信度在0.2-0.3之间的检测
+        low = detections.filter(0.2, 0.3)
+        for (x1, y1, x2, y2), conf in zip(low.int_boxes(), low.conf):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (128, 128, 128), 1)
+            cv2.putText(frame, f"Low:{conf:.2f}", (x1, y1 - 5), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (128, 128, 128), 1)
     
     @staticmethod
     def draw_detection_lines(frame, lines: List[Dict], line_counts: List[int]) -> None: